@@ -0,0 +1,328 @@
+"""
+Benchmark of AssistantTestSession.run_test against a local mock of the
+Assistants API.
+
+The mock server implements the assistant, thread, message and run endpoints that
+a test session uses, including run event streaming. Every run ends a fixed time
+after it was created. Every n-th run can be made to fail, every n-th run stream
+to break off after the first event, and every n-th reply to a question batch to
+leave out an answer. The benchmark times run_test with polling and with
+streaming at several concurrency limits and batch sizes, counts the runs and
+requests made, and checks that the answers come back in question order.
+
+Usage:
+    python benchmarks/bench_assistant_runs.py --questions 50 --run-seconds 1.0
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from ai_assistant_tester.assistant_manager.AssistantManager import AssistantManager
+from ai_assistant_tester.conversation_tester.AssistantTestSession import (
+    AssistantTestSession,
+)
+
+MODEL = "gpt-4o-mini"
+MOCK_ONLY_FIELDS = ("due", "fail", "drop_stream", "drop_answer")
+
+
+class MockAssistantsApi:
+    """
+    In-memory state of the mock: threads with their messages, and runs.
+    """
+
+    def __init__(
+        self,
+        run_seconds: float,
+        fail_every: int,
+        drop_stream_every: int,
+        drop_answer_every: int,
+    ):
+        self.run_seconds = run_seconds
+        self.fail_every = fail_every
+        self.drop_stream_every = drop_stream_every
+        self.drop_answer_every = drop_answer_every
+        self.runs_created = 0
+        self.ids = itertools.count(1)
+        self.run_requests = itertools.count(1)
+        self.messages: Dict[str, list] = {}
+        self.runs: Dict[str, dict] = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}_{next(self.ids)}"
+
+    @staticmethod
+    def message(thread_id: str, role: str, text: str) -> dict:
+        return {
+            "id": f"msg_{thread_id}_{role}",
+            "object": "thread.message",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "role": role,
+            "status": "completed",
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+            "attachments": [],
+            "metadata": {},
+        }
+
+    @staticmethod
+    def answer(prompt: str, drop_answer: bool) -> str:
+        """
+        Answer a question, or each question of a numbered batch on its own
+        numbered line. With drop_answer, the last answer of a batch is left out.
+        """
+        if "Questions:\n" not in prompt:
+            return f"Answer to: {prompt}"
+        lines = prompt.split("Questions:\n", 1)[1].strip().splitlines()
+        if drop_answer:
+            lines = lines[:-1]
+        numbered = [line.split(". ", 1) for line in lines]
+        return "\n\n".join(f"**{n}.** Answer to: {q}" for n, q in numbered)
+
+    def run_state(self, run: dict) -> dict:
+        """
+        Return the run, ending it (with its answer message if it succeeds) once
+        due.
+        """
+        if run["status"] == "queued" and time.time() >= run["due"] and run["fail"]:
+            run["status"] = "failed"
+            run["last_error"] = {"code": "server_error", "message": "Mock failure"}
+        elif run["status"] == "queued" and time.time() >= run["due"]:
+            prompt = self.messages[run["thread_id"]][0]["content"][0]["text"]["value"]
+            answer = self.answer(prompt, run["drop_answer"])
+            self.messages[run["thread_id"]].append(
+                self.message(run["thread_id"], "assistant", answer)
+            )
+            run["status"] = "completed"
+            run["usage"] = {
+                "prompt_tokens": 500,
+                "completion_tokens": 50,
+                "total_tokens": 550,
+            }
+        body = {k: v for k, v in run.items() if k not in MOCK_ONLY_FIELDS}
+        if body["status"] == "queued":
+            body["status"] = "in_progress"
+        return body
+
+    def handle(self, method: str, path: str, body: dict):
+        """
+        Return (status code, response JSON) of a request.
+        """
+        with self.lock:
+            self.requests += 1
+            return self._handle(method, path, body)
+
+    def _handle(self, method: str, path: str, body: dict):
+        if method == "POST" and path == "/v1/assistants":
+            return 200, {
+                "id": "asst_mock",
+                "object": "assistant",
+                "created_at": int(time.time()),
+                "model": body.get("model", MODEL),
+                "name": body.get("name"),
+                "instructions": body.get("instructions"),
+                "tools": body.get("tools", []),
+                "metadata": {},
+            }
+        if method == "POST" and path == "/v1/threads":
+            thread_id = self.new_id("thread")
+            self.messages[thread_id] = []
+            return 200, {
+                "id": thread_id,
+                "object": "thread",
+                "created_at": int(time.time()),
+                "metadata": {},
+            }
+        match = re.fullmatch(r"/v1/threads/([^/]+)/messages", path)
+        if match and match[1] in self.messages:
+            thread_id = match[1]
+            if method == "POST":
+                message = self.message(thread_id, "user", body["content"])
+                self.messages[thread_id].append(message)
+                return 200, message
+            return 200, {
+                "object": "list",
+                "data": list(reversed(self.messages[thread_id])),
+                "has_more": False,
+            }
+        match = re.fullmatch(r"/v1/threads/([^/]+)/runs(?:/([^/]+))?(/cancel)?", path)
+        if match and match[1] in self.messages:
+            thread_id, run_id = match[1], match[2]
+            if method == "POST" and match[3] and run_id in self.runs:
+                self.runs[run_id]["status"] = "cancelled"
+                return 200, self.run_state(self.runs[run_id])
+            if method == "POST" and run_id is None:
+                number = next(self.run_requests)
+                self.runs_created += 1
+                run_id = self.new_id("run")
+                self.runs[run_id] = {
+                    "id": run_id,
+                    "object": "thread.run",
+                    "created_at": int(time.time()),
+                    "thread_id": thread_id,
+                    "assistant_id": body["assistant_id"],
+                    "status": "queued",
+                    "model": MODEL,
+                    "due": time.time() + self.run_seconds,
+                    "fail": bool(self.fail_every) and number % self.fail_every == 0,
+                    "drop_stream": bool(self.drop_stream_every)
+                    and number % self.drop_stream_every == 0,
+                    "drop_answer": bool(self.drop_answer_every)
+                    and number % self.drop_answer_every == 0,
+                }
+                return 200, self.run_state(self.runs[run_id])
+            if method == "GET" and run_id in self.runs:
+                return 200, self.run_state(self.runs[run_id])
+            if method == "GET" and run_id is None:
+                runs = [r for r in self.runs.values() if r["thread_id"] == thread_id]
+                return 200, {
+                    "object": "list",
+                    "data": [self.run_state(r) for r in reversed(runs)],
+                    "has_more": False,
+                }
+        return 404, {"error": {"message": f"No mock for {method} {path}"}}
+
+    def wait_for_end(self, run_id: str) -> Tuple[dict, Optional[dict]]:
+        """
+        Wait until a run is due and return its final state and answer message.
+        """
+        time.sleep(max(0.0, self.runs[run_id]["due"] - time.time()))
+        with self.lock:
+            run = self.run_state(self.runs[run_id])
+            messages = self.messages[run["thread_id"]]
+            answer = messages[-1] if messages[-1]["role"] == "assistant" else None
+        return run, answer
+
+
+def make_handler(api: MockAssistantsApi):
+    class MockAssistantsHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _respond(self, method: str):
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            status, response = api.handle(method, self.path.split("?")[0], request)
+            if request.get("stream") and response.get("object") == "thread.run":
+                self._stream_run(response)
+                return
+            data = json.dumps(response).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_event(self, event: str, data):
+            payload = json.dumps(data) if isinstance(data, dict) else data
+            self.wfile.write(f"event: {event}\ndata: {payload}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        def _stream_run(self, run: dict):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            self._send_event("thread.run.created", run)
+            if api.runs[run["id"]]["drop_stream"]:
+                return
+            run, answer = api.wait_for_end(run["id"])
+            if answer:
+                self._send_event("thread.message.completed", answer)
+            self._send_event(f"thread.run.{run['status']}", run)
+            self._send_event("done", "[DONE]")
+
+        def do_GET(self):
+            self._respond("GET")
+
+        def do_POST(self):
+            self._respond("POST")
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockAssistantsHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--run-seconds", type=float, default=1.0)
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--fail-every", type=int, default=10)
+    parser.add_argument("--drop-stream-every", type=int, default=7)
+    parser.add_argument("--drop-answer-every", type=int, default=5)
+    parser.add_argument("--modes", default="poll,stream")
+    parser.add_argument("--batch-sizes", default="1")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    api = MockAssistantsApi(
+        args.run_seconds,
+        args.fail_every,
+        args.drop_stream_every,
+        args.drop_answer_every,
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(api))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ["OPENAI_API_KEY"] = "mock"
+
+    manager = AssistantManager()
+    session = AssistantTestSession(
+        name="Benchmark",
+        instructions="Answer the question.",
+        tools=[],
+        manager=manager,
+        model=MODEL,
+    )
+    questions = [f"Question number {i}?" for i in range(args.questions)]
+    qa_pairs = {"qas": [{"question": q, "answer": ""} for q in questions]}
+
+    runs = [
+        (mode, int(concurrency), int(batch_size))
+        for mode in args.modes.split(",")
+        for concurrency in args.concurrency.split(",")
+        for batch_size in args.batch_sizes.split(",")
+    ]
+    for mode, concurrency, batch_size in runs:
+        api.requests = 0
+        api.runs_created = 0
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            answers = session.run_test(
+                qa_pairs,
+                max_concurrency=concurrency,
+                timeout=args.timeout,
+                stream=mode == "stream",
+                batch_size=batch_size,
+            )
+        elapsed = time.perf_counter() - start
+        in_order = all(
+            answer in ("", f"Answer to: {question}")
+            for question, answer in zip(questions, answers)
+        )
+        status_requests = sum(session.status_requests) / len(questions)
+        print(
+            f"{mode:>6}, concurrency {concurrency:>3}, batch size {batch_size:>3}: "
+            f"{elapsed:6.2f}s, {len(session.failures)} failed, "
+            f"{api.runs_created} runs, {api.requests} requests "
+            f"({status_requests:.1f} status checks per question), "
+            f"answers in order: {in_order}"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark of knowledge base chunking on a synthetic markdown input.
+
+Compares the previous chunker, which re-encodes the whole current chunk for every
+paragraph, with TextChunker, which encodes each paragraph once, and reports how
+many chunks of each exceed the token limit.
+
+Usage:
+    python benchmarks/bench_chunking.py --size-mb 5 --max-tokens 1000
+"""
+
+import argparse
+import random
+import time
+from typing import List
+
+import tiktoken
+
+from ai_assistant_tester.knowledge_base.TextChunker import TextChunker
+
+WORDS = (
+    "assistant knowledge base page section crawler token model answer question "
+    "document release install configure account billing support feature limit"
+).split()
+
+
+def quadratic_baseline(encoding: tiktoken.Encoding, text: str, max_tokens: int):
+    paragraphs = text.split("\n\n")
+    chunks, current_chunk = [], []
+    for p in paragraphs:
+        tentative = "\n\n".join(current_chunk + [p])
+        if len(encoding.encode(tentative)) <= max_tokens:
+            current_chunk.append(p)
+        else:
+            if current_chunk:
+                chunks.append("\n\n".join(current_chunk))
+            current_chunk = [p]
+    if current_chunk:
+        chunks.append("\n\n".join(current_chunk))
+    return chunks
+
+
+def synthetic_markdown(size_mb: float, seed: int = 0) -> str:
+    """
+    Crawler-like markdown: pages with a title, headed sections, short paragraphs
+    and now and then a long unbroken page body.
+    """
+    rng = random.Random(seed)
+    parts: List[str] = []
+    size = 0
+    while size < size_mb * 1e6:
+        if rng.random() < 0.05:
+            part = f"# Page {len(parts)}"
+        elif rng.random() < 0.15:
+            part = f"## {' '.join(rng.choices(WORDS, k=4)).title()}"
+        elif rng.random() < 0.003:
+            part = "\n".join(
+                " ".join(rng.choices(WORDS, k=rng.randint(3, 15)))
+                for _ in range(rng.randint(200, 600))
+            )
+        else:
+            part = " ".join(
+                " ".join(rng.choices(WORDS, k=rng.randint(5, 20))).capitalize() + "."
+                for _ in range(rng.randint(1, 8))
+            )
+        parts.append(part)
+        size += len(part) + 2
+    return "\n\n".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=5.0)
+    parser.add_argument("--max-tokens", type=int, default=1000)
+    parser.add_argument("--encoding", default="o200k_base", help="tiktoken encoding")
+    args = parser.parse_args()
+
+    encoding = tiktoken.get_encoding(args.encoding)
+    text = synthetic_markdown(args.size_mb)
+    print(f"Input: {len(text) / 1e6:.1f} MB, {text.count(chr(10) * 2) + 1} paragraphs")
+
+    def report(name: str, func) -> float:
+        start = time.perf_counter()
+        chunks = func()
+        elapsed = time.perf_counter() - start
+        sizes = [len(encoding.encode_ordinary(chunk)) for chunk in chunks]
+        oversized = sum(size > args.max_tokens for size in sizes)
+        print(
+            f"{name:>22}: {elapsed:8.2f}s, {len(chunks)} chunks, "
+            f"max {max(sizes)} tokens, {oversized} over the limit"
+        )
+        return elapsed
+
+    baseline = report(
+        "quadratic baseline",
+        lambda: quadratic_baseline(encoding, text, args.max_tokens),
+    )
+    for heading_aware in (False, True):
+        chunker = TextChunker(encoding, args.max_tokens, heading_aware=heading_aware)
+        name = "TextChunker (headings)" if heading_aware else "TextChunker"
+        elapsed = report(name, lambda: chunker.chunk(text))
+        print(f"{'':>22}  {baseline / elapsed:.1f}x faster than the baseline")
+
+
+if __name__ == "__main__":
+    main()
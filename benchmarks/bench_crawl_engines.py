@@ -0,0 +1,104 @@
+"""
+Compare pages per second of the sync and async WebCrawler engines.
+
+A local threaded HTTP server serves a synthetic site in which every page links to
+a few child pages and every response is delayed to simulate network latency.
+
+Usage:
+    python benchmarks/bench_crawl_engines.py --pages 300 --latency 0.05
+"""
+
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ai_assistant_tester.scraping.WebCrawler import WebCrawler
+
+
+def make_handler(num_pages: int, fanout: int, latency: float):
+    class SyntheticSiteHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            try:
+                page = int(self.path.rstrip("/").rsplit("/", 1)[-1] or 0)
+            except ValueError:
+                page = 0
+            if page >= num_pages:
+                self.send_error(404)
+                return
+
+            children = [
+                child
+                for child in range(page * fanout + 1, page * fanout + fanout + 1)
+                if child < num_pages
+            ]
+            links = "".join(
+                f'<li><a href="/page/{c}">Page {c}</a></li>' for c in children
+            )
+            body = (
+                f"<html><head><title>Page {page}</title></head><body>"
+                f"<h1>Page {page}</h1><p>{'Lorem ipsum dolor sit amet. ' * 40}</p>"
+                f"<ul>{links}</ul></body></html>"
+            ).encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return SyntheticSiteHandler
+
+
+def run_engine(engine: str, base_url: str, domain: str, concurrency: int) -> tuple:
+    crawler = WebCrawler(
+        domain=domain,
+        unlimited_depth=True,
+        engine=engine,
+        max_concurrency=concurrency,
+        max_per_host=concurrency,
+    )
+    start = time.perf_counter()
+    crawler.run(f"{base_url}/page/0")
+    elapsed = time.perf_counter() - start
+    return len(crawler.results), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), make_handler(args.pages, args.fanout, args.latency)
+    )
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    domain = f"{host}:{port}"
+
+    try:
+        print(
+            f"Synthetic site: {args.pages} pages, {args.latency * 1000:.0f} ms latency"
+        )
+        for engine in ("sync", "async"):
+            pages, elapsed = run_engine(
+                engine, f"http://{domain}", domain, args.concurrency
+            )
+            print(
+                f"{engine:>5}: {pages} pages in {elapsed:.2f}s "
+                f"({pages / elapsed:.1f} pages/s)"
+            )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Micro-benchmark of HTML parsing over a corpus of saved pages.
+
+Compares the previous two-pass approach (one html.parser tree for the markdown and
+another one for the links) with single-pass parsing on every installed backend, and
+checks that each backend produces the same markdown and links as the baseline.
+
+Usage:
+    python benchmarks/bench_html_parsers.py --corpus path/to/saved/pages
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from bs4 import BeautifulSoup
+
+from ai_assistant_tester.scraping.HtmlParser import (
+    TAGS_TO_REMOVE,
+    available_backends,
+    parse_page,
+)
+
+
+def two_pass_baseline(html: str, base_url: str) -> Tuple[str, List[str]]:
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup.find_all(TAGS_TO_REMOVE):
+        tag.decompose()
+    title = soup.title.get_text().strip() if soup.title else base_url
+    lines = [line.strip() for line in soup.get_text(separator="\n").splitlines()]
+    markdown = f"# {title}\n\n" + "\n".join(line for line in lines if line)
+
+    links_soup = BeautifulSoup(html, "html.parser")
+    links = [
+        a.get("href")
+        for a in links_soup.find_all("a", href=True)
+        if not a.get("href").startswith(("#", "mailto:", "javascript:"))
+    ]
+    return markdown, links
+
+
+def synthetic_corpus(num_pages: int) -> List[str]:
+    pages = []
+    for i in range(num_pages):
+        items = "".join(
+            f'<li><a href="/docs/{i}/{j}">Section {j}</a> <span>detail {j}</span></li>'
+            for j in range(60)
+        )
+        paragraphs = "".join(
+            f"<p>Paragraph {j} of page {i}. {'Some documentation text. ' * 15}</p>"
+            for j in range(40)
+        )
+        pages.append(
+            f"<html><head><title>Page {i}</title><script>var x = {i};</script>"
+            f"<style>p {{ color: red; }}</style></head><body>"
+            f"<header><nav><ul>{items}</ul></nav></header>"
+            f"<main><h1>Page {i}</h1>{paragraphs}</main>"
+            f"<footer><a href='mailto:a@b.c'>Contact</a></footer></body></html>"
+        )
+    return pages
+
+
+def load_corpus(corpus_dir: Path) -> List[str]:
+    files = sorted(corpus_dir.rglob("*.htm*"))
+    return [f.read_text(encoding="utf-8", errors="replace") for f in files]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", type=Path, help="Directory of saved .html pages")
+    parser.add_argument("--pages", type=int, default=200, help="Synthetic page count")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.pages)
+    if not pages:
+        raise SystemExit(f"No .html files found in {args.corpus}")
+    base_url = "https://example.com/docs/page"
+    size_mb = sum(len(p) for p in pages) / 1e6
+    print(f"Corpus: {len(pages)} pages, {size_mb:.1f} MB")
+
+    def timed(func) -> float:
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for html in pages:
+                func(html)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    baseline_time = timed(lambda html: two_pass_baseline(html, base_url))
+    print(
+        f"{'two-pass html.parser':>22}: {baseline_time / len(pages) * 1000:7.2f} ms/page"
+    )
+
+    expected = [two_pass_baseline(html, base_url) for html in pages]
+    for backend in available_backends():
+        elapsed = timed(lambda html: parse_page(html, base_url, backend))
+        mismatches = 0
+        for html, (markdown, hrefs) in zip(pages, expected):
+            page = parse_page(html, base_url, backend)
+            if page["markdown"] != markdown or len(page["links"]) != len(hrefs):
+                mismatches += 1
+        print(
+            f"{backend:>22}: {elapsed / len(pages) * 1000:7.2f} ms/page "
+            f"({baseline_time / elapsed:.1f}x), {mismatches} pages differ"
+        )
+
+
+if __name__ == "__main__":
+    main()
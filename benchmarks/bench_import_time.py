@@ -0,0 +1,68 @@
+"""
+Benchmark of the import time of the package modules.
+
+Imports every module in a fresh interpreter with ``python -X importtime`` and
+reports the median cumulative import time, and which heavy dependencies (openai,
+tiktoken, bs4) the import loaded. Those should only be loaded on first use.
+
+Usage:
+    python benchmarks/bench_import_time.py --runs 5
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import List, Tuple
+
+MODULES = [
+    "ai_assistant_tester.utils.utils",
+    "ai_assistant_tester.scraping.WebCrawler",
+    "ai_assistant_tester.knowledge_base.KnowledgeBaseFormatter",
+    "ai_assistant_tester.assistant_manager.AssistantManager",
+    "ai_assistant_tester.conversation_tester.AssistantTestSession",
+]
+HEAVY_DEPENDENCIES = ["openai", "tiktoken", "bs4"]
+
+
+def import_once(module: str) -> Tuple[float, List[str]]:
+    """
+    Import a module in a new interpreter.
+
+    :return: Cumulative import time in seconds and the heavy dependencies loaded.
+    """
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {HEAVY_DEPENDENCIES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative_us = 0
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            cumulative_us = int(fields[1])
+    loaded = [name for name in result.stdout.strip().split(",") if name]
+    return cumulative_us / 1e6, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    args = parser.parse_args()
+
+    print(f"{'module':>60} {'median s':>9}  heavy dependencies loaded")
+    for module in args.modules:
+        runs = [import_once(module) for _ in range(args.runs)]
+        median = statistics.median(seconds for seconds, _ in runs)
+        loaded = ", ".join(runs[-1][1]) or "-"
+        print(f"{module:>60} {median:>9.3f}  {loaded}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark of Q&A deduplication on a synthetic question set.
+
+Generates questions from templates and random words, adds reworded copies of some
+of them (inserted filler words, changed auxiliary verbs, changed punctuation) and
+reports the run time of QADeduplicator and how many of the copies it removed.
+
+Usage:
+    python benchmarks/bench_qa_dedup.py --pairs 10000 --duplicates 0.2
+"""
+
+import argparse
+import random
+import string
+import time
+from typing import List, Tuple
+
+from ai_assistant_tester.knowledge_base.QADeduplicator import QADeduplicator
+
+TEMPLATES = [
+    "How do I {} the {}?",
+    "What is the {} of {}?",
+    "Can I {} my {} {}?",
+    "Where can I find the {} {} settings?",
+    "Why does {} fail when {} is {}?",
+    "Which {} supports {}?",
+]
+REWORDINGS = {"do": "can", "can": "should", "is": "'s", "does": "would"}
+
+
+def synthetic_questions(
+    pairs: int, duplicates: float, seed: int = 0
+) -> Tuple[List[str], int]:
+    rng = random.Random(seed)
+    words = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+        for _ in range(3000)
+    ]
+    num_copies = int(pairs * duplicates)
+    originals = []
+    for _ in range(pairs - num_copies):
+        template = rng.choice(TEMPLATES)
+        originals.append(template.format(*rng.sample(words, template.count("{}"))))
+    copies = []
+    for _ in range(num_copies):
+        tokens = rng.choice(originals).split()
+        change = rng.random()
+        if change < 0.4:
+            tokens.insert(rng.randrange(len(tokens)), rng.choice(["please", "exactly"]))
+        elif change < 0.7:
+            tokens = [REWORDINGS.get(token, token) for token in tokens]
+        else:
+            tokens[-1] = tokens[-1].rstrip("?") + " ?"
+        copies.append(" ".join(tokens))
+    questions = originals + copies
+    rng.shuffle(questions)
+    return questions, num_copies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pairs", type=int, default=10000)
+    parser.add_argument("--duplicates", type=float, default=0.2)
+    parser.add_argument("--threshold", type=float, default=0.75)
+    args = parser.parse_args()
+
+    questions, num_copies = synthetic_questions(args.pairs, args.duplicates)
+    qa_pairs = {"qas": [{"question": q, "answer": ""} for q in questions]}
+    deduplicator = QADeduplicator(args.threshold)
+    deduplicator.deduplicate(qa_pairs)  # warm-up
+
+    start = time.perf_counter()
+    _, report = deduplicator.deduplicate(qa_pairs)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{report['total']} pairs, {num_copies} reworded copies: removed "
+        f"{report['removed']} in {len(report['clusters'])} clusters, {elapsed:.3f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,29 @@
 # TODO: change typing from Any to matching ones
 
+from __future__ import annotations
+
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Any, Literal
-
-from openai import NotGiven, OpenAI
-from openai.pagination import SyncCursorPage
-from openai.types.beta import ThreadDeleted
-from openai.types.beta.assistant import Assistant
-from openai.types.beta.thread import Thread
-from openai.types.beta.thread_create_and_run_params import Tool
-from openai.types.beta.threads.message import Message
-from openai.types.beta.threads.run import Run
-from openai.types.beta.threads.run_submit_tool_outputs_params import ToolOutput
-from openai.types.beta.threads.runs.run_step import RunStep
-from openai.types.chat.chat_completion import ChatCompletion
+from typing import TYPE_CHECKING, Any, Literal
 
 from ai_assistant_tester.utils.utils import get_client
 
+if TYPE_CHECKING:
+    from openai import NotGiven, OpenAI, Stream
+    from openai.pagination import SyncCursorPage
+    from openai.types.beta import AssistantStreamEvent, ThreadDeleted
+    from openai.types.beta.assistant import Assistant
+    from openai.types.beta.thread import Thread
+    from openai.types.beta.thread_create_and_run_params import Tool
+    from openai.types.beta.threads.message import Message
+    from openai.types.beta.threads.run import Run
+    from openai.types.beta.threads.run_submit_tool_outputs_params import ToolOutput
+    from openai.types.beta.threads.runs.run_step import RunStep
+    from openai.types.chat.chat_completion import ChatCompletion
+    from openai.types.file_deleted import FileDeleted
+    from openai.types.vector_store import VectorStore
+    from openai.types.vector_store_deleted import VectorStoreDeleted
+
 
 class AssistantManager:
     def __init__(self) -> None:
@@ -50,8 +57,8 @@ class AssistantManager:
         )
         return message
 
-    def list_runs(self, assistant_id: str) -> SyncCursorPage[Run]:
-        runs = self.client.beta.threads.runs.list(assistant_id)
+    def list_runs(self, thread_id: str, limit: int = 20) -> SyncCursorPage[Run]:
+        runs = self.client.beta.threads.runs.list(thread_id=thread_id, limit=limit)
         return runs
 
     def retrieve_run(self, thread_id: str, run_id: str) -> Run:
@@ -108,6 +115,17 @@ class AssistantManager:
         )
         return run
 
+    def create_run_stream(
+        self, thread_id: str, assistant_id: str, timeout: float | None = None
+    ) -> Stream[AssistantStreamEvent]:
+        stream = self.client.beta.threads.runs.create(
+            thread_id=thread_id,
+            assistant_id=assistant_id,
+            stream=True,
+            timeout=timeout,
+        )
+        return stream
+
     def create_thread_and_run(self, assistant_id: str, messages: SyncCursorPage):
         run = self.client.beta.threads.create_and_run(
             assistant_id=assistant_id, thread={"messages": messages}
@@ -121,11 +139,11 @@ class AssistantManager:
 
     def add_vector_stores(self, name: str, filepaths: list[Path]) -> str:
         vector_store = self.client.vector_stores.create(name=name)
-        file_streams = [open(path, "rb") for path in filepaths]
-
-        batch = self.client.vector_stores.file_batches.upload_and_poll(
-            vector_store_id=vector_store.id, files=file_streams
-        )
+        with ExitStack() as stack:
+            file_streams = [stack.enter_context(open(path, "rb")) for path in filepaths]
+            batch = self.client.vector_stores.file_batches.upload_and_poll(
+                vector_store_id=vector_store.id, files=file_streams
+            )
 
         if batch.status == "completed":
             print(f"Successfully uploaded {batch.id} file")
@@ -134,6 +152,22 @@ class AssistantManager:
 
         return vector_store.id
 
+    def retrieve_vector_store(self, vector_store_id: str) -> VectorStore:
+        vector_store = self.client.vector_stores.retrieve(vector_store_id)
+        return vector_store
+
+    def list_vector_store_file_ids(self, vector_store_id: str) -> list[str]:
+        files = self.client.vector_stores.files.list(vector_store_id=vector_store_id)
+        return [file.id for file in files]
+
+    def delete_vector_store(self, vector_store_id: str) -> VectorStoreDeleted:
+        response = self.client.vector_stores.delete(vector_store_id)
+        return response
+
+    def delete_file(self, file_id: str) -> FileDeleted:
+        response = self.client.files.delete(file_id)
+        return response
+
     def create_assistant(
         self,
         name: str,
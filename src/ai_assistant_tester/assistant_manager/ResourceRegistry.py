@@ -0,0 +1,311 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple, TypedDict
+
+from ai_assistant_tester.assistant_manager.AssistantManager import AssistantManager
+from ai_assistant_tester.utils.constants import ASSISTANT_REGISTRY_FILE
+
+if TYPE_CHECKING:
+    from openai.types.beta.assistant import Assistant
+
+REGISTRY_VERSION = 1
+
+
+class VectorStoreEntry(TypedDict):
+    id: str
+    file_ids: List[str]
+    last_used: float
+
+
+class AssistantEntry(TypedDict):
+    id: str
+    last_used: float
+
+
+class CleanupSummary(TypedDict):
+    threads: int
+    assistants: int
+    vector_stores: int
+    files: int
+    failed: int
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ResourceRegistry:
+    """
+    Local record of the vector stores, assistants and threads created for test
+    sessions.
+
+    Vector stores are keyed by the content hash of their files and assistants by
+    the hash of their configuration (name, instructions, tools, model and tool
+    resources), so a session whose knowledge base and assistant settings did not
+    change reuses the existing ones instead of uploading and indexing the files
+    again. Threads are recorded so that cleanup() can delete them, together with
+    assistants and vector stores that have not been used for a while.
+    """
+
+    def __init__(self, path: Path = ASSISTANT_REGISTRY_FILE):
+        """
+        Load the registry, if it exists.
+
+        :param path: Path of the JSON registry file.
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.vector_stores: Dict[str, VectorStoreEntry] = {}
+        self.assistants: Dict[str, AssistantEntry] = {}
+        self.threads: Dict[str, float] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.vector_stores = data.get("vector_stores", {})
+            self.assistants = data.get("assistants", {})
+            self.threads = data.get("threads", {})
+
+    def save(self):
+        with self._lock:
+            data = {
+                "version": REGISTRY_VERSION,
+                "vector_stores": self.vector_stores,
+                "assistants": self.assistants,
+                "threads": self.threads,
+            }
+            os.makedirs(self.path.parent, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def files_hash(filepaths: List[Path]) -> str:
+        """
+        Return the hash of the contents of the files, in order.
+        """
+        digests = [_sha256_file(path) for path in filepaths]
+        return hashlib.sha256(" ".join(digests).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def config_hash(config: Dict[str, Any]) -> str:
+        """
+        Return the hash of an assistant configuration.
+        """
+        canonical = json.dumps(config, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get_vector_store(
+        self, manager: AssistantManager, name: str, filepaths: List[Path]
+    ) -> str:
+        """
+        Return the id of a vector store holding the files, reusing the one
+        created for the same file contents if it still exists.
+
+        :raises RuntimeError: If the new vector store did not process all its
+            files. It is deleted with its files; if that fails too, it is
+            recorded as stale so that the next cleanup() deletes it.
+        """
+        from openai import NotFoundError
+
+        key = self.files_hash(filepaths)
+        entry = self.vector_stores.get(key)
+        if entry:
+            try:
+                vector_store = manager.retrieve_vector_store(entry["id"])
+                if vector_store.status != "expired":
+                    print(f"Reusing vector store {entry['id']}")
+                    entry["last_used"] = time.time()
+                    self.save()
+                    return entry["id"]
+            except NotFoundError:
+                pass
+
+        vector_store_id = manager.add_vector_stores(name=name, filepaths=filepaths)
+        vector_store = manager.retrieve_vector_store(vector_store_id)
+        if vector_store.status != "completed" or vector_store.file_counts.failed:
+            file_ids = manager.list_vector_store_file_ids(vector_store_id)
+            try:
+                manager.delete_vector_store(vector_store_id)
+                for file_id in file_ids:
+                    manager.delete_file(file_id)
+            except Exception as e:
+                print(f"Could not delete vector store {vector_store_id}: {e}")
+                # Stale from the start and not keyed by the files hash, so it is
+                # never reused but deleted by the next cleanup().
+                self.vector_stores[f"stale:{vector_store_id}"] = {
+                    "id": vector_store_id,
+                    "file_ids": file_ids,
+                    "last_used": 0.0,
+                }
+                self.save()
+            raise RuntimeError(
+                f"Vector store {vector_store_id} is {vector_store.status} with "
+                f"{vector_store.file_counts.failed} failed files"
+            )
+        self.vector_stores[key] = {
+            "id": vector_store_id,
+            "file_ids": manager.list_vector_store_file_ids(vector_store_id),
+            "last_used": time.time(),
+        }
+        self.save()
+        return vector_store_id
+
+    def get_assistant(self, manager: AssistantManager, **config) -> "Assistant":
+        """
+        Return an assistant with the configuration, reusing the one created with
+        the same configuration if it still exists.
+
+        :param config: Keyword arguments of AssistantManager.create_assistant().
+        """
+        from openai import NotFoundError
+
+        key = self.config_hash(config)
+        entry = self.assistants.get(key)
+        if entry:
+            try:
+                assistant = manager.connect(entry["id"])
+                print(f"Reusing assistant {entry['id']}")
+                entry["last_used"] = time.time()
+                self.save()
+                return assistant
+            except NotFoundError:
+                pass
+
+        assistant = manager.create_assistant(**config)
+        self.assistants[key] = {"id": assistant.id, "last_used": time.time()}
+        self.save()
+        return assistant
+
+    def add_threads(self, thread_ids: List[str]):
+        """
+        Record threads for deletion by cleanup().
+        """
+        now = time.time()
+        with self._lock:
+            for thread_id in thread_ids:
+                self.threads.setdefault(thread_id, now)
+        self.save()
+
+    def cleanup(
+        self,
+        manager: AssistantManager,
+        max_age_days: float = 7.0,
+        everything: bool = False,
+        max_workers: int = 8,
+    ) -> CleanupSummary:
+        """
+        Delete the threads, assistants and vector stores (with their files) that
+        were last used more than max_age_days ago, concurrently. Resources that
+        no longer exist are dropped from the registry too.
+
+        :param manager: Manager whose client deletes the resources.
+        :param max_age_days: Age from which a resource is stale.
+        :param everything: Delete all recorded resources, regardless of age.
+        :param max_workers: Number of concurrent delete requests.
+        """
+        from openai import NotFoundError
+
+        cutoff = float("inf") if everything else time.time() - max_age_days * 86400
+        summary: CleanupSummary = {
+            "threads": 0,
+            "assistants": 0,
+            "vector_stores": 0,
+            "files": 0,
+            "failed": 0,
+        }
+
+        def delete(job: Tuple[str, Callable[[str], Any], str]) -> bool:
+            _, delete_func, resource_id = job
+            try:
+                delete_func(resource_id)
+            except NotFoundError:
+                pass
+            except Exception as e:
+                print(f"Could not delete {resource_id}: {e}")
+                return False
+            return True
+
+        def delete_all(jobs: List[Tuple[str, Callable[[str], Any], str]]) -> List[bool]:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                deleted = list(executor.map(delete, jobs))
+            for (kind, _, _), ok in zip(jobs, deleted):
+                summary[kind if ok else "failed"] += 1
+            return deleted
+
+        stale_threads = [t for t, created in self.threads.items() if created < cutoff]
+        stale_assistants = [
+            key for key, entry in self.assistants.items() if entry["last_used"] < cutoff
+        ]
+        stale_stores = [
+            key
+            for key, entry in self.vector_stores.items()
+            if entry["last_used"] < cutoff
+        ]
+
+        # Threads and assistants go first, as they may still use the vector stores.
+        deleted = delete_all(
+            [("threads", manager.delete_thread, t) for t in stale_threads]
+            + [
+                ("assistants", manager.delete_assistant, self.assistants[key]["id"])
+                for key in stale_assistants
+            ]
+        )
+        for thread_id, ok in zip(stale_threads, deleted):
+            if ok:
+                del self.threads[thread_id]
+        for key, ok in zip(stale_assistants, deleted[len(stale_threads) :]):
+            if ok:
+                del self.assistants[key]
+
+        deleted = delete_all(
+            [
+                (
+                    "vector_stores",
+                    manager.delete_vector_store,
+                    self.vector_stores[key]["id"],
+                )
+                for key in stale_stores
+            ]
+        )
+        file_ids = []
+        for key, ok in zip(stale_stores, deleted):
+            if ok:
+                file_ids += self.vector_stores.pop(key)["file_ids"]
+        delete_all([("files", manager.delete_file, f) for f in file_ids])
+
+        self.save()
+        return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Delete stale threads, assistants and vector stores recorded in "
+        "the assistant registry."
+    )
+    parser.add_argument("--registry", type=Path, default=ASSISTANT_REGISTRY_FILE)
+    parser.add_argument("--max-age-days", type=float, default=7.0)
+    parser.add_argument(
+        "--all", action="store_true", help="Delete everything, regardless of age"
+    )
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    registry = ResourceRegistry(args.registry)
+    cleanup_summary = registry.cleanup(
+        AssistantManager(),
+        max_age_days=args.max_age_days,
+        everything=args.all,
+        max_workers=args.workers,
+    )
+    print(f"Deleted: {cleanup_summary}")
@@ -0,0 +1,85 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, TypedDict, Union
+
+from ai_assistant_tester.utils.utils import QAPair
+
+
+class CheckpointEntry(TypedDict):
+    index: int
+    question: str
+    answer: str
+    thread_id: str
+    run_id: Optional[str]
+    seconds: float
+    status_requests: int
+    finished_at: float
+
+
+class AnswerCheckpoint:
+    """
+    Append-only JSONL record of the answers of a test run.
+
+    Every answer is written, with its thread and run IDs and timing, as soon as it
+    arrives and flushed to disk, so answers survive a crash. A resumed run reads
+    the record back and only asks the questions that have no answer yet. Failed
+    questions are not recorded, so a resumed run asks them again.
+    """
+
+    def __init__(self, path: Union[str, Path], resume: bool = False):
+        """
+        Open the checkpoint.
+
+        :param path: Path of the JSONL file.
+        :param resume: Keep the answers of an earlier run. Otherwise the file is
+            started afresh.
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.entries: List[CheckpointEntry] = []
+        os.makedirs(self.path.parent, exist_ok=True)
+        if resume and self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                text = f.read()
+            for line in text.splitlines():
+                try:
+                    self.entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A line cut short by a crash; its question is asked again.
+                    pass
+            if text and not text.endswith("\n"):
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("\n")
+        else:
+            open(self.path, "w", encoding="utf-8").close()
+
+    def answered(self, qas: List[QAPair]) -> Dict[int, str]:
+        """
+        Return the recorded answers (question index -> answer) of the questions.
+        Entries whose index does not hold the same question are ignored, so a
+        changed Q&A set does not pick up the answers of other questions.
+        """
+        return {
+            entry["index"]: entry["answer"]
+            for entry in self.entries
+            if entry["index"] < len(qas)
+            and qas[entry["index"]]["question"] == entry["question"]
+        }
+
+    def append(self, entries: List[CheckpointEntry]):
+        """
+        Write entries to the end of the file and flush them to disk.
+        """
+        if not entries:
+            return
+        lines = "".join(
+            json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries
+        )
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self.entries += entries
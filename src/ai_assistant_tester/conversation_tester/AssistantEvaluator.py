@@ -1,6 +1,7 @@
 import json
 import re
 import statistics
+import time
 from pathlib import Path
 from pprint import pprint
 from typing import Dict, List
@@ -10,7 +11,13 @@ from ai_assistant_tester.conversation_tester.AssistantTestSession import (
     AssistantTestSession,
 )
 from ai_assistant_tester.prompts import system_answer_evaluation
-from ai_assistant_tester.utils.constants import KNOWLEDGE_BASE_OUTPUTS_DIR, QA_PAIRS_DIR
+from ai_assistant_tester.utils.constants import (
+    KNOWLEDGE_BASE_OUTPUTS_DIR,
+    QA_PAIRS_DIR,
+    USAGE_REPORTS_DIR,
+)
+from ai_assistant_tester.utils.llm_cache import get_llm_cache
+from ai_assistant_tester.utils.usage_ledger import get_ledger, in_stage
 from ai_assistant_tester.utils.utils import QAPairs, load_json_file_qa_pairs
 
 
@@ -48,6 +55,7 @@ class AssistantEvaluator:
         """Remove ```json … ``` or ``` … ``` blocks around the payload, if present for safe json parsing."""
         return re.sub(r"^\s*```(?:json)?\s*([\s\S]*?)\s*```\s*$", r"\1", text.strip())
 
+    @in_stage("evaluation")
     def evaluate(
         self,
         qa_pairs: QAPairs,
@@ -129,12 +137,34 @@ class AssistantEvaluator:
 
 
 if __name__ == "__main__":
+    import argparse
+
+    from ai_assistant_tester.assistant_manager.ResourceRegistry import (
+        ResourceRegistry,
+    )
     from ai_assistant_tester.conversation_tester.AssistantTestSession import (
         AssistantTestSession,
     )
-    from ai_assistant_tester.utils.constants import KNOWLEDGE_BASE_OUTPUTS_DIR
+    from ai_assistant_tester.utils.constants import (
+        KNOWLEDGE_BASE_OUTPUTS_DIR,
+        TEST_CHECKPOINTS_DIR,
+    )
     from ai_assistant_tester.utils.utils import load_json_file_qa_pairs
 
+    parser = argparse.ArgumentParser(description="Test and evaluate an assistant.")
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=TEST_CHECKPOINTS_DIR / "eg-zine-pages-dev.jsonl",
+        help="JSONL file the answers are written to as they arrive",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Only ask the questions that have no answer in the checkpoint",
+    )
+    args = parser.parse_args()
+
     qa_pairs = load_json_file_qa_pairs(QA_PAIRS_DIR / "eg-zine-pages-dev.json")
     mgr = AssistantManager()
     session = AssistantTestSession(
@@ -144,9 +174,10 @@ if __name__ == "__main__":
         model="gpt-4o-mini",
         kb_file=KNOWLEDGE_BASE_OUTPUTS_DIR / "example.md",
         manager=mgr,
+        registry=ResourceRegistry(),
     )
 
-    answers = session.run_test(qa_pairs)
+    answers = session.run_test(qa_pairs, checkpoint=args.checkpoint, resume=args.resume)
     print("Assistant answers:", answers)
 
     evaluator = AssistantEvaluator(mgr)
@@ -156,3 +187,11 @@ if __name__ == "__main__":
     md_report = evaluator.generate_report(graded_rows)
     Path("evaluation_report.md").write_text(md_report, encoding="utf-8")
     print("\nMarkdown report written to evaluation_report.md")
+
+    ledger = get_ledger()
+    print("\nLLM usage:\n" + ledger.report())
+    llm_cache = get_llm_cache()
+    if llm_cache:
+        print(f"LLM cache {llm_cache.path}: {llm_cache.stats()}")
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+    ledger.write_summary(USAGE_REPORTS_DIR / f"usage-{run_id}.json")
@@ -1,78 +1,201 @@
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from pprint import pprint
-from typing import Any, List, Optional
-
-from openai.types.beta.thread_create_and_run_params import Tool
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, TypedDict, Union
 
 from ai_assistant_tester.assistant_manager.AssistantManager import AssistantManager
-from ai_assistant_tester.knowledge_base.KnowledgeBaseFormatter import (
-    KnowledgeBaseFormatter,
+from ai_assistant_tester.assistant_manager.ResourceRegistry import ResourceRegistry
+from ai_assistant_tester.conversation_tester.AnswerCheckpoint import (
+    AnswerCheckpoint,
+    CheckpointEntry,
 )
+from ai_assistant_tester.prompts import numbered_question_batch
 from ai_assistant_tester.utils.constants import KNOWLEDGE_BASE_OUTPUTS_DIR
+from ai_assistant_tester.utils.usage_ledger import (
+    BudgetExceededError,
+    get_ledger,
+    in_context,
+    in_stage,
+)
 from ai_assistant_tester.utils.utils import QAPair, QAPairs, load_json_file_qa_pairs
 
+if TYPE_CHECKING:
+    from openai.types.beta.thread_create_and_run_params import Tool
+    from openai.types.beta.threads.run import Run
+
+RUN_FAILED_STATUSES = (
+    "failed",
+    "cancelled",
+    "expired",
+    "incomplete",
+    "requires_action",
+)
+RUN_END_STATUSES = ("completed",) + RUN_FAILED_STATUSES
+# Start of a numbered answer: "1.", "1)", "**1.**", "### 1." at a line start.
+ANSWER_NUMBER = re.compile(r"^[ \t>#*_]*(\d+)[.)][*_]*[ \t]*", re.MULTILINE)
+# Stream events carrying the run itself, e.g. thread.run.in_progress; run step
+# events are thread.run.step.*.
+RUN_EVENT = re.compile(r"thread\.run\.(?!step\.)")
+
+
+class RunInfo(TypedDict):
+    thread_id: str
+    run_id: Optional[str]
+    seconds: float
+    status_requests: int
+
+
+class RunFailedError(RuntimeError):
+    def __init__(self, run: "Run"):
+        error = f": {run.last_error.message}" if run.last_error else ""
+        super().__init__(f"Run {run.id} ended with status {run.status}{error}")
+        self.run = run
+
 
 class AssistantTestSession:
     """
     Encapsulates the flow: create assistant, optionally inject knowledge base,
     send QA batch, wait for numbered answer response, parse and evaluate.
+
+    With a ResourceRegistry, the vector store and assistant of an earlier session
+    with the same knowledge base contents and assistant configuration are reused,
+    and the session's threads are recorded for cleanup.
     """
 
     def __init__(
         self,
         name: str,
         instructions: str,
-        tools: List[Tool],
+        tools: List["Tool"],
         manager: AssistantManager,
         model: str = "gpt-4o",
         kb_file: Optional[Path] = None,
+        registry: Optional[ResourceRegistry] = None,
     ):
-        self.kb_formatter = KnowledgeBaseFormatter(model=model)
         self.manager = manager
+        self.registry = registry
+        self.failures: Dict[int, str] = {}
+        self.status_requests: List[int] = []
+        self.thread_ids: List[str] = []
 
-        if kb_file:
+        if kb_file and registry:
+            vector_store_id = registry.get_vector_store(
+                manager, name="knowledge base", filepaths=[kb_file]
+            )
+        elif kb_file:
             vector_store_id = manager.add_vector_stores(
                 name="knowledge base",
                 filepaths=[kb_file],
             )
+        if kb_file:
             self.tool_resources = {
                 "file_search": {"vector_store_ids": [vector_store_id]}
             }
         else:
             self.tool_resources = None
 
-        self.assistant = self.manager.create_assistant(
+        assistant_config = dict(
             name=name,
             instructions=instructions,
             tools=tools,
             model=model,
             tool_resources=self.tool_resources,
         )
+        if registry:
+            self.assistant = registry.get_assistant(manager, **assistant_config)
+        else:
+            self.assistant = self.manager.create_assistant(**assistant_config)
 
     def _format_question_batch(self, qa_set: List[QAPair]) -> str:
         """
         Build a numbered list of questions for structured response from the assistant.
         """
-        return "\n".join(f"{i+1}. {qa['question']}" for i, qa in enumerate(qa_set))
+        return numbered_question_batch.format(
+            count=len(qa_set),
+            questions="\n".join(
+                f"{i+1}. {qa['question']}" for i, qa in enumerate(qa_set)
+            ),
+        )
 
-    def _wait_for_run(self, thread_id: str, run_id: str, timeout: float = 60.0) -> None:
+    def _wait_for_run(
+        self,
+        thread_id: str,
+        run_id: str,
+        timeout: float = 60.0,
+        initial_interval: float = 0.25,
+        max_interval: float = 4.0,
+    ) -> int:
         """
-        Polls the run status until completion or timeout.
+        Polls the run status until completion, failure or timeout. The interval
+        between checks doubles up to max_interval and drops back to
+        initial_interval whenever the status changes.
+
+        :return: Number of status requests made.
         """
         start = time.time()
+        interval = initial_interval
+        status = None
+        requests = 0
         while True:
             run = self.manager.retrieve_run(thread_id, run_id)
-            print(f"Run status: {run.status}")
+            requests += 1
+            if run.status != status:
+                print(f"Run {run_id} status: {run.status}")
+                status = run.status
+                interval = initial_interval
 
+            if run.status == "completed":
+                if run.usage:
+                    get_ledger().record(run.model, run.usage, time.time() - start)
+                return requests
             if run.status == "requires_action":
                 print("Assistant is trying to use tools!")
-            if run.status == "completed":
-                return
-            if time.time() - start > timeout:
+            if run.status in RUN_FAILED_STATUSES:
+                raise RunFailedError(run)
+            remaining = timeout - (time.time() - start)
+            if remaining <= 0:
                 raise TimeoutError("Assistant did not complete run in time")
-            time.sleep(0.5)
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, max_interval)
+
+    def _stream_run(
+        self, thread_id: str, timeout: float
+    ) -> Tuple[Optional["Run"], Optional[str], Optional[str]]:
+        """
+        Creates a run with streaming and reads its events until the run ends.
+
+        :return: The run in its final state and the assistant's answer, or None
+            for both if the stream broke off first; and the run id, if the run was
+            created.
+        """
+        start = time.time()
+        run_id = None
+        answer = None
+        try:
+            with self.manager.create_run_stream(
+                thread_id, self.assistant.id, timeout=timeout
+            ) as stream:
+                for event in stream:
+                    if event.event == "thread.message.completed":
+                        message = event.data
+                        if message.role == "assistant" and message.content:
+                            answer = message.content[0].text.value
+                    elif RUN_EVENT.match(event.event):
+                        run = event.data
+                        run_id = run.id
+                        if run.status in RUN_END_STATUSES:
+                            if run.status == "completed" and run.usage:
+                                get_ledger().record(
+                                    run.model, run.usage, time.time() - start
+                                )
+                            return run, answer, run_id
+                    if time.time() - start > timeout:
+                        break
+        except Exception as e:
+            print(f"Run stream failed, polling instead: {type(e).__name__}: {e}")
+        return None, None, run_id
 
     def _extract_assistant_response(self, thread_id: str) -> str:
         """
@@ -84,19 +207,243 @@ class AssistantTestSession:
                 return msg.content[0].text.value
         raise RuntimeError("No assistant response found in thread")
 
-    def _parse_numbered_answers(self, reply: str) -> List[str]:
-        pattern = r"(?:\*\*)?(\d+)\.(?:\*\*)?\s*(.*?)(?=\s*(?:\*\*\d+\.|$))"
-        matches = re.findall(pattern, reply, flags=re.DOTALL)
-        return [m[1].strip() for m in matches]
-
-    def run_test(self, qa_pairs: QAPairs) -> List[str]:
-        answers = []
-        for qa in qa_pairs["qas"]:
-            thread = self.manager.create_thread()
-            self.manager.add_message(thread, "user", qa["question"])
-            run = self.manager.create_run(thread.id, self.assistant.id)
-            self._wait_for_run(thread.id, run.id)
-            answers.append(self._extract_assistant_response(thread.id))
+    def _parse_numbered_answers(self, reply: str, count: int) -> List[Optional[str]]:
+        """
+        Split a reply to a numbered question batch into per-question answers.
+
+        An answer starts at a line beginning with its number ("2.", "2)", "**2.**",
+        "### 2."). Numbers that are missing, out of range, appear more than once
+        or have an empty answer cannot be aligned and give None.
+        """
+        markers = [m for m in ANSWER_NUMBER.finditer(reply) if 1 <= int(m[1]) <= count]
+        numbers = [int(m[1]) for m in markers]
+        answers: List[Optional[str]] = [None] * count
+        for k, marker in enumerate(markers):
+            number = numbers[k]
+            end = markers[k + 1].start() if k + 1 < len(markers) else len(reply)
+            text = reply[marker.end() : end].strip()
+            if numbers.count(number) == 1 and text:
+                answers[number - 1] = text
+        return answers
+
+    def _latest_run_id(self, thread_id: str) -> Optional[str]:
+        """
+        Returns the ID of the newest run on the thread, or None if it has none.
+        A stream that broke off before its first run event may still have
+        created a run, and the thread accepts no second one while it is active.
+        """
+        try:
+            runs = self.manager.list_runs(thread_id, limit=1)
+        except Exception as e:
+            print(f"Could not list runs of thread {thread_id}: {e}")
+            return None
+        return runs.data[0].id if runs.data else None
+
+    def _cancel_run(self, thread_id: str, run_id: str):
+        try:
+            self.manager.cancel_run(thread_id, run_id)
+        except Exception as e:
+            print(f"Could not cancel run {run_id}: {e}")
+
+    def _ask(self, question: str, timeout: float, stream: bool) -> Tuple[str, RunInfo]:
+        """
+        Asks one question in a new thread. The run is streamed if stream is set;
+        otherwise, or if the stream breaks off, its status is polled. A run that
+        times out or waits for tool outputs is cancelled.
+
+        :return: The assistant's answer, and the thread and run IDs, the time
+            taken and the number of status requests made.
+        """
+        # Reserves the cost of the run, so concurrent questions share the budget.
+        with get_ledger().reserve():
+            return self._ask_in_thread(question, timeout, stream)
+
+    def _ask_in_thread(
+        self, question: str, timeout: float, stream: bool
+    ) -> Tuple[str, RunInfo]:
+        start = time.time()
+        thread = self.manager.create_thread()
+        self.thread_ids.append(thread.id)
+        self.manager.add_message(thread, "user", question)
+        run_id = None
+        requests = 0
+        try:
+            if stream:
+                run, answer, run_id = self._stream_run(thread.id, timeout)
+                if run is not None:
+                    if run.status != "completed":
+                        raise RunFailedError(run)
+                    if answer is None:
+                        answer = self._extract_assistant_response(thread.id)
+                    return answer, {
+                        "thread_id": thread.id,
+                        "run_id": run.id,
+                        "seconds": time.time() - start,
+                        "status_requests": requests,
+                    }
+                if run_id is None:
+                    run_id = self._latest_run_id(thread.id)
+            if run_id is None:
+                run_id = self.manager.create_run(thread.id, self.assistant.id).id
+            requests = self._wait_for_run(
+                thread.id, run_id, timeout=timeout - (time.time() - start)
+            )
+        except TimeoutError:
+            self._cancel_run(thread.id, run_id)
+            raise
+        except RunFailedError as e:
+            if e.run.status == "requires_action":
+                self._cancel_run(thread.id, e.run.id)
+            raise
+        return self._extract_assistant_response(thread.id), {
+            "thread_id": thread.id,
+            "run_id": run_id,
+            "seconds": time.time() - start,
+            "status_requests": requests,
+        }
+
+    def _ask_group(
+        self, qa_set: List[QAPair], timeout: float, stream: bool
+    ) -> Tuple[List[Optional[str]], RunInfo]:
+        """
+        Asks one question, or several as a numbered batch in a single run.
+
+        :return: The answers, None for those that could not be aligned, and the
+            run's info.
+        """
+        if len(qa_set) == 1:
+            answer, info = self._ask(qa_set[0]["question"], timeout, stream)
+            return [answer], info
+        reply, info = self._ask(self._format_question_batch(qa_set), timeout, stream)
+        return self._parse_numbered_answers(reply, len(qa_set)), info
+
+    @in_stage("assistant_run")
+    def run_test(
+        self,
+        qa_pairs: QAPairs,
+        max_concurrency: int = 8,
+        timeout: float = 60.0,
+        stream: bool = True,
+        batch_size: int = 1,
+        checkpoint: Optional[Union[str, Path]] = None,
+        resume: bool = False,
+    ) -> List[str]:
+        """
+        Asks the questions in their own threads, up to max_concurrency at a time.
+
+        With batch_size > 1, each thread gets a numbered batch of questions and
+        the numbered reply is split into answers. Answers that are missing or
+        cannot be aligned, and the questions of failed batches, are asked again
+        one at a time.
+
+        Answers are returned in question order. A question whose run fails or
+        times out gets an empty answer and its error is kept in self.failures
+        (question index -> error) instead of aborting the other questions. Only
+        BudgetExceededError stops the whole test. The number of run status
+        requests made for each question (for a batch, its first question) is
+        kept in self.status_requests. The threads created are kept in
+        self.thread_ids and, with a registry, recorded there for cleanup.
+
+        With a checkpoint file, every answer is appended to it as soon as it
+        arrives, with its thread and run IDs and timing. With resume, the answers
+        already in the checkpoint are kept and only the other questions are asked,
+        so an interrupted test can be continued.
+
+        :param qa_pairs: Q&A set whose questions are asked.
+        :param max_concurrency: Maximum number of runs in flight.
+        :param timeout: Seconds to wait for a single run.
+        :param stream: Receive run events through the streaming API instead of
+            polling the run status.
+        :param batch_size: Number of questions asked per run.
+        :param checkpoint: JSONL file the answers are written to.
+        :param resume: Continue from the answers in the checkpoint instead of
+            starting it afresh.
+        """
+        qas = qa_pairs["qas"]
+        answers = [""] * len(qas)
+        self.failures = {}
+        self.status_requests = [0] * len(qas)
+        runs = 0
+        answered: Dict[int, str] = {}
+        saved: Optional[AnswerCheckpoint] = None
+        if checkpoint:
+            saved = AnswerCheckpoint(checkpoint, resume=resume)
+            answered = saved.answered(qas)
+            for i, answer in answered.items():
+                answers[i] = answer
+            if answered:
+                print(f"Resuming: {len(answered)} of {len(qas)} questions answered")
+        unanswered = [i for i in range(len(qas)) if i not in answered]
+        pending = [
+            unanswered[start : start + batch_size]
+            for start in range(0, len(unanswered), batch_size)
+        ]
+        self.thread_ids = []
+        ask_group = in_context(self._ask_group)
+        try:
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                while pending:
+                    futures = {
+                        executor.submit(
+                            ask_group, [qas[i] for i in group], timeout, stream
+                        ): group
+                        for group in pending
+                    }
+                    runs += len(futures)
+                    retry: List[int] = []
+                    for future in as_completed(futures):
+                        group = futures[future]
+                        try:
+                            group_answers, info = future.result()
+                        except BudgetExceededError:
+                            executor.shutdown(cancel_futures=True)
+                            raise
+                        except Exception as e:
+                            error = f"{type(e).__name__}: {e}"
+                            if len(group) > 1:
+                                first, last = group[0] + 1, group[-1] + 1
+                                print(f"Questions {first}-{last} failed: {error}")
+                                retry += group
+                            else:
+                                self.failures[group[0]] = error
+                                print(f"Question {group[0] + 1} failed: {error}")
+                            continue
+                        self.status_requests[group[0]] += info["status_requests"]
+                        entries: List[CheckpointEntry] = []
+                        for i, answer in zip(group, group_answers):
+                            if answer is None:
+                                retry.append(i)
+                                continue
+                            answers[i] = answer
+                            entries.append(
+                                {
+                                    "index": i,
+                                    "question": qas[i]["question"],
+                                    "answer": answer,
+                                    "thread_id": info["thread_id"],
+                                    "run_id": info["run_id"],
+                                    "seconds": round(info["seconds"], 3),
+                                    "status_requests": info["status_requests"],
+                                    "finished_at": time.time(),
+                                }
+                            )
+                        if saved:
+                            saved.append(entries)
+                    if retry:
+                        print(f"Asking {len(retry)} questions again one at a time")
+                    pending = [[i] for i in sorted(retry)]
+        finally:
+            if self.registry:
+                self.registry.add_threads(self.thread_ids)
+
+        if self.failures:
+            print(f"{len(self.failures)} of {len(qas)} questions failed")
+        if qas:
+            print(
+                f"{runs} runs for {len(qas)} questions, "
+                f"{sum(self.status_requests)} run status requests, "
+                f"{sum(self.status_requests) / len(qas):.1f} per question"
+            )
         return answers
 
 
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, TypedDict
+
+from ai_assistant_tester.utils.usage_ledger import BATCH_PRICE_FACTOR, get_ledger
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchState(TypedDict, total=False):
+    requests_sha256: str
+    input_file_id: str
+    batch_id: str
+    status: str
+
+
+class BatchRunner:
+    """
+    Runs chat completion requests through the OpenAI Batch API.
+
+    The requests are written to a JSONL file, uploaded and submitted as one batch;
+    the runner then polls until the batch ends and maps the responses back by
+    custom_id. Progress (uploaded file, batch id, downloaded results) is recorded in
+    a JSON state file after every step, so a rerun with the same requests resumes
+    the existing batch instead of submitting a new one.
+    """
+
+    def __init__(
+        self,
+        client: "OpenAI",
+        state_file: str,
+        poll_interval: float = 30,
+        completion_window: str = "24h",
+    ):
+        """
+        Initialize the runner.
+
+        :param client: OpenAI client.
+        :param state_file: JSON file recording the progress of the batch. The request
+            and result files are written next to it.
+        :param poll_interval: Seconds between two status checks.
+        :param completion_window: Completion window of the batch.
+        """
+        self.client = client
+        self.state_file = state_file
+        self.requests_file = f"{state_file}.requests.jsonl"
+        self.results_file = f"{state_file}.results.jsonl"
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+
+    def _load_state(self, requests_sha256: str) -> BatchState:
+        if os.path.exists(self.state_file):
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state: BatchState = json.load(f)
+            if state.get("requests_sha256") == requests_sha256:
+                return state
+            logging.info(f"Requests changed, starting a new batch: {self.state_file}")
+        if os.path.exists(self.results_file):
+            os.remove(self.results_file)
+        return {"requests_sha256": requests_sha256}
+
+    def _save_state(self, state: BatchState):
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+    def run(self, requests: List[Tuple[str, dict]]) -> Dict[str, Optional[str]]:
+        """
+        Run the requests as a batch, or resume the batch already started for them.
+
+        :param requests: (custom_id, body) pairs; body holds the keyword arguments
+            of chat.completions.create().
+        :return: Message content per custom_id; None for failed requests.
+        """
+        if not requests:
+            return {}
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": body,
+                }
+            )
+            for custom_id, body in requests
+        ]
+        payload = "\n".join(lines) + "\n"
+        state = self._load_state(hashlib.sha256(payload.encode("utf-8")).hexdigest())
+
+        needs_download = not os.path.exists(self.results_file)
+        if needs_download:
+            if "input_file_id" not in state:
+                with open(self.requests_file, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                with open(self.requests_file, "rb") as f:
+                    uploaded = self.client.files.create(file=f, purpose="batch")
+                state["input_file_id"] = uploaded.id
+                self._save_state(state)
+            if "batch_id" not in state:
+                get_ledger().check_budget()
+                batch = self.client.batches.create(
+                    input_file_id=state["input_file_id"],
+                    endpoint=BATCH_ENDPOINT,
+                    completion_window=self.completion_window,
+                )
+                state["batch_id"] = batch.id
+                self._save_state(state)
+                logging.info(f"Submitted batch {batch.id} with {len(lines)} requests")
+            self._wait_and_download(state)
+
+        results: Dict[str, Optional[str]] = {
+            custom_id: None for custom_id, _ in requests
+        }
+        with open(self.results_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                response = entry.get("response") or {}
+                if response.get("status_code") != 200:
+                    logging.error(
+                        f"Batch request {entry.get('custom_id')} failed: "
+                        f"{entry.get('error') or response.get('body')}"
+                    )
+                    continue
+                # Usage of results downloaded by an earlier run is already recorded.
+                if needs_download:
+                    get_ledger().record(
+                        response["body"].get("model", ""),
+                        response["body"].get("usage"),
+                        price_factor=BATCH_PRICE_FACTOR,
+                    )
+                choices = response["body"].get("choices") or [{}]
+                results[entry["custom_id"]] = (
+                    choices[0].get("message", {}).get("content")
+                )
+        return results
+
+    def _wait_and_download(self, state: BatchState):
+        """
+        Poll the batch until it ends and store its output and error lines in the
+        results file.
+        """
+        while True:
+            batch = self.client.batches.retrieve(state["batch_id"])
+            if batch.status != state.get("status"):
+                state["status"] = batch.status
+                self._save_state(state)
+                counts = batch.request_counts
+                logging.info(
+                    f"Batch {batch.id}: {batch.status}"
+                    + (f" ({counts.completed}/{counts.total} done)" if counts else "")
+                )
+            if batch.status in TERMINAL_STATUSES:
+                break
+            time.sleep(self.poll_interval)
+
+        if batch.status != "completed" and not batch.output_file_id:
+            # Forget the dead batch so that the next run submits a new one; the
+            # uploaded requests file is kept.
+            del state["batch_id"]
+            state.pop("status", None)
+            self._save_state(state)
+            raise RuntimeError(f"Batch {batch.id} ended with status {batch.status}")
+
+        tmp_file = f"{self.results_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    text = self.client.files.content(file_id).text
+                    f.write(text if text.endswith("\n") else text + "\n")
+        os.replace(tmp_file, self.results_file)
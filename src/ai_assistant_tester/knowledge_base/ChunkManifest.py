@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, TypedDict
+
+MANIFEST_VERSION = 1
+
+
+class ManifestEntry(TypedDict):
+    source_sha256: str
+    title: str
+    output: Optional[str]
+
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_title(text: str, width: int = 80) -> str:
+    """
+    Return the first non-empty line of a text, used to name chunks in diff summaries.
+    """
+    for line in text.splitlines():
+        if line.strip():
+            line = line.strip()
+            return line if len(line) <= width else line[: width - 3] + "..."
+    return ""
+
+
+class ChunkManifest:
+    """
+    Record of the formatted chunks of a knowledge base.
+
+    For every chunk it stores the hash of its source text and its formatted output,
+    together with a version of the model and prompt that produced the outputs. A
+    rebuild looks chunks up by source hash and only re-formats chunks that are new,
+    changed or were formatted with another model/prompt version.
+    """
+
+    def __init__(self, path: str, prompt_version: str):
+        """
+        Load the manifest, if it exists.
+
+        :param path: Path of the JSON manifest.
+        :param prompt_version: Hash of the model and prompt settings; entries of
+            another version are not reused.
+        """
+        self.path = path
+        self.prompt_version = prompt_version
+        self.previous: List[ManifestEntry] = []
+        self.previous_version: Optional[str] = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.previous = data.get("chunks", [])
+            self.previous_version = data.get("prompt_version")
+        self._outputs: Dict[str, Optional[str]] = {}
+        if self.previous_version == prompt_version:
+            self._outputs = {
+                entry["source_sha256"]: entry["output"]
+                for entry in self.previous
+                if entry["output"]
+            }
+
+    def lookup(self, text: str) -> Optional[str]:
+        """
+        Return the stored output for a chunk's source text, or None if it must be
+        formatted.
+        """
+        return self._outputs.get(source_hash(text))
+
+    def save(self, entries: List[ManifestEntry]):
+        """
+        Replace the manifest with the entries of the current build.
+        """
+        data = {
+            "version": MANIFEST_VERSION,
+            "prompt_version": self.prompt_version,
+            "chunks": entries,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def diff_summary(self, entries: List[ManifestEntry]) -> str:
+        """
+        Describe which chunks were added, changed, removed or reused compared with
+        the previous manifest. A new chunk with the title of a removed chunk counts
+        as changed.
+
+        :param entries: Entries of the current build.
+        """
+        old_hashes = {entry["source_sha256"] for entry in self.previous}
+        new_hashes = {entry["source_sha256"] for entry in entries}
+        added = [e for e in entries if e["source_sha256"] not in old_hashes]
+        removed = [e for e in self.previous if e["source_sha256"] not in new_hashes]
+        removed_titles = {e["title"] for e in removed}
+        changed = [e for e in added if e["title"] in removed_titles]
+        changed_titles = {e["title"] for e in changed}
+        added = [e for e in added if e["title"] not in changed_titles]
+        removed = [e for e in removed if e["title"] not in changed_titles]
+
+        lines = [
+            "# Knowledge base update",
+            "",
+            f"{len(entries)} chunks: {len(added)} added, {len(changed)} changed, "
+            f"{len(removed)} removed, {len(entries) - len(added) - len(changed)} "
+            "unchanged.",
+        ]
+        if self.previous and self.previous_version != self.prompt_version:
+            lines.append("Model or prompt changed: all chunks were formatted again.")
+        for heading, group in (
+            ("Added", added),
+            ("Changed", changed),
+            ("Removed", removed),
+        ):
+            if group:
+                lines += ["", f"## {heading}", ""]
+                lines += [f"- {entry['title'] or '(untitled)'}" for entry in group]
+        return "\n".join(lines) + "\n"
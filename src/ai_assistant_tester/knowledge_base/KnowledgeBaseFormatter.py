@@ -1,18 +1,73 @@
+import hashlib
 import json
 import logging
 import os
+import queue
 import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
-from urllib.parse import urlparse
-
-import tiktoken
-from openai.types.chat import ChatCompletion, ChatCompletionMessageParam
-
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from ai_assistant_tester.knowledge_base.BatchRunner import BatchRunner
+from ai_assistant_tester.knowledge_base.ChunkManifest import (
+    ChunkManifest,
+    ManifestEntry,
+    chunk_title,
+    source_hash,
+)
+from ai_assistant_tester.knowledge_base.TextChunker import TextChunker
 from ai_assistant_tester.prompts import format_knowledge_base_chunk
-from ai_assistant_tester.scraping.WebCrawler import WebCrawler
-from ai_assistant_tester.utils.constants import KNOWLEDGE_BASE_OUTPUTS_DIR, QA_PAIRS_DIR
-from ai_assistant_tester.utils.utils import get_client, get_file_content
+from ai_assistant_tester.utils.constants import (
+    KNOWLEDGE_BASE_OUTPUTS_DIR,
+    QA_PAIRS_DIR,
+    USAGE_REPORTS_DIR,
+)
+from ai_assistant_tester.utils.llm_cache import get_llm_cache
+from ai_assistant_tester.utils.usage_ledger import get_ledger, in_context, in_stage
+from ai_assistant_tester.utils.utils import get_client, get_encoding, get_file_content
+
+if TYPE_CHECKING:
+    import tiktoken
+    from openai import OpenAI
+    from openai.types.chat import ChatCompletion, ChatCompletionMessageParam
+
+# Structured output schema of a Q&A generation response.
+QA_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "qa_pairs",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "qas": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "question": {"type": "string"},
+                            "answer": {"type": "string"},
+                        },
+                        "required": ["question", "answer"],
+                        "additionalProperties": False,
+                    },
+                }
+            },
+            "required": ["qas"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+class CrawlStopped(Exception):
+    """
+    Raised in the crawler thread of crawl_and_format() when formatting failed and
+    the crawl has to stop.
+    """
 
 
 class KnowledgeBaseFormatter:
@@ -27,6 +82,7 @@ class KnowledgeBaseFormatter:
         model: str = "gpt-4o-mini",
         max_tokens_per_chunk: int = 1000,
         temperature: float = 0.0,
+        heading_aware_chunks: bool = False,
     ):
         """
         Initialize the formatter with OpenAI settings.
@@ -35,12 +91,13 @@ class KnowledgeBaseFormatter:
             model (str): OpenAI model name.
             max_tokens_per_chunk (int): Max tokens per text chunk.
             temperature (float): Sampling temperature for generation.
+            heading_aware_chunks (bool): Keep markdown sections together in chunks.
         """
         self.model = model
         self.max_tokens = max_tokens_per_chunk
         self.temperature = temperature
-        self.client = get_client()
-        self.encoding = tiktoken.encoding_for_model(model)
+        self.heading_aware_chunks = heading_aware_chunks
+        self._chunker: Optional[TextChunker] = None
         self.messages: List[ChatCompletionMessageParam] = [
             {
                 "role": "system",
@@ -51,12 +108,35 @@ class KnowledgeBaseFormatter:
             }
         ]
 
+    @property
+    def client(self) -> "OpenAI":
+        return get_client()
+
+    @property
+    def encoding(self) -> "tiktoken.Encoding":
+        return get_encoding(self.model)
+
+    @property
+    def chunker(self) -> TextChunker:
+        if self._chunker is None:
+            self._chunker = TextChunker(
+                self.encoding, self.max_tokens, heading_aware=self.heading_aware_chunks
+            )
+        return self._chunker
+
     def crawl_site(
         self,
         start_url: str,
         cli: bool = False,
         output_file: Optional[str] = None,
         max_depth: int = 2,
+        engine: str = "sync",
+        max_concurrency: int = 16,
+        parser_backend: str = "html.parser",
+        http_cache: Optional[str] = None,
+        dedup_threshold: Optional[float] = None,
+        use_sitemap: bool = False,
+        max_body_bytes: Optional[int] = 10 * 1024 * 1024,
     ) -> str:
         """
         Crawl a website and return its full aggregated markdown content.
@@ -66,21 +146,172 @@ class KnowledgeBaseFormatter:
             cli (bool): Enable verbose output.
             output_file (Optional[str]): Optional file to write results to.
             max_depth (int): Max crawl depth.
+            engine (str): Crawl engine, "sync" or "async" (concurrent fetches).
+            max_concurrency (int): Max concurrent fetches for the async engine.
+            parser_backend (str): HTML parser, "html.parser", "lxml" or "selectolax".
+            http_cache (Optional[str]): SQLite file caching pages between crawls,
+                so unchanged pages are revalidated instead of downloaded again.
+            dedup_threshold (Optional[float]): Similarity (0-1) above which a page is
+                dropped as a duplicate of an earlier one; 1.0 drops exact copies
+                only. None (default) keeps every page.
+            use_sitemap (bool): Seed the crawl from robots.txt / sitemap.xml and skip
+                pages whose lastmod predates the previous crawl in http_cache.
+            max_body_bytes (Optional[int]): Bytes kept per page; larger pages are
+                truncated. None for no limit.
 
         Returns:
             str: Aggregated raw content from all pages.
         """
-        domain = urlparse(start_url).netloc
+        from ai_assistant_tester.scraping.CrawlOutputWriter import CrawlOutputReader
+        from ai_assistant_tester.scraping.UrlCanonicalizer import canonical_host
+        from ai_assistant_tester.scraping.WebCrawler import WebCrawler
+
         crawler = WebCrawler(
-            domain=domain,
+            domain=canonical_host(start_url),
             cli=cli,
             output_file=output_file,
             max_depth=max_depth,
+            engine=engine,
+            max_concurrency=max_concurrency,
+            parser_backend=parser_backend,
+            http_cache=http_cache,
+            dedup_threshold=dedup_threshold,
+            use_sitemap=use_sitemap,
+            max_body_bytes=max_body_bytes,
         )
-        crawler.crawl(start_url)
+        crawler.run(start_url)
+        crawler.close()
+        logging.info(crawler.crawl_summary())
 
+        if output_file:
+            # Pages went to the output file; read them back through its URL index.
+            return "\n\n".join(content for _, content in CrawlOutputReader(output_file))
         return "\n\n".join(crawler.results.values())
 
+    @in_stage("format")
+    def crawl_and_format(
+        self,
+        start_url: str,
+        output_file: Path,
+        cli: bool = False,
+        max_depth: int = 2,
+        max_workers: int = 4,
+        max_pages_queued: int = 16,
+        **crawler_options,
+    ) -> int:
+        """
+        Crawl a website and format its pages into a knowledge base file while the
+        crawl is still running.
+
+        The crawler runs in a background thread and hands every page over through a
+        bounded queue. Each page is chunked on arrival and its chunks are formatted
+        independently on a pool of max_workers threads. Formatted sections are
+        appended to output_file in crawl order as soon as they are ready, so at
+        most 2 * max_workers chunks and max_pages_queued pages are held in memory.
+        If formatting fails, the crawl is stopped and closed before the error is
+        raised.
+
+        Args:
+            start_url (str): URL to start crawling from.
+            output_file (Path): Markdown file receiving the formatted knowledge base.
+            cli (bool): Enable verbose crawler output.
+            max_depth (int): Max crawl depth.
+            max_workers (int): Number of chunks formatted concurrently.
+            max_pages_queued (int): Crawled pages waiting to be chunked before the
+                crawler blocks.
+            **crawler_options: Further WebCrawler options, e.g. engine="async".
+
+        Returns:
+            int: Number of formatted sections written.
+        """
+        from ai_assistant_tester.scraping.UrlCanonicalizer import canonical_host
+        from ai_assistant_tester.scraping.WebCrawler import WebCrawler
+
+        pages: queue.Queue = queue.Queue(maxsize=max_pages_queued)
+        done = object()
+        stop = threading.Event()
+
+        def on_page(url: str, content: str):
+            while not stop.is_set():
+                try:
+                    pages.put(content, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+            raise CrawlStopped()
+
+        crawler = WebCrawler(
+            domain=canonical_host(start_url),
+            cli=cli,
+            max_depth=max_depth,
+            on_page=on_page,
+            **crawler_options,
+        )
+        crawl_errors: List[Exception] = []
+
+        def crawl():
+            try:
+                crawler.run(start_url)
+            except CrawlStopped:
+                pass
+            except Exception as e:
+                crawl_errors.append(e)
+            finally:
+                crawler.close()
+                pages.put(done)
+
+        crawl_thread = threading.Thread(target=crawl, name="crawler", daemon=True)
+        crawl_thread.start()
+
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        written = 0
+        in_flight: deque = deque()
+
+        def write_next(f):
+            nonlocal written
+            formatted_chunk = in_flight.popleft().result()
+            if formatted_chunk:
+                f.write("\n\n" + formatted_chunk)
+                f.flush()
+                written += 1
+
+        format_chunk = in_context(self._format_chunk)
+        with open(output_file, "w") as f, ThreadPoolExecutor(max_workers) as executor:
+            try:
+                while (page := pages.get()) is not done:
+                    for chunk in self._chunk_text(page):
+                        while len(in_flight) >= 2 * max_workers:
+                            write_next(f)
+                        future: Future = executor.submit(
+                            format_chunk,
+                            chunk,
+                            format_knowledge_base_chunk,
+                            context=[],
+                        )
+                        in_flight.append(future)
+                    while in_flight and in_flight[0].done():
+                        write_next(f)
+                while in_flight:
+                    write_next(f)
+            except BaseException:
+                # Stop the crawler and keep the queue drained until it has closed,
+                # so its frontier, cache and trace are saved.
+                stop.set()
+                executor.shutdown(cancel_futures=True)
+                while crawl_thread.is_alive():
+                    try:
+                        pages.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+                raise
+
+        crawl_thread.join()
+        if crawl_errors:
+            raise crawl_errors[0]
+        logging.info(crawler.crawl_summary())
+        logging.info(f"Wrote {written} formatted sections to {output_file}")
+        return written
+
     def _chunk_text(self, text: str) -> List[str]:
         """
         Chunk text by paragraphs while staying under token limit.
@@ -91,69 +322,238 @@ class KnowledgeBaseFormatter:
         Returns:
             List[str]: List of token-safe chunks.
         """
-        paragraphs = text.split("\n\n")
-        chunks, current_chunk = [], []
+        return self.chunker.chunk(text)
 
-        for p in paragraphs:
-            tentative = "\n\n".join(current_chunk + [p])
-            if len(self.encoding.encode(tentative)) <= self.max_tokens:
-                current_chunk.append(p)
-            else:
-                if current_chunk:
-                    chunks.append("\n\n".join(current_chunk))
-                current_chunk = [p]
-
-        if current_chunk:
-            chunks.append("\n\n".join(current_chunk))
-        return chunks
+    def _chunk_request(
+        self, chunk: str, prompt: str, context: Optional[List[str]] = None
+    ) -> dict:
+        """
+        Build the chat completion arguments formatting a chunk. With context None,
+        the prompt is appended to the shared conversation in self.messages.
+        """
+        message: ChatCompletionMessageParam = {
+            "role": "user",
+            "content": prompt.format(chunk_text=chunk),
+        }
+        if context is None:
+            self.messages.append(message)
+            messages = self.messages
+        else:
+            messages = [self.messages[0]]
+            messages += [{"role": "assistant", "content": text} for text in context]
+            messages.append(message)
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+        }
 
-    def _format_chunk(self, chunk: str, prompt: str) -> Optional[str]:
+    def _format_chunk(
+        self, chunk: str, prompt: str, context: Optional[List[str]] = None
+    ) -> Optional[str]:
         """
         Format a single chunk using GPT.
 
         Args:
             chunk (str): Raw unformatted text.
             prompt (str): A prompt template with a placeholder {chunk_text}.
+            context (Optional[List[str]]): Previously formatted outputs sent along
+                with the chunk. None sends, and extends, the full conversation in
+                self.messages.
 
         Returns:
             str: Formatted output from GPT.
         """
-
-        formatted_prompt = prompt.format(chunk_text=chunk)
-        message: ChatCompletionMessageParam = {
-            "role": "user",
-            "content": formatted_prompt,
-        }
-        self.messages.append(message)
         response: ChatCompletion = self.client.chat.completions.create(
-            model=self.model,
-            messages=self.messages,
-            temperature=self.temperature,
-            max_tokens=self.max_tokens,
+            **self._chunk_request(chunk, prompt, context)
         )
         formatted_message = response.choices[0].message.content
-        if formatted_message:
+        if formatted_message and context is None:
             self.messages.append({"role": "user", "content": formatted_message})
         return formatted_message
 
-    def format_knowledge_base(self, raw_text: str) -> str:
+    @in_stage("format")
+    def format_knowledge_base(
+        self,
+        raw_text: str,
+        context_outputs: Optional[int] = None,
+        max_workers: int = 1,
+        batch_state: Optional[str] = None,
+    ) -> str:
         """
         Format the full knowledge base by chunking and processing with OpenAI.
 
+        By default every request carries the whole conversation so far. With
+        context_outputs, each chunk only sees the last context_outputs formatted
+        chunks, which keeps the request size constant. With max_workers > 1 chunks
+        are formatted independently and concurrently; the output keeps chunk order.
+        With batch_state, the independent chunks are sent as one Batch API job.
+
         Args:
             raw_text (str): The full, raw extracted content.
+            context_outputs (Optional[int]): Number of previous formatted chunks sent
+                as context. None sends the full history.
+            max_workers (int): Number of chunks formatted concurrently. Requires
+                context_outputs to be 0 when greater than 1.
+            batch_state (Optional[str]): State file of a Batch API run; rerunning with
+                the same file resumes the batch. Requests that failed in the batch
+                are formatted directly. Requires context_outputs to be 0.
 
         Returns:
             str: The complete, formatted knowledge base.
         """
+        if (max_workers > 1 or batch_state) and context_outputs != 0:
+            raise ValueError(
+                "Concurrent and batch formatting need independent chunks, "
+                "use context_outputs=0"
+            )
         chunks = self._chunk_text(raw_text)
-        result = ""
-        for chunk in chunks:
-            formatted_chunk = self._format_chunk(chunk, format_knowledge_base_chunk)
-            if formatted_chunk:
-                result += "\n\n" + formatted_chunk
 
-        return result
+        if batch_state:
+            requests = [
+                (
+                    f"chunk-{i}",
+                    self._chunk_request(chunk, format_knowledge_base_chunk, context=[]),
+                )
+                for i, chunk in enumerate(chunks)
+            ]
+            outputs = BatchRunner(self.client, batch_state).run(requests)
+            failed = [
+                i for i, (custom_id, _) in enumerate(requests) if not outputs[custom_id]
+            ]
+            if failed:
+                logging.info(f"Formatting {len(failed)} failed batch requests directly")
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    retried = executor.map(
+                        in_context(
+                            lambda i: self._format_chunk(
+                                chunks[i], format_knowledge_base_chunk, context=[]
+                            )
+                        ),
+                        failed,
+                    )
+                    for i, formatted_chunk in zip(failed, retried):
+                        if not formatted_chunk:
+                            raise RuntimeError(f"Chunk {i + 1} could not be formatted")
+                        outputs[requests[i][0]] = formatted_chunk
+            formatted_chunks = [outputs[custom_id] for custom_id, _ in requests]
+        elif max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                formatted_chunks = list(
+                    executor.map(
+                        in_context(
+                            lambda chunk: self._format_chunk(
+                                chunk, format_knowledge_base_chunk, context=[]
+                            )
+                        ),
+                        chunks,
+                    )
+                )
+        elif context_outputs is not None:
+            window: deque = deque(maxlen=context_outputs)
+            formatted_chunks = []
+            for chunk in chunks:
+                formatted_chunk = self._format_chunk(
+                    chunk, format_knowledge_base_chunk, context=list(window)
+                )
+                if formatted_chunk:
+                    window.append(formatted_chunk)
+                formatted_chunks.append(formatted_chunk)
+        else:
+            formatted_chunks = [
+                self._format_chunk(chunk, format_knowledge_base_chunk)
+                for chunk in chunks
+            ]
+
+        return "".join(
+            "\n\n" + formatted_chunk
+            for formatted_chunk in formatted_chunks
+            if formatted_chunk
+        )
+
+    def _prompt_version(self) -> str:
+        settings = [
+            self.model,
+            str(self.temperature),
+            str(self.max_tokens),
+            str(self.messages[0]["content"]),
+            format_knowledge_base_chunk,
+        ]
+        return hashlib.sha256("\0".join(settings).encode("utf-8")).hexdigest()
+
+    @in_stage("format")
+    def update_knowledge_base(
+        self,
+        raw_text: str,
+        manifest_path: str,
+        max_workers: int = 4,
+        diff_file: Optional[str] = None,
+    ) -> str:
+        """
+        Format the knowledge base incrementally, re-formatting only chunks that are
+        new or changed since the build recorded in the manifest.
+
+        Pages (top-level "# " headings) are chunked separately, so an edit to one
+        page does not shift the chunks of the following ones. Chunks are formatted
+        independently (no shared conversation) and concurrently.
+
+        Args:
+            raw_text (str): The full, raw extracted content.
+            manifest_path (str): JSON manifest of the previous build; updated in place.
+            max_workers (int): Number of chunks formatted concurrently.
+            diff_file (Optional[str]): File receiving a markdown summary of the
+                changed chunks. Defaults to the manifest path with ".diff.md".
+
+        Returns:
+            str: The complete, formatted knowledge base.
+        """
+        manifest = ChunkManifest(manifest_path, self._prompt_version())
+        chunks, titles = [], []
+        for page in re.split(r"\n\n(?=# )", raw_text):
+            page_chunks = self._chunk_text(page)
+            title = chunk_title(page)
+            chunks += page_chunks
+            if len(page_chunks) == 1:
+                titles.append(title)
+            else:
+                titles += [
+                    f"{title} (part {part}/{len(page_chunks)})"
+                    for part in range(1, len(page_chunks) + 1)
+                ]
+        outputs = [manifest.lookup(chunk) for chunk in chunks]
+        pending = [i for i, output in enumerate(outputs) if output is None]
+        logging.info(
+            f"Reusing {len(chunks) - len(pending)} of {len(chunks)} formatted chunks"
+        )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            formatted = executor.map(
+                in_context(
+                    lambda i: self._format_chunk(
+                        chunks[i], format_knowledge_base_chunk, context=[]
+                    )
+                ),
+                pending,
+            )
+            for i, output in zip(pending, formatted):
+                outputs[i] = output
+
+        entries: List[ManifestEntry] = [
+            {
+                "source_sha256": source_hash(chunk),
+                "title": title,
+                "output": output,
+            }
+            for chunk, title, output in zip(chunks, titles, outputs)
+        ]
+        diff = manifest.diff_summary(entries)
+        manifest.save(entries)
+        with open(diff_file or f"{manifest_path}.diff.md", "w", encoding="utf-8") as f:
+            f.write(diff)
+        logging.info(diff.splitlines()[2])
+
+        return "".join("\n\n" + output for output in outputs if output)
 
     def save_to_file(
         self,
@@ -174,23 +574,12 @@ class KnowledgeBaseFormatter:
         with open(output_file, "w") as f:
             f.write(content)
 
-    def generate_question_answer_set(self, filepath: Path, num_pairs: int = 10) -> dict:
+    def _qa_messages(
+        self, chunk: str, num_pairs: int
+    ) -> List["ChatCompletionMessageParam"]:
         """
-        Generate a set of question-answer pairs from a given knowledge base file.
-        This method processes the file content by chunking it and, for each chunk,
-        instructs the model to generate exactly `num_pairs` diverse Q&A pairs.
-        Each call uses a fresh conversation context to avoid interference from prior messages.
-
-        Args:
-            filepath (str): The path to the knowledge base file.
-            num_pairs (int): The number of Q&A pairs to generate per chunk.
-
-        Returns:
-            dict: A dictionary containing all Q&A pairs in the format {"qas": [...] }.
+        Build a fresh conversation asking for num_pairs Q&A pairs about a chunk.
         """
-        knowledge_base = get_file_content(filepath)
-        chunks = self._chunk_text(knowledge_base)
-
         qa_prompt_template = (
             "Based on the following knowledge base text, generate exactly {num_pairs} diverse "
             "question-answer pairs that test key concepts. "
@@ -198,61 +587,181 @@ class KnowledgeBaseFormatter:
             "each with keys 'question' and 'answer'.\n\n"
             "Knowledge base text:\n{chunk_text}"
         )
+        prompt = qa_prompt_template.format(num_pairs=num_pairs, chunk_text=chunk)
+        return [
+            {
+                "role": "system",
+                "content": (
+                    "You are a highly experienced educational content generator. "
+                    f"Your task is to generate exactly {num_pairs} diverse and high-quality question-answer pairs "
+                    "based on the provided knowledge base text. "
+                    "Return only valid JSON with a single key 'qas', whose value is a list of exactly "
+                    f"{num_pairs} objects. Each object must have two keys: 'question' and 'answer'."
+                ),
+            },
+            {"role": "user", "content": prompt},
+        ]
 
-        all_qas = []
-        num_pairs = num_pairs // len(chunks)
-        for i, chunk in enumerate(chunks):
-            prompt = qa_prompt_template.format(num_pairs=num_pairs, chunk_text=chunk)
-            logging.info(f"Processing chunk {i+1} of {len(chunks)}")
-            # Create a fresh set of messages for each chunk to isolate context.
-            qa_messages: list[ChatCompletionMessageParam] = [
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a highly experienced educational content generator. "
-                        f"Your task is to generate exactly {num_pairs} diverse and high-quality question-answer pairs "
-                        "based on the provided knowledge base text. "
-                        "Return only valid JSON with a single key 'qas', whose value is a list of exactly "
-                        f"{num_pairs} objects. Each object must have two keys: 'question' and 'answer'."
-                    ),
-                },
-                {"role": "user", "content": prompt},
-            ]
+    def _parse_qa_pairs(
+        self, resp_text: Optional[str], num_pairs: int, index: int
+    ) -> Optional[List[dict]]:
+        """
+        Parse the Q&A pairs of one chunk from a model response.
 
-            logging.info("Waiting for OpenAI response...")
-            response: ChatCompletion = self.client.chat.completions.create(
-                model=self.model,
-                messages=qa_messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
+        Returns:
+            Optional[List[dict]]: The pairs, or None if the response is malformed.
+        """
+        resp_text = (resp_text or "").strip()
+        logging.debug(f"Raw response for chunk {index+1}: {resp_text}")
+
+        # Remove markdown code fences if present.
+        resp_text = re.sub(r"^```(?:\w+)?\s*", "", resp_text)
+        resp_text = re.sub(r"\s*```$", "", resp_text)
+
+        try:
+            pairs = json.loads(resp_text)["qas"]
+        except (ValueError, KeyError, TypeError) as e:
+            logging.error(f"Error parsing JSON for chunk {index+1}: {e}")
+            logging.debug("Response text was: " + resp_text)
+            return None
+        if not isinstance(pairs, list) or not all(
+            isinstance(pair, dict)
+            and isinstance(pair.get("question"), str)
+            and isinstance(pair.get("answer"), str)
+            for pair in pairs
+        ):
+            logging.error(f"Malformed Q&A pairs in chunk {index+1}")
+            return None
+
+        # Trim extra Q&A pairs, or warn if not enough pairs.
+        if len(pairs) > num_pairs:
+            pairs = pairs[:num_pairs]
+        elif len(pairs) < num_pairs:
+            logging.warning(
+                f"Received only {len(pairs)} pairs instead of {num_pairs} in chunk {index+1}."
             )
-            resp_text = ""
-            if response.choices[0].message.content:
-                resp_text = response.choices[0].message.content.strip()
-                logging.debug(f"Raw response for chunk {i+1}: {resp_text}")
+        return pairs
 
-            # Remove markdown code fences if present.
-            resp_text = re.sub(r"^```(?:\w+)?\s*", "", resp_text)
-            resp_text = re.sub(r"\s*```$", "", resp_text)
+    def _allocate_pairs(self, chunks: List[str], num_pairs: int) -> List[int]:
+        """
+        Split num_pairs over the chunks in proportion to their token counts
+        (largest remainder), so the total is exactly num_pairs.
+        """
+        tokens = [len(self.encoding.encode_ordinary(chunk)) for chunk in chunks]
+        total = sum(tokens) or 1
+        shares = [num_pairs * count / total for count in tokens]
+        counts = [int(share) for share in shares]
+        by_remainder = sorted(
+            range(len(chunks)), key=lambda i: shares[i] - counts[i], reverse=True
+        )
+        for i in by_remainder[: num_pairs - sum(counts)]:
+            counts[i] += 1
+        return counts
+
+    def _qa_request(self, chunk: str, num_pairs: int, max_tokens: int) -> dict:
+        return {
+            "model": self.model,
+            "messages": self._qa_messages(chunk, num_pairs),
+            "temperature": self.temperature,
+            "max_tokens": max_tokens,
+            "response_format": QA_RESPONSE_FORMAT,
+        }
 
+    @in_stage("qa_generation")
+    def generate_question_answer_set(
+        self,
+        filepath: Path,
+        num_pairs: int = 10,
+        batch_state: Optional[str] = None,
+        max_workers: int = 4,
+        max_retries: int = 2,
+        deduplicate: bool = True,
+    ) -> dict:
+        """
+        Generate a set of question-answer pairs from a given knowledge base file.
+        The file content is chunked and the pairs are spread over the chunks in
+        proportion to their token counts. Chunks are processed concurrently, each in
+        a fresh conversation context, with a JSON schema enforced on the response.
+        Chunks whose response cannot be parsed are retried, with a doubled output
+        token limit, while the pairs of the other chunks are kept. Finally,
+        near-duplicate questions from overlapping chunks are removed.
+
+        Args:
+            filepath (str): The path to the knowledge base file.
+            num_pairs (int): The total number of Q&A pairs to generate.
+            batch_state (Optional[str]): State file of a Batch API run. If set, all
+                chunks are sent as one resumable batch job first.
+            max_workers (int): Number of chunks processed concurrently.
+            max_retries (int): Number of retries of the chunks that failed.
+            deduplicate (bool): Remove near-duplicate questions with QADeduplicator.
+
+        Returns:
+            dict: A dictionary containing all Q&A pairs in the format {"qas": [...] }.
+        """
+        from openai import OpenAIError
+
+        knowledge_base = get_file_content(filepath)
+        chunks = self._chunk_text(knowledge_base)
+        pair_counts = self._allocate_pairs(chunks, num_pairs)
+        pending = [i for i, count in enumerate(pair_counts) if count]
+        results: Dict[int, List[dict]] = {}
+
+        if batch_state:
+            requests = [
+                (
+                    f"qa-{i}",
+                    self._qa_request(chunks[i], pair_counts[i], self.max_tokens),
+                )
+                for i in pending
+            ]
+            outputs = BatchRunner(self.client, batch_state).run(requests)
+            for i, (custom_id, _) in zip(pending, requests):
+                pairs = self._parse_qa_pairs(outputs[custom_id], pair_counts[i], i)
+                if pairs is not None:
+                    results[i] = pairs
+
+        def generate(i: int, max_tokens: int) -> Optional[List[dict]]:
+            logging.info(f"Processing chunk {i+1} of {len(chunks)}")
             try:
-                json_output = json.loads(resp_text)
-                if "qas" in json_output and isinstance(json_output["qas"], list):
-                    pairs = json_output["qas"]
-                    # Trim extra Q&A pairs, or warn if not enough pairs.
-                    if len(pairs) > num_pairs:
-                        pairs = pairs[:num_pairs]
-                    elif len(pairs) < num_pairs:
-                        logging.warning(
-                            f"Received only {len(pairs)} pairs instead of {num_pairs} in chunk {i+1}."
-                        )
-                    all_qas.extend(pairs)
-            except Exception as e:
-                logging.error(f"Error parsing JSON for chunk {i+1}: {e}")
-                logging.debug("Response text was: " + resp_text)
-                continue
+                response: ChatCompletion = self.client.chat.completions.create(
+                    **self._qa_request(chunks[i], pair_counts[i], max_tokens)
+                )
+            except OpenAIError as e:
+                logging.error(f"Error generating Q&A pairs for chunk {i+1}: {e}")
+                return None
+            return self._parse_qa_pairs(
+                response.choices[0].message.content, pair_counts[i], i
+            )
+
+        for attempt in range(max_retries + 1):
+            pending = [i for i in pending if i not in results]
+            if not pending:
+                break
+            if attempt or batch_state:
+                logging.info(f"Retrying {len(pending)} failed chunks")
+            max_tokens = self.max_tokens * 2**attempt
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                generated = executor.map(
+                    in_context(lambda i: generate(i, max_tokens)), pending
+                )
+                for i, pairs in zip(pending, generated):
+                    if pairs is not None:
+                        results[i] = pairs
+
+        failed = [i + 1 for i in pending if i not in results]
+        if failed:
+            logging.error(
+                f"No Q&A pairs for chunks {failed} after {max_retries} retries"
+            )
 
+        all_qas = [pair for i in sorted(results) for pair in results[i]]
         result = {"qas": all_qas}
+        if deduplicate:
+            from ai_assistant_tester.knowledge_base.QADeduplicator import (
+                QADeduplicator,
+            )
+
+            result, _ = QADeduplicator().deduplicate(result)
         logging.info("Aggregated Q&A result generated.")
         return result
 
@@ -265,10 +774,8 @@ if __name__ == "__main__":
 
     formatter = KnowledgeBaseFormatter(model="gpt-4o", max_tokens_per_chunk=1000)
 
-    raw = formatter.crawl_site("https://example.com", cli=True)
-    formatted = formatter.format_knowledge_base(raw)
-    formatter.save_to_file(
-        content=formatted, output_file=KNOWLEDGE_BASE_OUTPUTS_DIR / "example.md"
+    formatter.crawl_and_format(
+        "https://example.com", KNOWLEDGE_BASE_OUTPUTS_DIR / "example.md", cli=True
     )
 
     qa_set = formatter.generate_question_answer_set(
@@ -276,3 +783,11 @@ if __name__ == "__main__":
     )
     with open(QA_PAIRS_DIR / "example.json", "w") as f:
         json.dump(qa_set, f, indent=2)
+
+    ledger = get_ledger()
+    logging.info("LLM usage:\n" + ledger.report())
+    llm_cache = get_llm_cache()
+    if llm_cache:
+        logging.info(f"LLM cache {llm_cache.path}: {llm_cache.stats()}")
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+    ledger.write_summary(USAGE_REPORTS_DIR / f"usage-{run_id}.json")
@@ -0,0 +1,230 @@
+import argparse
+import json
+import logging
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Tuple, TypedDict
+
+import numpy as np
+
+from ai_assistant_tester.utils.utils import QAPair, QAPairs, load_json_file_qa_pairs
+
+_WORD = re.compile(r"\w+")
+SHINGLE_SIZE = 4
+
+
+class DuplicateCluster(TypedDict):
+    kept: str
+    removed: List[str]
+
+
+class DedupReport(TypedDict):
+    total: int
+    kept: int
+    removed: int
+    clusters: List[DuplicateCluster]
+
+
+def _normalize(question: str) -> str:
+    return " ".join(_WORD.findall(question.lower()))
+
+
+class QADeduplicator:
+    """
+    Removes near-duplicate questions from a Q&A set, offline.
+
+    Every question gets a MinHash signature of its character 4-grams, and locality
+    sensitive hashing over bands of the signatures finds candidate pairs without
+    comparing all pairs. Candidates whose TF-IDF cosine similarity reaches the
+    threshold are duplicates. Questions are clustered around the first question of
+    each cluster, so similarity does not chain through unrelated questions, and
+    every cluster keeps its most representative question: the one most similar
+    to the rest of the cluster.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.75,
+        num_perm: int = 64,
+        bands: int = 16,
+        seed: int = 0,
+    ):
+        """
+        Initialize the deduplicator.
+
+        :param threshold: TF-IDF cosine similarity of two questions from which they
+            count as duplicates.
+        :param num_perm: Number of hash functions of a MinHash signature.
+        :param bands: Number of LSH bands; must divide num_perm. More bands find
+            more candidate pairs of low similarity.
+        :param seed: Seed of the hash functions.
+        """
+        if num_perm % bands:
+            raise ValueError(f"bands ({bands}) must divide num_perm ({num_perm})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hash functions: h(x) = (a * x + b) >> 32, with odd a.
+        self._a = rng.integers(0, 2**63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+
+    def signatures(self, questions: List[str], block: int = 256) -> np.ndarray:
+        """
+        Return the MinHash signatures of the questions, one row per question.
+        """
+        signatures = np.empty((len(questions), self.num_perm), dtype=np.uint32)
+        for start in range(0, len(questions), block):
+            texts = [
+                _normalize(q).ljust(SHINGLE_SIZE).encode("utf-8")
+                for q in questions[start : start + block]
+            ]
+            lengths = np.array([len(t) - SHINGLE_SIZE + 1 for t in texts])
+            data = np.frombuffer(b"".join(texts), dtype=np.uint8).astype(np.uint32)
+            # Pack every 4 consecutive bytes into one integer, then drop the
+            # shingles that span two questions.
+            shingles = (
+                data[:-3] << np.uint32(24)
+                | data[1:-2] << np.uint32(16)
+                | data[2:-1] << np.uint32(8)
+                | data[3:]
+            )
+            text_starts = np.concatenate(([0], np.cumsum([len(t) for t in texts])))
+            keep = np.concatenate(
+                [np.arange(s, s + n) for s, n in zip(text_starts[:-1], lengths)]
+            )
+            hashed = shingles[keep].astype(np.uint64)[:, None] * self._a
+            hashed += self._b
+            hashed >>= np.uint64(32)
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            signatures[start : start + len(texts)] = np.minimum.reduceat(
+                hashed, offsets, axis=0
+            )
+        return signatures
+
+    def candidate_pairs(self, signatures: np.ndarray) -> np.ndarray:
+        """
+        Return the (i, j) index pairs, i < j, of questions sharing an LSH bucket.
+        Within a bucket every question is paired with the first one and with its
+        predecessor, so a bucket of many similar questions stays linear in size.
+        """
+        n = len(signatures)
+        rows = self.num_perm // self.bands
+        candidates = []
+        for band in range(self.bands):
+            columns = signatures[:, band * rows : (band + 1) * rows]
+            bucket = columns.astype(np.uint64) @ self._a[:rows]
+            order = np.argsort(bucket, kind="stable")
+            sorted_buckets = bucket[order]
+            same = sorted_buckets[1:] == sorted_buckets[:-1]
+            starts = np.where(np.concatenate(([False], same)), 0, np.arange(n))
+            bucket_first = order[np.maximum.accumulate(starts)]
+            candidates.append(order[1:][same] * n + bucket_first[1:][same])
+            candidates.append(order[1:][same] * n + order[:-1][same])
+        if not candidates:
+            return np.empty((0, 2), dtype=np.int64)
+        keys = np.unique(np.concatenate(candidates))
+        pairs = np.stack((keys % n, keys // n), axis=1)
+        return pairs[pairs[:, 0] != pairs[:, 1]]
+
+    @staticmethod
+    def _tfidf(questions: List[str]) -> List[Dict[str, float]]:
+        """
+        Return the L2-normalized TF-IDF vectors of the questions' words.
+        """
+        words = [_WORD.findall(q.lower()) for q in questions]
+        document_frequency = Counter(w for ws in words for w in set(ws))
+        n = len(questions)
+        vectors = []
+        for ws in words:
+            weights = {
+                w: count * (math.log((1 + n) / (1 + document_frequency[w])) + 1)
+                for w, count in Counter(ws).items()
+            }
+            norm = math.sqrt(sum(x * x for x in weights.values())) or 1.0
+            vectors.append({w: x / norm for w, x in weights.items()})
+        return vectors
+
+    @staticmethod
+    def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+        if len(a) > len(b):
+            a, b = b, a
+        return sum(x * b[w] for w, x in a.items() if w in b)
+
+    def deduplicate(self, qa_pairs: QAPairs) -> Tuple[QAPairs, DedupReport]:
+        """
+        Remove near-duplicate questions, keeping one question per cluster.
+
+        :param qa_pairs: Q&A set in the format {"qas": [...]}.
+        :return: The deduplicated set, in the original order, and a report of the
+            removed questions per cluster.
+        """
+        qas: List[QAPair] = qa_pairs["qas"]
+        questions = [qa["question"] for qa in qas]
+        vectors = self._tfidf(questions)
+        neighbours: Dict[int, List[int]] = {}
+        for i, j in self.candidate_pairs(self.signatures(questions)).tolist():
+            if self._cosine(vectors[i], vectors[j]) >= self.threshold:
+                neighbours.setdefault(i, []).append(j)
+
+        # Leader clustering: an unassigned question starts a cluster that takes
+        # its unassigned duplicates.
+        assigned = set()
+        clusters: List[List[int]] = []
+        for i in sorted(neighbours):
+            if i in assigned:
+                continue
+            members = [i] + [j for j in neighbours[i] if j not in assigned]
+            if len(members) > 1:
+                assigned.update(members)
+                clusters.append(members)
+
+        removed = set()
+        report_clusters: List[DuplicateCluster] = []
+        for members in clusters:
+            centrality = [
+                sum(self._cosine(vectors[m], vectors[o]) for o in members)
+                for m in members
+            ]
+            kept = members[centrality.index(max(centrality))]
+            removed.update(m for m in members if m != kept)
+            report_clusters.append(
+                {
+                    "kept": questions[kept],
+                    "removed": [questions[m] for m in members if m != kept],
+                }
+            )
+
+        report: DedupReport = {
+            "total": len(qas),
+            "kept": len(qas) - len(removed),
+            "removed": len(removed),
+            "clusters": report_clusters,
+        }
+        logging.info(
+            f"Removed {len(removed)} near-duplicate questions of {len(qas)} "
+            f"in {len(clusters)} clusters"
+        )
+        return {"qas": [qa for i, qa in enumerate(qas) if i not in removed]}, report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(
+        description="Remove near-duplicate questions from a Q&A set."
+    )
+    parser.add_argument("input", help="Q&A set JSON file")
+    parser.add_argument("-o", "--output", help="Output file; defaults to the input")
+    parser.add_argument("--threshold", type=float, default=0.75)
+    parser.add_argument("--report", help="Write the removed clusters to this file")
+    args = parser.parse_args()
+
+    deduplicated, dedup_report = QADeduplicator(args.threshold).deduplicate(
+        load_json_file_qa_pairs(args.input)
+    )
+    with open(args.output or args.input, "w", encoding="utf-8") as f:
+        json.dump(deduplicated, f, indent=2)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(dedup_report, f, indent=2)
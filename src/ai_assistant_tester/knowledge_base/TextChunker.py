@@ -0,0 +1,133 @@
+import re
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Tuple
+
+if TYPE_CHECKING:
+    import tiktoken
+
+PARAGRAPH_SEPARATOR = "\n\n"
+
+# Zero-width split points after a line break or after a sentence end.
+_BREAK_POINT = re.compile(r"(?<=\n)|(?<=[.!?]\s)")
+_HEADING = re.compile(r"#{1,6}\s")
+
+
+class TextChunker:
+    """
+    Splits text into chunks of at most max_tokens tokens along paragraph boundaries.
+
+    Every paragraph is encoded once and chunk sizes are tracked as running token
+    counts, so chunking is linear in the input size. Paragraphs longer than
+    max_tokens are split at line and sentence boundaries, and lines or sentences
+    that are still too long at token boundaries. In heading-aware mode, markdown
+    sections (a heading and the paragraphs up to the next heading) are kept together
+    when they fit in one chunk, and a section that does not fit in the current chunk
+    starts a new one.
+    """
+
+    def __init__(
+        self,
+        encoding: "tiktoken.Encoding",
+        max_tokens: int = 1000,
+        heading_aware: bool = False,
+    ):
+        """
+        Configure the chunker.
+
+        :param encoding: Tokenizer of the model the chunks are sent to.
+        :param max_tokens: Maximum number of tokens per chunk.
+        :param heading_aware: If True, keep markdown sections together.
+        """
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        self.encoding = encoding
+        self.max_tokens = max_tokens
+        self.heading_aware = heading_aware
+        self._separator_tokens = len(encoding.encode_ordinary(PARAGRAPH_SEPARATOR))
+
+    def chunk(self, text: str) -> List[str]:
+        """
+        Split text into chunks.
+
+        :param text: Full input text, with paragraphs separated by blank lines.
+        :return: Chunks in input order.
+        """
+        paragraphs = [p for p in text.split(PARAGRAPH_SEPARATOR) if p.strip()]
+        encoded = self.encoding.encode_ordinary_batch(paragraphs)
+        units = zip(paragraphs, (len(tokens) for tokens in encoded))
+        if self.heading_aware:
+            return self._pack(self._sections(units))
+        return self._pack(self._fit(units))
+
+    def _joined_size(self, sizes: List[int]) -> int:
+        return sum(sizes) + self._separator_tokens * (len(sizes) - 1)
+
+    def _sections(
+        self, paragraphs: Iterable[Tuple[str, int]]
+    ) -> Iterator[Tuple[str, int]]:
+        """
+        Group paragraphs into markdown sections. A section that fits in one chunk is
+        yielded as a single unit, a larger one paragraph by paragraph.
+        """
+        section: List[Tuple[str, int]] = []
+
+        def flush() -> Iterator[Tuple[str, int]]:
+            size = self._joined_size([n for _, n in section])
+            if size <= self.max_tokens:
+                yield PARAGRAPH_SEPARATOR.join(p for p, _ in section), size
+            else:
+                yield from self._fit(section)
+
+        for paragraph, size in paragraphs:
+            if section and _HEADING.match(paragraph.lstrip()):
+                yield from flush()
+                section = []
+            section.append((paragraph, size))
+        if section:
+            yield from flush()
+
+    def _fit(self, paragraphs: Iterable[Tuple[str, int]]) -> Iterator[Tuple[str, int]]:
+        """
+        Yield paragraphs, splitting those over max_tokens into groups of lines and
+        sentences and, for overlong lines or sentences, into token windows.
+        """
+        for paragraph, size in paragraphs:
+            if size <= self.max_tokens:
+                yield paragraph, size
+                continue
+            # The pieces keep their whitespace, so joining them restores the text.
+            pieces: List[Tuple[str, int]] = []
+            parts = [part for part in _BREAK_POINT.split(paragraph) if part]
+            for part, tokens in zip(parts, self.encoding.encode_ordinary_batch(parts)):
+                if len(tokens) <= self.max_tokens:
+                    pieces.append((part, len(tokens)))
+                    continue
+                for start in range(0, len(tokens), self.max_tokens):
+                    window = tokens[start : start + self.max_tokens]
+                    pieces.append((self.encoding.decode(window), len(window)))
+            for text, text_size in self._pack_pieces(pieces, ""):
+                if text.strip():
+                    yield text.strip(), text_size
+
+    def _pack_pieces(
+        self, pieces: List[Tuple[str, int]], separator: str
+    ) -> Iterator[Tuple[str, int]]:
+        separator_tokens = (
+            len(self.encoding.encode_ordinary(separator)) if separator else 0
+        )
+        current: List[str] = []
+        current_size = 0
+        for piece, size in pieces:
+            if current and current_size + separator_tokens + size > self.max_tokens:
+                yield separator.join(current), current_size
+                current, current_size = [], 0
+            current_size += size + (separator_tokens if current else 0)
+            current.append(piece)
+        if current:
+            yield separator.join(current), current_size
+
+    def _pack(self, units: Iterable[Tuple[str, int]]) -> List[str]:
+        """
+        Greedily fill chunks with units in order, each unit at most max_tokens.
+        """
+        packed = self._pack_pieces(list(units), PARAGRAPH_SEPARATOR)
+        return [text for text, _ in packed]
@@ -21,6 +21,13 @@ Provided text:
 {chunk_text}
 """
 
+numbered_question_batch = """
+Answer each of the following {count} questions. Start every answer on a new line with the question's number followed by a period (for example "1. "), keep the answers in question order, and do not use numbered lists inside an answer.
+
+Questions:
+{questions}
+"""
+
 
 system_answer_evaluation = """
 You are an expert QA evaluator. Your job is to look at each question, the “reference answer” (the ideal answer), and the “assistant answer” (what the chatbot actually produced). For each item, decide whether the assistant answer is:
@@ -0,0 +1,170 @@
+import sqlite3
+from collections import deque
+from typing import Optional, Tuple
+
+
+class CrawlFrontier:
+    """
+    In-memory breadth-first crawl frontier: a FIFO queue of pending URLs and the
+    set of URLs that were already seen.
+    """
+
+    def __init__(self, seen=None):
+        """
+        Create an empty frontier.
+
+        :param seen: Set-like container for seen URLs (see SeenSet), a plain set by
+            default.
+        """
+        self.seen = seen if seen is not None else set()
+        self._pending = deque()
+
+    def add_seen(self, url: str) -> bool:
+        """
+        Record the URL as seen.
+
+        :param url: Normalized URL.
+        :return: True if the URL had not been seen before.
+        """
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+        return True
+
+    def push(self, url: str, depth: int):
+        """
+        Queue a URL for crawling.
+
+        :param url: Normalized URL.
+        :param depth: Depth at which the URL was found.
+        """
+        self._pending.append((url, depth))
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        """
+        Take the next URL to crawl.
+
+        :return: A (url, depth) tuple, or None if the frontier is empty.
+        """
+        if not self._pending:
+            return None
+        return self._pending.popleft()
+
+    def mark_done(self, url: str):
+        """
+        Record that a popped URL was fully processed.
+
+        :param url: URL returned earlier by pop().
+        """
+
+    def checkpoint(self):
+        """
+        Persist the frontier state; a resumed crawl starts from the last checkpoint.
+        """
+
+    def close(self):
+        pass
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+class _SqliteSeenSet:
+    """Set-like view over the 'seen' table of a SqliteCrawlFrontier."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._connection = connection
+
+    def add(self, url: str) -> bool:
+        cursor = self._connection.execute(
+            "INSERT OR IGNORE INTO seen (url) VALUES (?)", (url,)
+        )
+        return cursor.rowcount > 0
+
+    def __contains__(self, url: object) -> bool:
+        row = self._connection.execute(
+            "SELECT 1 FROM seen WHERE url = ?", (url,)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+
+class SqliteCrawlFrontier(CrawlFrontier):
+    """
+    Crawl frontier checkpointed to a SQLite file, so memory use does not grow with
+    the size of the crawl and an interrupted crawl can be resumed.
+
+    Changes are committed at every checkpoint(). URLs that were popped but not
+    marked done before the last checkpoint (in flight when the process stopped)
+    are queued again on resume.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        """
+        Open or create the frontier database.
+
+        :param path: Path to the SQLite state file.
+        :param resume: If True, keep the state of a previous crawl, otherwise reset it.
+        """
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS seen (url TEXT PRIMARY KEY) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS frontier (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                in_progress INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS frontier_url ON frontier (url);
+            """
+        )
+        if resume:
+            self._connection.execute("UPDATE frontier SET in_progress = 0")
+        else:
+            self._connection.execute("DELETE FROM seen")
+            self._connection.execute("DELETE FROM frontier")
+        self._connection.commit()
+        self.seen = _SqliteSeenSet(self._connection)
+
+    def add_seen(self, url: str) -> bool:
+        return self.seen.add(url)
+
+    def push(self, url: str, depth: int):
+        self._connection.execute(
+            "INSERT INTO frontier (url, depth) VALUES (?, ?)", (url, depth)
+        )
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        row = self._connection.execute(
+            "SELECT id, url, depth FROM frontier WHERE in_progress = 0 "
+            "ORDER BY id LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        self._connection.execute(
+            "UPDATE frontier SET in_progress = 1 WHERE id = ?", (row[0],)
+        )
+        return row[1], row[2]
+
+    def mark_done(self, url: str):
+        self._connection.execute(
+            "DELETE FROM frontier WHERE url = ? AND in_progress = 1", (url,)
+        )
+
+    def checkpoint(self):
+        self._connection.commit()
+
+    def close(self):
+        # Uncommitted work of unfinished pages is dropped, they are re-crawled on resume.
+        self._connection.close()
+
+    def __len__(self) -> int:
+        return self._connection.execute(
+            "SELECT COUNT(*) FROM frontier WHERE in_progress = 0"
+        ).fetchone()[0]
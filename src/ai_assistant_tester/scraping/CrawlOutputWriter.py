@@ -0,0 +1,225 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, TypedDict
+
+OUTPUT_FORMATS = ("markdown", "jsonl", "sharded")
+
+MARKDOWN_HEADER = "# Scraped Knowledge Base\n\n"
+
+
+class IndexEntry(TypedDict):
+    url: str
+    shard: str
+    offset: int
+    length: int
+    sha256: str
+
+
+def index_path_for(output_file: str) -> Path:
+    """
+    Return the path of the URL index written next to a crawl output.
+
+    :param output_file: Path given as the crawler output file.
+    """
+    path = Path(output_file)
+    return path.with_name(path.name + ".index.jsonl")
+
+
+class CrawlOutputWriter:
+    """
+    Writes crawled pages through a file kept open for the whole crawl, in batches.
+
+    Formats:
+      * markdown: one file with ``<!-- URL: ... -->`` separated pages (as before),
+      * jsonl: one ``{"url", "content"}`` object per line,
+      * sharded: jsonl split into files of ``pages_per_shard`` pages.
+
+    Next to the output an index (``<output>.index.jsonl``) maps every URL to its
+    shard, byte offset, byte length and content hash, so that CrawlOutputReader
+    can read one page back with a single seek.
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        output_format: str = "markdown",
+        batch_size: int = 50,
+        pages_per_shard: int = 1000,
+        append: bool = False,
+    ):
+        """
+        Open the output for writing.
+
+        :param output_file: Output file path (base name of the shards if sharded).
+        :param output_format: One of OUTPUT_FORMATS.
+        :param batch_size: Number of pages buffered before they are written.
+        :param pages_per_shard: Number of pages per shard for the sharded format.
+        :param append: If True, continue an existing output instead of truncating it.
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(
+                f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}"
+            )
+        self.output_file = Path(output_file)
+        self.output_format = output_format
+        self.batch_size = max(1, batch_size)
+        self.pages_per_shard = max(1, pages_per_shard)
+        self.index_file = index_path_for(output_file)
+
+        self._buffer: List[bytes] = []
+        self._index_buffer: List[IndexEntry] = []
+        self._shard_number = 0
+        self._pages_in_shard = 0
+
+        if append and self.index_file.exists():
+            entries = list(_read_index(self.index_file))
+            if output_format == "sharded" and entries:
+                self._shard_number = len({entry["shard"] for entry in entries}) - 1
+                last_shard = entries[-1]["shard"]
+                self._pages_in_shard = sum(e["shard"] == last_shard for e in entries)
+        elif not append:
+            self.index_file.write_text("", encoding="utf-8")
+
+        self._file = self._open_shard(append)
+        self._index = open(self.index_file, "a", encoding="utf-8")
+
+    def _shard_path(self) -> Path:
+        if self.output_format != "sharded":
+            return self.output_file
+        stem, suffix = self.output_file.stem, self.output_file.suffix or ".jsonl"
+        return self.output_file.with_name(f"{stem}-{self._shard_number:05d}{suffix}")
+
+    def _open_shard(self, append: bool):
+        path = self._shard_path()
+        f = open(path, "ab" if append else "wb")
+        if not append and self.output_format == "markdown":
+            f.write(MARKDOWN_HEADER.encode("utf-8"))
+        self._offset = f.tell()
+        return f
+
+    def _encode(self, url: str, content: str) -> Tuple[bytes, int, int]:
+        """
+        Return the bytes to write and the offset and length of the indexed record
+        within them.
+        """
+        if self.output_format == "markdown":
+            prefix = f"\n\n<!-- URL: {url} -->\n\n".encode("utf-8")
+            body = content.encode("utf-8")
+            return prefix + body + b"\n\n", len(prefix), len(body)
+        line = json.dumps({"url": url, "content": content}, ensure_ascii=False)
+        record = (line + "\n").encode("utf-8")
+        return record, 0, len(record) - 1
+
+    def write(self, url: str, content: str):
+        """
+        Buffer one page; the buffer is written out every batch_size pages.
+
+        :param url: URL of the page.
+        :param content: Markdown content of the page.
+        """
+        if (
+            self.output_format == "sharded"
+            and self._pages_in_shard >= self.pages_per_shard
+        ):
+            self.flush()
+            self._file.close()
+            self._shard_number += 1
+            self._pages_in_shard = 0
+            self._file = self._open_shard(append=False)
+
+        data, record_offset, record_length = self._encode(url, content)
+        self._index_buffer.append(
+            {
+                "url": url,
+                "shard": self._shard_path().name,
+                "offset": self._offset + record_offset,
+                "length": record_length,
+                "sha256": hashlib.sha256(content.encode("utf-8")).hexdigest(),
+            }
+        )
+        self._buffer.append(data)
+        self._offset += len(data)
+        self._pages_in_shard += 1
+
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered pages and their index entries.
+        """
+        if not self._buffer:
+            return
+        self._file.write(b"".join(self._buffer))
+        self._file.flush()
+        self._index.write(
+            "".join(json.dumps(entry) + "\n" for entry in self._index_buffer)
+        )
+        self._index.flush()
+        self._buffer.clear()
+        self._index_buffer.clear()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+        self._index.close()
+
+
+def _read_index(index_file: Path) -> Iterator[IndexEntry]:
+    with open(index_file, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class CrawlOutputReader:
+    """
+    Reads pages back from a crawl output through its URL index, without parsing
+    the whole dump.
+    """
+
+    def __init__(self, output_file: str, output_format: str = "markdown"):
+        """
+        Load the URL index of a crawl output.
+
+        :param output_file: Path that was given to CrawlOutputWriter.
+        :param output_format: Format the output was written in, one of OUTPUT_FORMATS.
+        """
+        self.output_format = output_format
+        self.index_file = index_path_for(output_file)
+        self.directory = self.index_file.parent
+        self.entries: Dict[str, IndexEntry] = {}
+        for entry in _read_index(self.index_file):
+            self.entries[entry["url"]] = entry
+
+    def urls(self) -> List[str]:
+        return list(self.entries)
+
+    def read(self, url: str) -> Optional[str]:
+        """
+        Return the markdown content of one page, or None if it is not in the index.
+
+        :param url: URL of the page.
+        """
+        entry = self.entries.get(url)
+        if entry is None:
+            return None
+        with open(self.directory / entry["shard"], "rb") as f:
+            f.seek(entry["offset"])
+            record = f.read(entry["length"]).decode("utf-8")
+        if self.output_format == "markdown":
+            return record
+        return json.loads(record)["content"]
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        """
+        Yield (url, content) pairs in crawl order.
+        """
+        for url in self.entries:
+            content = self.read(url)
+            if content is not None:
+                yield url, content
+
+    def __len__(self) -> int:
+        return len(self.entries)
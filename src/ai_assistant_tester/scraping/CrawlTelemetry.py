@@ -0,0 +1,233 @@
+import heapq
+import json
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, TypedDict
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.util.connection import allowed_gai_family
+
+# Phases of a page, in the order they happen.
+PHASES = ("dns", "connect", "wait", "transfer", "parse", "write", "total")
+
+_local = threading.local()
+
+
+class FetchRecord(TypedDict):
+    url: str
+    started_at: float
+    status: str
+    http_status: Optional[int]
+    dns_ms: float
+    connect_ms: float
+    wait_ms: float
+    transfer_ms: float
+    parse_ms: float
+    write_ms: float
+    total_ms: float
+    response_bytes: int
+    markdown_bytes: int
+
+
+class _TimedConnectionMixin:
+    """
+    Times DNS resolution and connection setup of new connections for the record
+    bound to the current thread. Reused keep-alive connections add no time.
+    """
+
+    def _new_conn(self):
+        record = getattr(_local, "record", None)
+        if record is None:
+            return super()._new_conn()
+        start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(
+                self._dns_host.strip("[]"),
+                self.port,
+                allowed_gai_family(),
+                socket.SOCK_STREAM,
+            )
+        except (OSError, UnicodeError):
+            # Let urllib3 resolve the host itself and raise its usual error.
+            return super()._new_conn()
+        finally:
+            record["dns_ms"] += (time.perf_counter() - start) * 1000
+
+        # Connect to the resolved addresses in turn, as urllib3 would, without
+        # looking the host up again.
+        host = self._dns_host
+        try:
+            for *_, sockaddr in addresses:
+                self._dns_host = sockaddr[0]
+                try:
+                    return super()._new_conn()
+                except ConnectTimeoutError as e:
+                    error = e
+            raise error
+        finally:
+            self._dns_host = host
+
+    def connect(self):
+        record = getattr(_local, "record", None)
+        if record is None:
+            return super().connect()
+        dns_ms = record["dns_ms"]
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            record["connect_ms"] += elapsed - (record["dns_ms"] - dns_ms)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimingHTTPAdapter(HTTPAdapter):
+    """
+    Pooled HTTP adapter whose new connections report DNS and connect times to
+    the FetchRecord bound with CrawlTelemetry.bind().
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class CrawlTelemetry:
+    """
+    Collects per-URL timings of a crawl, writes them to a JSONL trace and builds
+    an end-of-crawl profile with latency percentiles per phase and the slowest URLs.
+
+    Phases: dns (resolution for new connections), connect (TCP and TLS setup of new
+    connections), wait (request sent until response headers), transfer (reading
+    the body), parse (HTML to markdown), write (saving the page to the output).
+    """
+
+    def __init__(self, trace_file: Optional[str] = None, slowest: int = 10):
+        """
+        Initialize the collector.
+
+        :param trace_file: Path of the JSONL trace, one record per URL; None to
+            only keep the aggregated profile.
+        :param slowest: Number of slowest URLs listed in the report.
+        """
+        self.slowest = slowest
+        self._lock = threading.Lock()
+        self._trace = open(trace_file, "w", encoding="utf-8") if trace_file else None
+        self._phase_times: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+        self._slowest_heap: List[tuple] = []
+        self._started = time.perf_counter()
+        self.pages = 0
+
+    def begin(self, url: str) -> FetchRecord:
+        """
+        Start the record of one URL.
+
+        :param url: URL about to be fetched.
+        """
+        return {
+            "url": url,
+            "started_at": time.time(),
+            "status": "",
+            "http_status": None,
+            "dns_ms": 0.0,
+            "connect_ms": 0.0,
+            "wait_ms": 0.0,
+            "transfer_ms": 0.0,
+            "parse_ms": 0.0,
+            "write_ms": 0.0,
+            "total_ms": 0.0,
+            "response_bytes": 0,
+            "markdown_bytes": 0,
+        }
+
+    @staticmethod
+    def bind(record: Optional[FetchRecord]):
+        """
+        Attach a record to the current thread, so connection timings land in it.
+
+        :param record: Record returned by begin(), or None to detach.
+        """
+        _local.record = record
+
+    def end(self, record: FetchRecord, status: str):
+        """
+        Complete a record, write it to the trace and add it to the profile.
+
+        :param record: Record returned by begin().
+        :param status: Final fetch status of the URL.
+        """
+        record["status"] = status
+        record["total_ms"] = (time.time() - record["started_at"]) * 1000
+        for key in record:
+            if key.endswith("_ms"):
+                record[key] = round(record[key], 3)
+
+        with self._lock:
+            self.pages += 1
+            for phase in PHASES:
+                self._phase_times[phase].append(record[f"{phase}_ms"])
+            entry = (record["total_ms"], record["url"])
+            if len(self._slowest_heap) < self.slowest:
+                heapq.heappush(self._slowest_heap, entry)
+            else:
+                heapq.heappushpop(self._slowest_heap, entry)
+            if self._trace:
+                self._trace.write(json.dumps(record) + "\n")
+
+    def report(self) -> str:
+        """
+        Return the crawl profile: p50/p95/p99 latency per phase and the slowest URLs.
+        """
+        elapsed = time.perf_counter() - self._started
+        lines = [
+            f"Crawl profile: {self.pages} URLs in {elapsed:.2f}s",
+            f"{'phase':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'sum s':>10}",
+        ]
+        with self._lock:
+            for phase in PHASES:
+                values = sorted(self._phase_times[phase])
+                lines.append(
+                    f"{phase:>10} {_percentile(values, 0.50):>10.1f} "
+                    f"{_percentile(values, 0.95):>10.1f} "
+                    f"{_percentile(values, 0.99):>10.1f} "
+                    f"{sum(values) / 1000:>10.2f}"
+                )
+            slowest = sorted(self._slowest_heap, reverse=True)
+        if slowest:
+            lines.append("Slowest URLs:")
+            lines.extend(f"{total:>10.1f} ms  {url}" for total, url in slowest)
+        return "\n".join(lines)
+
+    def close(self):
+        if self._trace:
+            self._trace.close()
+            self._trace = None
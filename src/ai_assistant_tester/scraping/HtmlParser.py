@@ -0,0 +1,137 @@
+from typing import List, TypedDict
+from urllib.parse import urljoin
+
+PARSER_BACKENDS = ("html.parser", "lxml", "selectolax")
+
+TAGS_TO_REMOVE = [
+    "script",
+    "style",
+    "img",
+    "svg",
+    "canvas",
+    "noscript",
+    "iframe",
+    "header",
+    "footer",
+    "nav",
+    "form",
+    "link",
+    "meta",
+]
+
+
+class ParsedPage(TypedDict):
+    markdown: str
+    links: List[str]
+
+
+def available_backends() -> List[str]:
+    """
+    Return the parser backends whose dependencies are installed.
+    """
+    backends = ["html.parser"]
+    try:
+        import lxml  # noqa: F401
+
+        backends.append("lxml")
+    except ImportError:
+        pass
+    try:
+        import selectolax.lexbor  # noqa: F401
+
+        backends.append("selectolax")
+    except ImportError:
+        pass
+    return backends
+
+
+def check_backend(backend: str) -> None:
+    """
+    Raise if the backend is unknown or its optional dependency is missing.
+
+    :param backend: One of PARSER_BACKENDS.
+    """
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(
+            f"Unknown parser backend '{backend}', expected one of {PARSER_BACKENDS}"
+        )
+    if backend not in available_backends():
+        raise ImportError(
+            f"Parser backend '{backend}' is not installed (pip install {backend})"
+        )
+
+
+def _keep_link(href: str) -> bool:
+    # Skip links that are just anchors or javascript or mailto links.
+    return not (
+        href.startswith("#")
+        or href.startswith("mailto:")
+        or href.startswith("javascript:")
+    )
+
+
+def _to_markdown(title: str, text: str) -> str:
+    # Clean up text: remove extra whitespace and empty lines.
+    lines = [line.strip() for line in text.splitlines()]
+    cleaned_text = "\n".join(line for line in lines if line)
+    return f"# {title}\n\n" + cleaned_text
+
+
+def _parse_with_soup(html: str, base_url: str, backend: str) -> ParsedPage:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, backend)
+
+    # Links are collected before cleaning, so navigation links are still followed.
+    links = [
+        urljoin(base_url, a.get("href"))
+        for a in soup.find_all("a", href=True)
+        if _keep_link(a.get("href"))
+    ]
+
+    for tag in soup.find_all(TAGS_TO_REMOVE):
+        tag.decompose()
+
+    # Use the <title> tag if available, otherwise use the URL.
+    if soup.title:
+        title = soup.title.get_text().strip()
+    else:
+        title = base_url
+
+    markdown = _to_markdown(title, soup.get_text(separator="\n"))
+    return {"markdown": markdown, "links": links}
+
+
+def _parse_with_selectolax(html: str, base_url: str) -> ParsedPage:
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+
+    links = []
+    for a in tree.css("a[href]"):
+        href = a.attributes.get("href") or ""
+        if _keep_link(href):
+            links.append(urljoin(base_url, href))
+
+    tree.strip_tags(TAGS_TO_REMOVE)
+
+    title_node = tree.css_first("title")
+    title = title_node.text().strip() if title_node else base_url
+
+    text = tree.root.text(separator="\n") if tree.root else ""
+    return {"markdown": _to_markdown(title, text), "links": links}
+
+
+def parse_page(html: str, base_url: str, backend: str = "html.parser") -> ParsedPage:
+    """
+    Parse a page once and return both its cleaned markdown and its links.
+
+    :param html: Raw HTML text.
+    :param base_url: URL of the page, used to resolve relative links and as a
+        fallback title if no <title> is found.
+    :param backend: 'html.parser' (pure Python), 'lxml' or 'selectolax'.
+    :return: The page markdown and the list of absolute URLs it links to.
+    """
+    if backend == "selectolax":
+        return _parse_with_selectolax(html, base_url)
+    return _parse_with_soup(html, base_url, backend)
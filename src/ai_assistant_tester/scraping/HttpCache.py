@@ -0,0 +1,154 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, TypedDict
+
+from ai_assistant_tester.scraping.HtmlParser import ParsedPage
+
+
+class CachedPage(TypedDict):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: str
+    page: ParsedPage
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+class HttpCache:
+    """
+    Persistent cache of crawled pages keyed by normalized URL.
+
+    For every page it stores the validators (ETag / Last-Modified) used to send
+    conditional requests on the next crawl, a hash of the response body and the
+    parsed markdown and links, which are reused when the page did not change.
+    The cache is shared by the fetch threads, so access is serialized with a lock.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open or create the cache database.
+
+        :param path: Path to the SQLite cache file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT NOT NULL,
+                markdown TEXT NOT NULL,
+                links TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        self._connection.commit()
+
+    def get_last_crawl(self) -> Optional[datetime]:
+        """
+        Return the start time of the last completed crawl, or None.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM meta WHERE key = 'last_crawl'"
+            ).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def set_last_crawl(self, started_at: datetime):
+        """
+        Record the start time of a completed crawl.
+
+        :param started_at: Aware datetime at which the crawl started.
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_crawl', ?)",
+                (started_at.isoformat(),),
+            )
+            self._connection.commit()
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """
+        Return the cached entry for a URL, or None if it was never crawled.
+
+        :param url: Normalized URL.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT etag, last_modified, content_hash, markdown, links "
+                "FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "etag": row[0],
+            "last_modified": row[1],
+            "content_hash": row[2],
+            "page": {"markdown": row[3], "links": json.loads(row[4])},
+        }
+
+    def conditional_headers(self, entry: Optional[CachedPage]) -> Dict[str, str]:
+        """
+        Build If-None-Match / If-Modified-Since headers for a cached entry.
+
+        :param entry: Entry returned by get(), or None.
+        """
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(
+        self,
+        url: str,
+        page: ParsedPage,
+        body_hash: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ):
+        """
+        Store or replace the entry for a URL.
+
+        :param url: Normalized URL.
+        :param page: Parsed markdown and links of the page.
+        :param body_hash: Hash of the response body, see content_hash().
+        :param etag: ETag response header, if any.
+        :param last_modified: Last-Modified response header, if any.
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, etag, last_modified, content_hash, markdown, links, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    etag,
+                    last_modified,
+                    body_hash,
+                    page["markdown"],
+                    json.dumps(page["links"]),
+                    time.time(),
+                ),
+            )
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
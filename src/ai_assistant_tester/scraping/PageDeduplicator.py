@@ -0,0 +1,120 @@
+import hashlib
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+FINGERPRINT_BITS = 64
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    Compute the 64-bit SimHash of a text from its word shingles.
+
+    Texts that share most of their shingles get fingerprints that differ in only
+    a few bits.
+
+    :param text: Cleaned page text.
+    :param shingle_size: Number of consecutive words per shingle.
+    :return: The fingerprint as an int.
+    """
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [
+            " ".join(words[i : i + shingle_size])
+            for i in range(len(words) - shingle_size + 1)
+        ]
+
+    weights = [0] * FINGERPRINT_BITS
+    for shingle in shingles:
+        h = _hash64(shingle)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class PageDeduplicator:
+    """
+    Detects exact and near-duplicate pages while crawling.
+
+    Exact duplicates are found by a hash of the whitespace-normalized text, near
+    duplicates by SimHash fingerprints within ``max_distance`` bits of each other.
+    Candidates are looked up with LSH banding: the fingerprint is split into
+    ``max_distance + 1`` bands, and two fingerprints within the distance must share
+    at least one band exactly, so only pages in the same band buckets are compared.
+    """
+
+    def __init__(self, similarity: float = 0.95):
+        """
+        Initialize the deduplicator.
+
+        :param similarity: Minimum fraction of equal fingerprint bits (0-1) for two
+            pages to count as near duplicates. 1.0 only drops exact duplicates.
+        """
+        if not 0.0 <= similarity <= 1.0:
+            raise ValueError("similarity must be between 0 and 1")
+        self.max_distance = int((1.0 - similarity) * FINGERPRINT_BITS)
+        self.num_bands = self.max_distance + 1
+        self.band_bits = FINGERPRINT_BITS // self.num_bands
+        self._exact: Dict[str, str] = {}
+        self._bands: List[Dict[int, List[Tuple[int, str]]]] = [
+            defaultdict(list) for _ in range(self.num_bands)
+        ]
+        # duplicate url -> url of the page it duplicates
+        self.duplicates: Dict[str, str] = {}
+
+    def _band_values(self, fingerprint: int) -> List[int]:
+        mask = (1 << self.band_bits) - 1
+        values = []
+        for band in range(self.num_bands):
+            # The last band takes the remaining bits.
+            if band == self.num_bands - 1:
+                values.append(fingerprint >> (band * self.band_bits))
+            else:
+                values.append(fingerprint >> (band * self.band_bits) & mask)
+        return values
+
+    def check(self, url: str, text: str) -> Optional[str]:
+        """
+        Register a page and report whether it duplicates an earlier one.
+
+        :param url: URL of the page.
+        :param text: Cleaned text of the page.
+        :return: URL of the earlier page it duplicates, or None if it is new.
+        """
+        normalized = " ".join(text.split())
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        original = self._exact.get(digest)
+        if original is not None:
+            self.duplicates[url] = original
+            return original
+        self._exact[digest] = url
+
+        if self.max_distance == 0:
+            return None
+
+        fingerprint = simhash(normalized)
+        band_values = self._band_values(fingerprint)
+        for band, value in enumerate(band_values):
+            for candidate, candidate_url in self._bands[band].get(value, ()):
+                if bin(fingerprint ^ candidate).count("1") <= self.max_distance:
+                    self.duplicates[url] = candidate_url
+                    return candidate_url
+
+        for band, value in enumerate(band_values):
+            self._bands[band][value].append((fingerprint, url))
+        return None
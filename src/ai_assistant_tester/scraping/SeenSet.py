@@ -0,0 +1,110 @@
+import hashlib
+import math
+from typing import Tuple
+
+SEEN_SET_TYPES = ("exact", "hashed", "bloom")
+
+
+def _hash128(url: str) -> Tuple[int, int]:
+    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+
+
+class HashedSeenSet:
+    """
+    Seen-set that stores a 64-bit hash of each URL instead of the URL itself.
+
+    Uses several times less memory than a set of strings for long URLs. Two
+    different URLs collide with probability ~n^2 / 2^65, which is negligible even
+    for hundreds of millions of URLs.
+    """
+
+    def __init__(self):
+        self._hashes = set()
+
+    def add(self, url: str) -> bool:
+        key = _hash128(url)[0]
+        if key in self._hashes:
+            return False
+        self._hashes.add(key)
+        return True
+
+    def __contains__(self, url: object) -> bool:
+        return isinstance(url, str) and _hash128(url)[0] in self._hashes
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+
+class BloomSeenSet:
+    """
+    Fixed-size Bloom filter seen-set.
+
+    Memory is set up front from the expected number of URLs and the false
+    positive rate and never grows. A false positive makes the crawler treat a new
+    URL as already seen, so roughly ``error_rate`` of new URLs are skipped once
+    ``capacity`` URLs were added; there are never false negatives.
+    """
+
+    def __init__(self, capacity: int = 10_000_000, error_rate: float = 0.001):
+        """
+        Allocate the filter.
+
+        :param capacity: Expected number of URLs.
+        :param error_rate: Target false positive rate at full capacity.
+        """
+        if capacity <= 0 or not 0.0 < error_rate < 1.0:
+            raise ValueError("capacity must be positive and error_rate in (0, 1)")
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._count = 0
+
+    def _positions(self, url: str):
+        # Kirsch-Mitzenmacher double hashing: k positions from two 64-bit hashes.
+        h1, h2 = _hash128(url)
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, url: str) -> bool:
+        added = False
+        for position in self._positions(url):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not self._bits[byte] & mask:
+                self._bits[byte] |= mask
+                added = True
+        if added:
+            self._count += 1
+        return added
+
+    def __contains__(self, url: object) -> bool:
+        if not isinstance(url, str):
+            return False
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(url)
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+
+def make_seen_set(kind: str = "exact", capacity: int = 10_000_000):
+    """
+    Create a seen-set of the given kind.
+
+    :param kind: 'exact' (set of URLs), 'hashed' (set of 64-bit hashes) or
+        'bloom' (fixed-size Bloom filter).
+    :param capacity: Expected number of URLs, used to size the Bloom filter.
+    """
+    if kind == "exact":
+        return set()
+    if kind == "hashed":
+        return HashedSeenSet()
+    if kind == "bloom":
+        return BloomSeenSet(capacity)
+    raise ValueError(f"Unknown seen-set '{kind}', expected one of {SEEN_SET_TYPES}")
@@ -0,0 +1,150 @@
+import gzip
+import io
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse a sitemap <lastmod> value (W3C datetime) into an aware UTC datetime.
+
+    A date without a time is taken as the end of that day, so a page changed later
+    on the same day as the previous crawl is not skipped.
+
+    :param value: Text of the <lastmod> element.
+    :return: The datetime, or None if missing or malformed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        if len(value) == 10:
+            day = datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+            return day + timedelta(days=1)
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+class SitemapReader:
+    """
+    Discovers the sitemaps of a site through robots.txt and yields the URLs they
+    list together with their lastmod dates. Sitemap indexes are followed and
+    gzipped sitemaps are decompressed.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session,
+        cli: bool = False,
+        timeout: float = 10,
+        max_sitemaps: int = 1000,
+    ):
+        """
+        Initialize the reader.
+
+        :param session: HTTP session used for all requests.
+        :param cli: If True, print verbose output.
+        :param timeout: Request timeout in seconds.
+        :param max_sitemaps: Maximum number of sitemap files to read (index loops
+            and runaway indexes stop there).
+        """
+        self.session = session
+        self.cli = cli
+        self.timeout = timeout
+        self.max_sitemaps = max_sitemaps
+
+    def _get(self, url: str) -> Optional[bytes]:
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            if self.cli:
+                print(f"Error fetching {url}: {e}")
+            return None
+        return response.content
+
+    def find_sitemaps(self, start_url: str) -> List[str]:
+        """
+        Return the sitemap URLs declared in robots.txt, or the default
+        /sitemap.xml if robots.txt declares none.
+
+        :param start_url: Any URL of the site.
+        """
+        parsed = urlparse(start_url)
+        root = f"{parsed.scheme}://{parsed.netloc}"
+        sitemaps = []
+        robots = self._get(f"{root}/robots.txt")
+        if robots:
+            for line in robots.decode("utf-8", errors="replace").splitlines():
+                key, _, value = line.partition(":")
+                if key.strip().lower() == "sitemap" and value.strip():
+                    sitemaps.append(urljoin(root, value.strip()))
+        return sitemaps or [f"{root}/sitemap.xml"]
+
+    def iter_urls(self, start_url: str) -> Iterator[Tuple[str, Optional[datetime]]]:
+        """
+        Yield (url, lastmod) for every page listed in the site's sitemaps.
+
+        :param start_url: Any URL of the site.
+        """
+        pending = self.find_sitemaps(start_url)
+        visited = set()
+        while pending and len(visited) < self.max_sitemaps:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+
+            body = self._get(sitemap_url)
+            if not body:
+                continue
+            if body.startswith(GZIP_MAGIC):
+                try:
+                    body = gzip.decompress(body)
+                except OSError as e:
+                    if self.cli:
+                        print(f"Error decompressing {sitemap_url}: {e}")
+                    continue
+            if self.cli:
+                print(f"Reading sitemap: {sitemap_url}")
+
+            try:
+                for kind, loc, lastmod in self._parse(body):
+                    if kind == "sitemap":
+                        pending.append(urljoin(sitemap_url, loc))
+                    else:
+                        yield urljoin(sitemap_url, loc), parse_lastmod(lastmod)
+            except ET.ParseError as e:
+                if self.cli:
+                    print(f"Error parsing sitemap {sitemap_url}: {e}")
+
+    def _parse(self, body: bytes) -> Iterator[Tuple[str, str, Optional[str]]]:
+        """
+        Stream <url> and <sitemap> entries of a urlset or sitemapindex document.
+        """
+        loc, lastmod = None, None
+        for _, element in ET.iterparse(io.BytesIO(body), events=("end",)):
+            name = _local_name(element.tag)
+            if name == "loc":
+                loc = (element.text or "").strip()
+            elif name == "lastmod":
+                lastmod = element.text
+            elif name in ("url", "sitemap"):
+                if loc:
+                    yield name, loc, lastmod
+                loc, lastmod = None, None
+                element.clear()
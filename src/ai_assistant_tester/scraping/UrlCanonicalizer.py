@@ -0,0 +1,129 @@
+from fnmatch import fnmatch
+from typing import Iterable, Optional
+from urllib.parse import unquote_plus, urlparse, urlunparse
+
+# Query parameters that only track the visitor and never change the page content.
+TRACKING_PARAMS = (
+    "utm_*",
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "yclid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_gl",
+    "_hsenc",
+    "_hsmi",
+)
+
+SESSION_PARAMS = (
+    "sid",
+    "sessionid",
+    "session_id",
+    "phpsessid",
+    "jsessionid",
+    "aspsessionid*",
+)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class UrlCanonicalizer:
+    """
+    Reduces URLs that point to the same page to one canonical form.
+
+    The scheme and host are lowercased, default ports, fragments, trailing slashes
+    and ``;jsessionid=`` path parameters are removed, tracking and session query
+    parameters are dropped and the remaining parameters are sorted by name. The
+    parameters themselves are kept as written, blank values and percent-encoding
+    included. Canonicalizing a canonical URL returns it unchanged.
+    """
+
+    def __init__(
+        self,
+        drop_params: Iterable[str] = TRACKING_PARAMS + SESSION_PARAMS,
+        extra_drop_params: Optional[Iterable[str]] = None,
+        sort_query: bool = True,
+        strip_trailing_slash: bool = True,
+    ):
+        """
+        Configure the canonicalizer.
+
+        :param drop_params: Glob patterns (case-insensitive) of query parameters to drop.
+        :param extra_drop_params: Additional patterns, added to drop_params.
+        :param sort_query: If True, sort query parameters by name.
+        :param strip_trailing_slash: If True, remove trailing slashes from the path.
+        """
+        self.drop_params = [p.lower() for p in drop_params]
+        self.drop_params += [p.lower() for p in extra_drop_params or ()]
+        self.sort_query = sort_query
+        self.strip_trailing_slash = strip_trailing_slash
+
+    def _keep_param(self, name: str) -> bool:
+        name = name.lower()
+        return not any(fnmatch(name, pattern) for pattern in self.drop_params)
+
+    def canonicalize(self, url: str) -> str:
+        """
+        Return the canonical form of a URL.
+
+        :param url: Absolute URL.
+        """
+        parsed = urlparse(url.strip())
+        scheme = parsed.scheme.lower()
+        try:
+            port = parsed.port
+        except ValueError:
+            # Malformed port, leave the URL as it is apart from the fragment.
+            return urlunparse(parsed._replace(fragment=""))
+
+        host = (parsed.hostname or "").rstrip(".")
+        if ":" in host:
+            host = f"[{host}]"
+        netloc = host
+        if port and port != DEFAULT_PORTS.get(scheme):
+            netloc = f"{host}:{port}"
+        if parsed.username:
+            userinfo = parsed.username
+            if parsed.password:
+                userinfo += f":{parsed.password}"
+            netloc = f"{userinfo}@{netloc}"
+
+        path = parsed.path
+        if self.strip_trailing_slash:
+            path = path.rstrip("/")
+        if not path:
+            path = "/"
+
+        params = ";".join(
+            p
+            for p in parsed.params.split(";")
+            if p and self._keep_param(p.split("=")[0])
+        )
+
+        # Parameters are kept exactly as written ("?z" stays "?z", "%2F" stays
+        # encoded), as servers may tell them apart; only their names are decoded
+        # to match them against drop_params and sort them.
+        query_params = [
+            (unquote_plus(param.split("=", 1)[0]), param)
+            for param in parsed.query.split("&")
+            if param
+        ]
+        query_params = [(n, p) for n, p in query_params if self._keep_param(n)]
+        if self.sort_query:
+            query_params.sort(key=lambda item: item[0])
+        query = "&".join(param for _, param in query_params)
+
+        return urlunparse((scheme, netloc, path, params, query, ""))
+
+
+def canonical_host(url: str) -> str:
+    """
+    Return the host of a URL the way canonicalized URLs spell it, e.g. for the
+    crawl domain: lowercased, without port or trailing dot.
+
+    :param url: Absolute URL.
+    """
+    return (urlparse(url.strip()).hostname or "").rstrip(".")
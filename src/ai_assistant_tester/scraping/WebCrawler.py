@@ -1,9 +1,58 @@
 import argparse
-from typing import Optional
-from urllib.parse import urljoin, urlparse, urlunparse
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import urlparse
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from ai_assistant_tester.scraping.CrawlFrontier import (
+    CrawlFrontier,
+    SqliteCrawlFrontier,
+)
+from ai_assistant_tester.scraping.CrawlOutputWriter import (
+    OUTPUT_FORMATS,
+    CrawlOutputWriter,
+)
+from ai_assistant_tester.scraping.CrawlTelemetry import (
+    CrawlTelemetry,
+    FetchRecord,
+    TimingHTTPAdapter,
+)
+from ai_assistant_tester.scraping.HtmlParser import (
+    PARSER_BACKENDS,
+    ParsedPage,
+    check_backend,
+    parse_page,
+)
+from ai_assistant_tester.scraping.HttpCache import HttpCache, content_hash
+from ai_assistant_tester.scraping.PageDeduplicator import PageDeduplicator
+from ai_assistant_tester.scraping.SeenSet import SEEN_SET_TYPES, make_seen_set
+from ai_assistant_tester.scraping.SitemapReader import SitemapReader
+from ai_assistant_tester.scraping.UrlCanonicalizer import (
+    UrlCanonicalizer,
+    canonical_host,
+)
+
+CRAWL_ENGINES = ("sync", "async")
+
+# Extensions of links that are probed with a HEAD request before being downloaded.
+SUSPICIOUS_EXTENSIONS = (
+    ".pdf", ".zip", ".gz", ".tgz", ".tar", ".rar", ".7z", ".exe", ".dmg", ".iso",
+    ".bin", ".apk", ".mp3", ".mp4", ".m4a", ".avi", ".mov", ".mkv", ".webm",
+    ".wav", ".ogg", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".tiff",
+    ".ico", ".svg", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".csv",
+    ".woff", ".woff2", ".ttf", ".otf", ".css", ".js", ".json", ".xml",
+)  # fmt: skip
+
+# fetched: downloaded and parsed, revalidated: 304 Not Modified,
+# unchanged: downloaded but identical to the cached copy, skipped: error or non-HTML
+FETCH_STATUSES = ("fetched", "revalidated", "unchanged", "skipped")
 
 
 class WebCrawler:
@@ -14,6 +63,29 @@ class WebCrawler:
         output_file: Optional[str] = None,
         unlimited_depth: bool = False,
         max_depth: int = 3,
+        engine: str = "sync",
+        max_concurrency: int = 16,
+        max_per_host: int = 8,
+        state_file: Optional[str] = None,
+        resume: bool = False,
+        parser_backend: str = "html.parser",
+        http_cache: Optional[str] = None,
+        output_format: str = "markdown",
+        pages_per_shard: int = 1000,
+        batch_size: int = 50,
+        dedup_threshold: Optional[float] = None,
+        use_sitemap: bool = False,
+        follow_links: bool = True,
+        modified_since: Optional[datetime] = None,
+        canonicalizer: Optional[UrlCanonicalizer] = None,
+        seen_set: str = "exact",
+        seen_capacity: int = 10_000_000,
+        trace_file: Optional[str] = None,
+        profile: bool = False,
+        max_body_bytes: Optional[int] = 10 * 1024 * 1024,
+        truncate_oversized: bool = True,
+        head_probe: bool = True,
+        on_page: Optional[Callable[[str, str], None]] = None,
     ):
         """
         Initialize the crawler.
@@ -23,87 +95,551 @@ class WebCrawler:
         :param output_file: Path to the file to save scraped markdown.
         :param unlimited_depth: If True, crawl all subpages without depth limit.
         :param max_depth: Maximum depth of recursion if unlimited_depth is False.
+        :param engine: 'sync' for the sequential crawler, 'async' for concurrent fetches.
+        :param max_concurrency: Maximum number of fetches in flight (async engine).
+        :param max_per_host: Maximum number of fetches in flight per host (async engine).
+        :param state_file: SQLite file to checkpoint the crawl frontier to.
+        :param resume: If True, continue the crawl recorded in state_file.
+        :param parser_backend: HTML parser: 'html.parser', 'lxml' or 'selectolax'.
+        :param http_cache: SQLite file caching pages between crawls; recrawls send
+            conditional requests and reuse the stored markdown of unchanged pages.
+        :param output_format: Output file format: 'markdown', 'jsonl' or 'sharded'.
+        :param pages_per_shard: Number of pages per file for the 'sharded' format.
+        :param batch_size: Number of pages written (and checkpointed) at once.
+        :param dedup_threshold: If set, drop pages whose text is at least this
+            similar (0-1, SimHash) to an already saved page; 1.0 drops exact copies only.
+        :param use_sitemap: If True, seed the frontier from robots.txt / sitemap.xml.
+        :param follow_links: If False, only crawl the start URL and sitemap URLs.
+            Links are always followed when the site has no sitemap.
+        :param modified_since: Skip sitemap URLs whose lastmod is older than this
+            (aware datetime). Defaults to the previous crawl recorded in http_cache.
+        :param canonicalizer: URL canonicalizer applied when URLs are queued; drops
+            tracking/session parameters and sorts the query by default.
+        :param seen_set: In-memory seen-set: 'exact', 'hashed' (64-bit hashes) or
+            'bloom' (fixed-size Bloom filter). Ignored with a state_file.
+        :param seen_capacity: Expected number of URLs, sizes the Bloom filter.
+        :param trace_file: JSONL file receiving per-URL timings (dns, connect, wait,
+            transfer, parse, write), sizes and statuses. Enables profiling.
+        :param profile: If True, collect timings for profile_report().
+        :param max_body_bytes: Maximum number of body bytes read per page; None for
+            no limit.
+        :param truncate_oversized: If True, keep the first max_body_bytes of an
+            oversized page, otherwise skip the page.
+        :param head_probe: If True, send a HEAD request first for links with a
+            binary-looking extension and skip them unless they are HTML.
+        :param on_page: Called with (url, markdown) for every saved page, as soon as
+            it is crawled. Pages are then not kept in ``results``.
         """
-        self.domain = domain
+        if engine not in CRAWL_ENGINES:
+            raise ValueError(
+                f"Unknown crawl engine '{engine}', expected one of {CRAWL_ENGINES}"
+            )
+        if resume and not state_file:
+            raise ValueError("Resuming a crawl requires a state_file")
+        check_backend(parser_backend)
+        self.domain = domain.lower() if domain else domain
         self.cli = cli
         self.output_file = output_file
         self.unlimited_depth = unlimited_depth
         self.max_depth = max_depth
-        self.crawled = set()
+        self.engine = engine
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_per_host = max(1, max_per_host)
+        self.parser_backend = parser_backend
+        if state_file:
+            self.frontier = SqliteCrawlFrontier(state_file, resume=resume)
+        else:
+            self.frontier = CrawlFrontier(make_seen_set(seen_set, seen_capacity))
+        self.crawled = self.frontier.seen
+        self.canonicalizer = canonicalizer or UrlCanonicalizer()
+        self.http_cache = HttpCache(http_cache) if http_cache else None
+        self.stats = dict.fromkeys(FETCH_STATUSES, 0)
+        self.stats["duplicates"] = 0
+        self.stats["oversized"] = 0
+        # _read_body runs on pool threads with the async engine.
+        self._oversized_lock = threading.Lock()
+        self.max_body_bytes = max_body_bytes
+        self.truncate_oversized = truncate_oversized
+        self.head_probe = head_probe
+        self.deduplicator = (
+            PageDeduplicator(dedup_threshold) if dedup_threshold is not None else None
+        )
+
+        self.telemetry = CrawlTelemetry(trace_file) if trace_file or profile else None
+
+        # One pooled session, so connections to a host are kept alive and reused.
+        self.session = requests.Session()
+        # Use headers for a better User-Agent
+        self.session.headers["User-Agent"] = "Mozilla/5.0 (compatible; WebCrawler/1.0)"
+        adapter_class = TimingHTTPAdapter if self.telemetry else HTTPAdapter
+        adapter = adapter_class(
+            pool_connections=self.max_concurrency, pool_maxsize=self.max_per_host
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.batch_size = max(1, batch_size)
+        self.use_sitemap = use_sitemap
+        self.follow_links = follow_links
+        self.modified_since = modified_since
+        if self.modified_since is None and self.http_cache:
+            self.modified_since = self.http_cache.get_last_crawl()
+        self._pages_since_checkpoint = 0
         # url and it's content
         self.results = {}
-        # Optionally clear the output file at the start
+        self.on_page = on_page
+        self.writer = None
         if self.output_file:
-            with open(self.output_file, "w", encoding="utf-8") as f:
-                f.write("# Scraped Knowledge Base\n\n")
+            self.writer = CrawlOutputWriter(
+                self.output_file,
+                output_format=output_format,
+                batch_size=self.batch_size,
+                pages_per_shard=pages_per_shard,
+                append=resume,
+            )
 
     def _normalize_url(self, url: str) -> str:
-        parsed = urlparse(url)
-        normalized_path = parsed.path.rstrip("/")
-        if not normalized_path:
-            normalized_path = "/"
-        normalized = urlunparse(
-            (
-                parsed.scheme,
-                parsed.netloc,
-                normalized_path,
-                parsed.params,
-                parsed.query,
-                "",
-            )
-        )
-        return normalized
+        return self.canonicalizer.canonicalize(url)
 
-    def crawl(self, url: str, depth: int = 0):
+    def run(self, url: str):
         """
-        Recursively crawl the given URL.
+        Crawl starting from the given URL with the configured engine.
 
-        :param url: URL to crawl.
-        :param depth: Current recursion depth.
+        :param url: URL to start crawling from.
+        """
+        started_at = datetime.now(timezone.utc)
+        if self.use_sitemap and not self.seed_from_sitemap(url):
+            if self.cli:
+                print("No sitemap URLs found, falling back to following links")
+            self.follow_links = True
+
+        if self.engine == "async":
+            self.crawl_async(url)
+        else:
+            self.crawl(url)
+
+        if self.http_cache:
+            self.http_cache.set_last_crawl(started_at)
+
+    def seed_from_sitemap(self, url: str) -> int:
+        """
+        Queue the URLs listed in the site's sitemaps.
+
+        URLs whose lastmod is older than ``modified_since`` are not fetched: their
+        cached copy is reused if the HTTP cache has one, otherwise they are skipped.
+
+        :param url: Any URL of the site.
+        :return: Number of sitemap URLs found.
+        """
+        found = 0
+        reader = SitemapReader(self.session, cli=self.cli)
+        for page_url, lastmod in reader.iter_urls(url):
+            found += 1
+            if not (self.modified_since and lastmod and lastmod < self.modified_since):
+                self._enqueue(page_url, 0)
+                continue
+
+            page_url = self._normalize_url(page_url)
+            if not self._claim(page_url):
+                continue
+            cached = self.http_cache.get(page_url) if self.http_cache else None
+            if cached is None:
+                self.stats["skipped"] += 1
+                continue
+            self.stats["unchanged"] += 1
+            for new_url in self._process_page(page_url, cached["page"], 0):
+                self._enqueue(new_url, 1)
+            # Counts towards the next checkpoint, like a page taken from the frontier.
+            self._finish_page(page_url)
+        return found
+
+    def close(self):
+        """
+        Release resources held by the crawler: the HTTP session, the output
+        writer, the frontier state file, the HTTP cache and the trace file.
+        """
+        self._checkpoint()
+        self.session.close()
+        if self.writer:
+            self.writer.close()
+        self.frontier.close()
+        if self.http_cache:
+            self.http_cache.close()
+        if self.telemetry:
+            self.telemetry.close()
+
+    def profile_report(self) -> str:
+        """
+        Return the crawl profile (latency percentiles per phase and slowest URLs),
+        or an empty string if profiling is disabled.
+        """
+        return self.telemetry.report() if self.telemetry else ""
+
+    def _finish_page(self, url: str):
+        """
+        Mark a popped URL as done and checkpoint every batch_size pages.
+
+        The output is flushed before the frontier is checkpointed, so a resumed
+        crawl never skips a page whose content was not written.
+        """
+        self.frontier.mark_done(url)
+        self._pages_since_checkpoint += 1
+        if self._pages_since_checkpoint >= self.batch_size:
+            self._checkpoint()
+
+    def _checkpoint(self):
+        if self.writer:
+            self.writer.flush()
+        self.frontier.checkpoint()
+        self._pages_since_checkpoint = 0
+
+    def crawl_summary(self) -> str:
+        """
+        Return a one-line summary of how many pages were fetched, revalidated,
+        found unchanged and skipped.
+        """
+        counts = ", ".join(
+            f"{self.stats[status]} {status}" for status in FETCH_STATUSES
+        )
+        summary = f"Crawl summary: {counts}"
+        if self.deduplicator:
+            summary += f"; {self.stats['duplicates']} duplicates dropped"
+        if self.stats["oversized"]:
+            action = "truncated" if self.truncate_oversized else "skipped"
+            summary += f"; {self.stats['oversized']} oversized pages {action}"
+        return summary
+
+    def _enqueue(self, url: str, depth: int):
+        """
+        Canonicalize the URL and queue it if it is new and within the domain.
+
+        :param url: URL to queue.
+        :param depth: Depth at which the URL was found.
         """
         url = self._normalize_url(url)
+        if self._claim(url):
+            self.frontier.push(url, depth)
 
-        if url in self.crawled:
-            return
-        self.crawled.add(url)
+    def _claim(self, url: str) -> bool:
+        """
+        Mark a normalized URL as crawled and report whether it should be visited.
+        Off-domain URLs are rejected before they reach the seen-set.
 
+        :param url: Normalized URL.
+        :return: True if the URL is new and within the domain.
+        """
         parsed_url = urlparse(url)
         if self.domain and self.domain not in parsed_url.netloc:
-            return
+            return False
+        return self.frontier.add_seen(url)
 
-        if self.cli:
-            print(f"Crawling: {url} at depth {depth}")
+    def _fetch_page(
+        self, url: str, record: Optional[FetchRecord] = None
+    ) -> Tuple[Optional[ParsedPage], str]:
+        """
+        Download and parse a page, revalidating it against the HTTP cache if enabled.
+
+        :param url: URL to fetch.
+        :param record: Telemetry record receiving the timings, if profiling.
+        :return: The parsed page, or None if it failed or is not HTML, and the fetch
+            status (one of FETCH_STATUSES).
+        """
+        cached = self.http_cache.get(url) if self.http_cache else None
+        headers = self.http_cache.conditional_headers(cached) if self.http_cache else {}
+        if self.head_probe and not self._probe_is_html(url):
+            return None, "skipped"
 
+        CrawlTelemetry.bind(record)
+        start = time.perf_counter()
         try:
-            # Use headers for a better User-Agent
-            headers = {"User-Agent": "Mozilla/5.0 (compatible; WebCrawler/1.0)"}
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
+            response = self.session.get(url, headers=headers, timeout=10, stream=True)
         except requests.exceptions.RequestException as e:
             if self.cli:
                 print(f"Error fetching {url}: {e}")
-            return
+            return None, "skipped"
+        finally:
+            CrawlTelemetry.bind(None)
+
+        with response:
+            if record is not None:
+                record["http_status"] = response.status_code
+                record["wait_ms"] = (
+                    (time.perf_counter() - start) * 1000
+                    - record["dns_ms"]
+                    - record["connect_ms"]
+                )
+            if response.status_code == 304 and cached:
+                return cached["page"], "revalidated"
+
+            try:
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                if self.cli:
+                    print(f"Error fetching {url}: {e}")
+                return None, "skipped"
+
+            # Decide from the headers, before any of the body is downloaded.
+            content_type = response.headers.get("Content-Type", "")
+            if not self._is_html(content_type):
+                if self.cli:
+                    print(f"Skipping non-HTML content at: {url} [{content_type}]")
+                return None, "skipped"
+
+            start = time.perf_counter()
+            try:
+                body = self._read_body(response, url)
+            except requests.exceptions.RequestException as e:
+                if self.cli:
+                    print(f"Error fetching {url}: {e}")
+                return None, "skipped"
+            if body is None:
+                return None, "skipped"
+            if record is not None:
+                record["transfer_ms"] = (time.perf_counter() - start) * 1000
+                record["response_bytes"] = len(body)
+
+        if not self.http_cache:
+            return self._parse(self._decode(body, response), url, record), "fetched"
+
+        body_hash = content_hash(body)
+        if cached and cached["content_hash"] == body_hash:
+            page, status = cached["page"], "unchanged"
+        else:
+            page = self._parse(self._decode(body, response), url, record)
+            status = "fetched"
+        self.http_cache.put(
+            url,
+            page,
+            body_hash,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+        return page, status
+
+    @staticmethod
+    def _is_html(content_type: str) -> bool:
+        content_type = content_type.lower()
+        return "text/html" in content_type or "application/xhtml+xml" in content_type
+
+    @staticmethod
+    def _decode(body: bytes, response: requests.Response) -> str:
+        # Same as response.text for HTML: the header charset, ISO-8859-1 for text/*.
+        try:
+            return body.decode(response.encoding or "utf-8", errors="replace")
+        except LookupError:
+            return body.decode("utf-8", errors="replace")
 
-        # Check if the content seems to be HTML
+    def _probe_is_html(self, url: str) -> bool:
+        """
+        For URLs with a binary-looking extension, ask the server for the content
+        type with a HEAD request. Other URLs, and servers that reject HEAD, are
+        assumed to be HTML; the GET response headers are still checked.
+
+        :param url: URL about to be fetched.
+        :return: False if the server reported a non-HTML content type.
+        """
+        if not urlparse(url).path.lower().endswith(SUSPICIOUS_EXTENSIONS):
+            return True
+        try:
+            response = self.session.head(url, timeout=10, allow_redirects=True)
+        except requests.exceptions.RequestException:
+            return True
         content_type = response.headers.get("Content-Type", "")
-        if (
-            "text/html" not in content_type.lower()
-            and "application/xhtml+xml" not in content_type.lower()
-        ):
+        if response.ok and not self._is_html(content_type):
             if self.cli:
-                print(f"Skipping non-HTML content at: {url} [{content_type}]")
-            return
+                print(f"Skipping non-HTML content at: {url} [{content_type}] (HEAD)")
+            return False
+        return True
+
+    def _read_body(self, response: requests.Response, url: str) -> Optional[bytes]:
+        """
+        Read the response body in chunks, up to max_body_bytes.
 
-        markdown_content = self.scrape_content_from_html(response.text, url)
-        self.save_content(url, markdown_content)
+        :param response: Streamed response.
+        :param url: URL of the response, for messages.
+        :return: The body (truncated if oversized and truncate_oversized is set),
+            or None if the page is oversized and must be skipped.
+        """
+        limit = self.max_body_bytes
+        if limit is None:
+            return response.content
 
+        declared = response.headers.get("Content-Length", "")
+        if declared.isdigit() and int(declared) > limit and not self.truncate_oversized:
+            self._count_oversized()
+            if self.cli:
+                print(f"Skipping oversized page {url} ({declared} bytes)")
+            return None
+
+        chunks, size = [], 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > limit:
+                break
+        body = b"".join(chunks)
+        if size <= limit:
+            return body
+
+        self._count_oversized()
+        if not self.truncate_oversized:
+            if self.cli:
+                print(f"Skipping oversized page {url} (over {limit} bytes)")
+            return None
+        if self.cli:
+            print(f"Truncating oversized page {url} to {limit} bytes")
+        return body[:limit]
+
+    def _count_oversized(self):
+        with self._oversized_lock:
+            self.stats["oversized"] += 1
+
+    def _parse(
+        self, html: str, url: str, record: Optional[FetchRecord] = None
+    ) -> ParsedPage:
+        start = time.perf_counter()
+        page = parse_page(html, url, self.parser_backend)
+        if record is not None:
+            record["parse_ms"] = (time.perf_counter() - start) * 1000
+        return page
+
+    def _process_page(
+        self,
+        url: str,
+        page: ParsedPage,
+        depth: int,
+        record: Optional[FetchRecord] = None,
+    ) -> List[str]:
+        """
+        Save the page content, unless it duplicates an earlier page, and return the
+        links to follow from it.
+
+        :param url: URL of the page.
+        :param page: Parsed markdown and links of the page.
+        :param depth: Depth at which the page was found.
+        :param record: Telemetry record receiving the write time, if profiling.
+        :return: List of absolute URLs to crawl next.
+        """
+        original = None
+        if self.deduplicator:
+            # The "# title" line is compared too: template-heavy pages often
+            # differ in little but their title.
+            original = self.deduplicator.check(url, page["markdown"])
+        if original:
+            self.stats["duplicates"] += 1
+            if self.cli:
+                print(f"Dropping {url}, duplicate of {original}")
+        else:
+            start = time.perf_counter()
+            self.save_content(url, page["markdown"])
+            if record is not None:
+                record["write_ms"] = (time.perf_counter() - start) * 1000
+                record["markdown_bytes"] = len(page["markdown"].encode("utf-8"))
+
+        if not self.follow_links:
+            return []
         # Do not recurse further if reached max depth (unless unlimited)
         if not self.unlimited_depth and depth >= self.max_depth:
-            return
+            return []
 
-        new_urls = self.extract_urls(response.text, url)
-        for new_url in new_urls:
-            self.crawl(new_url, depth + 1)
+        return page["links"]
+
+    def crawl(self, url: str, depth: int = 0):
+        """
+        Crawl breadth-first from the given URL until the frontier is empty.
+
+        :param url: URL to crawl.
+        :param depth: Depth of the starting URL.
+        """
+        self._enqueue(url, depth)
+        while True:
+            item = self.frontier.pop()
+            if item is None:
+                break
+            url, depth = item
+            if self.cli:
+                print(f"Crawling: {url} at depth {depth}")
+
+            record = self.telemetry.begin(url) if self.telemetry else None
+            page, status = self._fetch_page(url, record)
+            self.stats[status] += 1
+            if page is not None:
+                for new_url in self._process_page(url, page, depth, record):
+                    self._enqueue(new_url, depth + 1)
+            if record is not None:
+                self.telemetry.end(record, status)
+            self._finish_page(url)
+        self._checkpoint()
+
+    def crawl_async(self, url: str):
+        """
+        Crawl the given URL with a bounded pool of concurrent fetches.
+
+        Pages are visited breadth-first. Fetches run in a thread pool limited to
+        ``max_concurrency`` requests overall and ``max_per_host`` per host, while
+        saving and frontier updates happen on the event loop, one page at a time.
+
+        :param url: URL to start crawling from.
+        """
+        asyncio.run(self._crawl_async(url))
+
+    async def _crawl_async(self, start_url: str):
+        host_limits = defaultdict(lambda: asyncio.Semaphore(self.max_per_host))
+        in_flight = set()
+
+        self._enqueue(start_url, 0)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            while True:
+                while len(in_flight) < self.max_concurrency:
+                    item = self.frontier.pop()
+                    if item is None:
+                        break
+                    url, depth = item
+                    in_flight.add(
+                        asyncio.create_task(
+                            self._crawl_page_async(url, depth, host_limits, executor)
+                        )
+                    )
+                if not in_flight:
+                    break
+                done, in_flight = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                errors = [task.exception() for task in done if task.exception()]
+                if errors:
+                    for task in in_flight:
+                        task.cancel()
+                    await asyncio.gather(*in_flight, return_exceptions=True)
+                    raise errors[0]
+        self._checkpoint()
+
+    async def _crawl_page_async(
+        self,
+        url: str,
+        depth: int,
+        host_limits: defaultdict,
+        executor: ThreadPoolExecutor,
+    ):
+        loop = asyncio.get_running_loop()
+        if self.cli:
+            print(f"Crawling: {url} at depth {depth}")
+        record, page, status = None, None, "skipped"
+        try:
+            async with host_limits[urlparse(url).netloc]:
+                record = self.telemetry.begin(url) if self.telemetry else None
+                page, status = await loop.run_in_executor(
+                    executor, self._fetch_page, url, record
+                )
+        except Exception as e:
+            if self.cli:
+                print(f"Error crawling {url}: {e}")
+        self.stats[status] += 1
+        # Errors while saving the page propagate, as in crawl().
+        if page is not None:
+            for new_url in self._process_page(url, page, depth, record):
+                self._enqueue(new_url, depth + 1)
+        if record is not None:
+            self.telemetry.end(record, status)
+        self._finish_page(url)
 
     def extract_urls(self, html, base_url):
         """
@@ -113,20 +649,7 @@ class WebCrawler:
         :param base_url: The base URL to resolve relative links.
         :return: List of absolute URLs.
         """
-        soup = BeautifulSoup(html, "html.parser")
-        links = []
-        for a in soup.find_all("a", href=True):
-            href = a.get("href")
-            # Skip links that are just anchors or javascript or mailto links.
-            if (
-                href.startswith("#")
-                or href.startswith("mailto:")
-                or href.startswith("javascript:")
-            ):
-                continue
-            abs_url = urljoin(base_url, href)
-            links.append(abs_url)
-        return links
+        return parse_page(html, base_url, self.parser_backend)["links"]
 
     def scrape_content_from_html(self, html, base_url):
         """
@@ -136,55 +659,18 @@ class WebCrawler:
         :param base_url: Fallback for title if no <title> is found.
         :return: A string with markdown formatted content.
         """
-        soup = BeautifulSoup(html, "html.parser")
-
-        tags_to_remove = [
-            "script",
-            "style",
-            "img",
-            "svg",
-            "canvas",
-            "noscript",
-            "iframe",
-            "header",
-            "footer",
-            "nav",
-            "form",
-            "link",
-            "meta",
-        ]
-        for tag in soup.find_all(tags_to_remove):
-            tag.decompose()
-
-        # Optionally remove specific classes or ids that match known banners or ads.
-        # For instance:
-        # for div in soup.find_all("div", class_="ad-banner"):
-        #     div.decompose()
-
-        # Use the <title> tag if available, otherwise use the URL.
-        if soup.title:
-            title = soup.title.get_text().strip()
-        else:
-            title = base_url
-
-        text = soup.get_text(separator="\n")
-        # Clean up text: remove extra whitespace and empty lines.
-        lines = [line.strip() for line in text.splitlines()]
-        cleaned_text = "\n".join(line for line in lines if line)
-
-        content = f"# {title}\n\n" + cleaned_text
-        return content
+        return parse_page(html, base_url, self.parser_backend)["markdown"]
 
     def save_content(self, url: str, content: str):
-        formatted_content = f"\n\n<!-- URL: {url} -->\n\n{content}\n\n"
-        if self.output_file:
+        if self.on_page:
+            self.on_page(url, content)
+        if self.writer:
             try:
-                with open(self.output_file, "a", encoding="utf-8") as f:
-                    f.write(formatted_content)
-            except requests.exceptions.RequestException as e:
+                self.writer.write(url, content)
+            except OSError as e:
                 if self.cli:
                     print(f"Error saving content from {url}: {e}")
-        else:
+        elif not self.on_page:
             self.results[url] = content
 
 
@@ -208,10 +694,133 @@ def main():
         default=3,
         help="Maximum crawl depth if not unlimited (default: 3)",
     )
+    parser.add_argument(
+        "--engine",
+        choices=CRAWL_ENGINES,
+        default="sync",
+        help="Crawl engine: sequential 'sync' or concurrent 'async' (default: sync)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="Maximum concurrent fetches for the async engine (default: 16)",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=8,
+        help="Maximum concurrent fetches per host for the async engine (default: 8)",
+    )
+    parser.add_argument(
+        "--state-file",
+        help="SQLite file to checkpoint the crawl frontier to (bounded memory)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the crawl recorded in --state-file instead of starting over",
+    )
+
+    parser.add_argument(
+        "--parser",
+        choices=PARSER_BACKENDS,
+        default="html.parser",
+        help="HTML parser backend (default: html.parser)",
+    )
+    parser.add_argument(
+        "--http-cache",
+        help="SQLite file caching pages between crawls for conditional recrawls",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default="markdown",
+        help="Output format, with a URL index next to it (default: markdown)",
+    )
+    parser.add_argument(
+        "--pages-per-shard",
+        type=int,
+        default=1000,
+        help="Pages per output file for the sharded format (default: 1000)",
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        help="Drop pages at least this similar (0-1) to an earlier page, e.g. 0.95",
+    )
+
+    parser.add_argument(
+        "--sitemap",
+        action="store_true",
+        help="Seed the crawl from robots.txt / sitemap.xml",
+    )
+    parser.add_argument(
+        "--no-follow-links",
+        action="store_true",
+        help="With --sitemap, only crawl the URLs listed in the sitemap",
+    )
+    parser.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        help="Skip sitemap URLs with lastmod before this ISO date "
+        "(default: previous crawl in --http-cache)",
+    )
+
+    parser.add_argument(
+        "--drop-param",
+        action="append",
+        default=[],
+        help="Extra query parameter (glob) to strip from URLs, may be repeated",
+    )
+    parser.add_argument(
+        "--seen-set",
+        choices=SEEN_SET_TYPES,
+        default="exact",
+        help="Seen-URL store: exact, hashed or bloom (fixed memory) (default: exact)",
+    )
+    parser.add_argument(
+        "--seen-capacity",
+        type=int,
+        default=10_000_000,
+        help="Expected number of URLs, sizes the bloom seen-set (default: 10000000)",
+    )
+
+    parser.add_argument(
+        "--trace",
+        help="Write per-URL timings, sizes and statuses to this JSONL file",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print latency percentiles per phase and the slowest URLs at the end",
+    )
+
+    parser.add_argument(
+        "--max-body-bytes",
+        type=int,
+        default=10 * 1024 * 1024,
+        help="Maximum bytes downloaded per page (default: 10485760)",
+    )
+    parser.add_argument(
+        "--skip-oversized",
+        action="store_true",
+        help="Skip pages over --max-body-bytes instead of truncating them",
+    )
+    parser.add_argument(
+        "--no-head-probe",
+        action="store_true",
+        help="Do not send HEAD requests for links with binary-looking extensions",
+    )
 
     args = parser.parse_args()
+    if args.resume and not args.state_file:
+        parser.error("--resume requires --state-file")
 
-    start_domain = urlparse(args.url).netloc
+    start_domain = canonical_host(args.url)
+    since = args.since
+    if since and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
 
     crawler = WebCrawler(
         domain=start_domain,
@@ -219,8 +828,33 @@ def main():
         output_file=args.output,
         unlimited_depth=args.unlimited,
         max_depth=args.max_depth,
+        engine=args.engine,
+        max_concurrency=args.concurrency,
+        max_per_host=args.per_host,
+        state_file=args.state_file,
+        resume=args.resume,
+        parser_backend=args.parser,
+        http_cache=args.http_cache,
+        output_format=args.output_format,
+        pages_per_shard=args.pages_per_shard,
+        dedup_threshold=args.dedup_threshold,
+        use_sitemap=args.sitemap,
+        follow_links=not args.no_follow_links,
+        modified_since=since,
+        canonicalizer=UrlCanonicalizer(extra_drop_params=args.drop_param),
+        seen_set=args.seen_set,
+        seen_capacity=args.seen_capacity,
+        trace_file=args.trace,
+        profile=args.profile,
+        max_body_bytes=args.max_body_bytes,
+        truncate_oversized=not args.skip_oversized,
+        head_probe=not args.no_head_probe,
     )
-    crawler.crawl(args.url)
+    crawler.run(args.url)
+    crawler.close()
+    print(crawler.crawl_summary())
+    if crawler.telemetry:
+        print(crawler.profile_report())
 
     if not args.output:
         for url, content in crawler.results.items():
@@ -7,3 +7,11 @@ KNOWLEDGE_BASE_OUTPUTS_DIR = (
 )
 
 QA_PAIRS_DIR = PROJECT_ROOT / "ai_assistant_tester" / "knowledge_base" / "qa_pairs"
+
+USAGE_REPORTS_DIR = PROJECT_ROOT / "ai_assistant_tester" / "usage_reports"
+
+ASSISTANT_REGISTRY_FILE = (
+    PROJECT_ROOT / "ai_assistant_tester" / "assistant_registry.json"
+)
+
+TEST_CHECKPOINTS_DIR = PROJECT_ROOT / "ai_assistant_tester" / "test_checkpoints"
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, TypedDict
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Environment variables that enable the cache for every client from get_client().
+LLM_CACHE_PATH_ENV = "LLM_CACHE_PATH"
+LLM_CACHE_MAX_MB_ENV = "LLM_CACHE_MAX_MB"
+LLM_CACHE_TTL_HOURS_ENV = "LLM_CACHE_TTL_HOURS"
+
+# Request options that do not change the completion and are left out of the key.
+_NON_KEY_OPTIONS = ("timeout", "extra_headers")
+
+
+class LlmCacheStats(TypedDict):
+    hits: int
+    misses: int
+    expired: int
+    evictions: int
+    entries: int
+    bytes: int
+
+
+class LlmCache:
+    """
+    Persistent cache of chat completion responses.
+
+    Entries are keyed by a SHA-256 hash of the request (model, messages and sampling
+    parameters), so identical requests are answered from disk. The total size is
+    capped with least-recently-used eviction and entries older than the TTL are
+    ignored. The cache is shared between threads, so access is serialized with a lock.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 1024 * 1024 * 1024,
+        ttl: Optional[float] = None,
+    ):
+        """
+        Open or create the cache database.
+
+        :param path: Path to the SQLite cache file.
+        :param max_bytes: Maximum total size of the stored responses.
+        :param ttl: Lifetime of an entry in seconds; None keeps entries until evicted.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_access "
+            "ON responses (last_access)"
+        )
+        self._connection.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional["LlmCache"]:
+        """
+        Create the cache configured by LLM_CACHE_PATH, LLM_CACHE_MAX_MB and
+        LLM_CACHE_TTL_HOURS, or return None if LLM_CACHE_PATH is not set.
+        """
+        path = os.environ.get(LLM_CACHE_PATH_ENV)
+        if not path:
+            return None
+        max_mb = float(os.environ.get(LLM_CACHE_MAX_MB_ENV, "1024"))
+        ttl_hours = os.environ.get(LLM_CACHE_TTL_HOURS_ENV)
+        return cls(
+            path,
+            max_bytes=int(max_mb * 1024 * 1024),
+            ttl=float(ttl_hours) * 3600 if ttl_hours else None,
+        )
+
+    @staticmethod
+    def key(request: Dict[str, Any]) -> str:
+        """
+        Return the cache key of a chat completion request.
+
+        :param request: Keyword arguments of chat.completions.create().
+        """
+        options = {k: v for k, v in request.items() if k not in _NON_KEY_OPTIONS}
+        canonical = json.dumps(options, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Return the stored response JSON for a key, or None on a miss.
+
+        :param key: Key returned by key().
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and self.ttl is not None and row[1] < now - self.ttl:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._connection.commit()
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._connection.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._connection.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """
+        Store a response and evict least recently used entries over max_bytes.
+
+        :param key: Key returned by key().
+        :param response: Response serialized as JSON.
+        """
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, response, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now),
+            )
+            total = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+            if total > self.max_bytes:
+                rows = self._connection.execute(
+                    "SELECT key, size FROM responses ORDER BY last_access"
+                )
+                evicted = []
+                for old_key, old_size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    evicted.append((old_key,))
+                    total -= old_size
+                self._connection.executemany(
+                    "DELETE FROM responses WHERE key = ?", evicted
+                )
+                self.evictions += len(evicted)
+            self._connection.commit()
+
+    def stats(self) -> LlmCacheStats:
+        """
+        Return the hit/miss counters of this instance and the size of the cache.
+        """
+        with self._lock:
+            entries, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        logging.info(f"LLM cache {self.path}: {self.stats()}")
+        with self._lock:
+            self._connection.close()
+
+
+def cache_chat_completions(client: "OpenAI", cache: LlmCache) -> "OpenAI":
+    """
+    Route client.chat.completions.create() through the cache. Streaming requests
+    are passed through uncached.
+
+    :param client: Client to wrap; modified in place.
+    :param cache: Cache storing the responses.
+    :return: The same client.
+    """
+    from openai.types.chat import ChatCompletion
+
+    completions = client.chat.completions
+    create = completions.create
+
+    def cached_create(**kwargs):
+        if kwargs.get("stream"):
+            return create(**kwargs)
+        key = cache.key(kwargs)
+        stored = cache.get(key)
+        if stored is not None:
+            return ChatCompletion.model_validate_json(stored)
+        response = create(**kwargs)
+        cache.put(key, response.model_dump_json())
+        return response
+
+    completions.create = cached_create  # type: ignore[method-assign]
+    return client
+
+
+_cache: Optional[LlmCache] = None
+_cache_loaded = False
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LlmCache]:
+    """
+    Return the process-wide cache configured by LLM_CACHE_PATH, opened on first
+    use, or None if no cache is configured. The client of get_client() uses it.
+    """
+    global _cache, _cache_loaded
+    with _cache_lock:
+        if not _cache_loaded:
+            _cache = LlmCache.from_env()
+            _cache_loaded = True
+        return _cache
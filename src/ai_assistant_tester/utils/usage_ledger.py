@@ -0,0 +1,406 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TypedDict,
+)
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Environment variables configuring the process-wide ledger of get_ledger().
+LLM_BUDGET_USD_ENV = "LLM_BUDGET_USD"
+LLM_PRICE_TABLE_ENV = "LLM_PRICE_TABLE"
+
+# USD per million tokens: (input, cached input, output). Models are matched by the
+# longest prefix, so dated snapshots such as gpt-4o-2024-08-06 use the gpt-4o price.
+DEFAULT_PRICES: Dict[str, tuple] = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "o4-mini": (1.10, 0.275, 4.40),
+    "o3-mini": (1.10, 0.55, 4.40),
+    "gpt-3.5-turbo": (0.50, 0.50, 1.50),
+}
+
+# Batch API requests are billed at half price.
+BATCH_PRICE_FACTOR = 0.5
+
+# Stage of the calls made in the current thread or task. Pool workers inherit it
+# when their work is wrapped with in_context().
+_current_stage: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "llm_stage", default="default"
+)
+
+
+class BudgetExceededError(RuntimeError):
+    pass
+
+
+class UsageRecord(TypedDict):
+    stage: str
+    model: str
+    prompt_tokens: int
+    cached_tokens: int
+    completion_tokens: int
+    latency_ms: float
+    cost_usd: float
+    timestamp: float
+
+
+def _field(obj: Any, name: str) -> Any:
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+class UsageLedger:
+    """
+    Records the token usage, latency and estimated cost of every LLM call, tagged
+    with the pipeline stage that made it.
+
+    The stage is set with ``with ledger.stage("format"):`` around a pipeline step.
+    It is kept in a context variable, so stages running concurrently in other
+    threads do not mix.
+    Before each call the ledger checks the total budget and the budget of the
+    current stage and raises BudgetExceededError once one of them is spent, so a
+    stage stops instead of overspending. Calls made inside ``with
+    ledger.reserve():`` also hold the average cost of a call of their stage until
+    they are recorded, so concurrent calls cannot all pass the check at once. The
+    first calls of a stage have no average yet, so up to one call per worker
+    can still go over the budget.
+    """
+
+    def __init__(
+        self,
+        prices: Optional[Dict[str, tuple]] = None,
+        budget_usd: Optional[float] = None,
+        stage_budgets: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Initialize the ledger.
+
+        :param prices: Price table, model prefix -> (input, cached input, output) in
+            USD per million tokens. Defaults to DEFAULT_PRICES.
+        :param budget_usd: Spending cap of the whole run; None for no cap.
+        :param stage_budgets: Spending caps per stage.
+        """
+        self.prices = prices if prices is not None else dict(DEFAULT_PRICES)
+        self.budget_usd = budget_usd
+        self.stage_budgets = stage_budgets or {}
+        self.records: List[UsageRecord] = []
+        self._spent: Dict[Optional[str], float] = {None: 0.0}
+        self._reserved: Dict[Optional[str], float] = {None: 0.0}
+        self._calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._unpriced: set = set()
+
+    @classmethod
+    def from_env(cls) -> "UsageLedger":
+        """
+        Create a ledger with the budget in LLM_BUDGET_USD and the price table in the
+        JSON file named by LLM_PRICE_TABLE, if set.
+        """
+        prices = None
+        price_file = os.environ.get(LLM_PRICE_TABLE_ENV)
+        if price_file:
+            with open(price_file, "r", encoding="utf-8") as f:
+                prices = {model: tuple(p) for model, p in json.load(f).items()}
+        budget = os.environ.get(LLM_BUDGET_USD_ENV)
+        return cls(prices=prices, budget_usd=float(budget) if budget else None)
+
+    @property
+    def current_stage(self) -> str:
+        return _current_stage.get()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Tag the calls made inside the block with a stage name.
+        """
+        token = _current_stage.set(name)
+        try:
+            yield
+        finally:
+            _current_stage.reset(token)
+
+    def _price(self, model: str) -> Optional[tuple]:
+        matches = [prefix for prefix in self.prices if model.startswith(prefix)]
+        if not matches:
+            with self._lock:
+                unseen = model not in self._unpriced
+                self._unpriced.add(model)
+            if unseen:
+                logging.warning(f"No price for model {model}, its cost counts as 0")
+            return None
+        return self.prices[max(matches, key=len)]
+
+    def spent(self, stage: Optional[str] = None) -> float:
+        """
+        Return the estimated cost so far, of one stage or of the whole run.
+        """
+        with self._lock:
+            return self._spent.get(stage, 0.0)
+
+    def _estimate(self, stage: str) -> float:
+        """
+        Return the average cost of a call of the stage so far. Caller holds the lock.
+        """
+        calls = self._calls.get(stage)
+        return self._spent[stage] / calls if calls else 0.0
+
+    def _check(self, stage: str, estimate: float = 0.0):
+        """
+        Raise BudgetExceededError if the spent and reserved cost plus the estimate
+        reach the budget of the run or the stage. Caller holds the lock.
+        """
+        total = self._spent[None] + self._reserved[None] + estimate
+        if self.budget_usd is not None and total >= self.budget_usd:
+            raise BudgetExceededError(
+                f"Budget of ${self.budget_usd:.2f} spent, stopping stage '{stage}'"
+            )
+        stage_budget = self.stage_budgets.get(stage)
+        stage_total = (
+            self._spent.get(stage, 0.0) + self._reserved.get(stage, 0.0) + estimate
+        )
+        if stage_budget is not None and stage_total >= stage_budget:
+            raise BudgetExceededError(
+                f"Budget of ${stage_budget:.2f} for stage '{stage}' spent"
+            )
+
+    def check_budget(self, stage: Optional[str] = None):
+        """
+        Raise BudgetExceededError if the run or the stage has used up its budget,
+        counting the cost reserved by calls in progress.
+        """
+        stage = stage or self.current_stage
+        with self._lock:
+            self._check(stage)
+
+    @contextmanager
+    def reserve(self, stage: Optional[str] = None) -> Iterator[None]:
+        """
+        Check the budget and reserve the average cost of a call of the stage for
+        the call made inside the block, which should record its usage before the
+        block ends.
+
+        :raises BudgetExceededError: If the reservation would exceed a budget.
+        """
+        stage = stage or self.current_stage
+        with self._lock:
+            estimate = self._estimate(stage)
+            self._check(stage, estimate)
+            self._reserved[None] += estimate
+            self._reserved[stage] = self._reserved.get(stage, 0.0) + estimate
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._reserved[None] -= estimate
+                self._reserved[stage] -= estimate
+
+    def record(
+        self,
+        model: str,
+        usage: Any,
+        latency: float = 0.0,
+        stage: Optional[str] = None,
+        price_factor: float = 1.0,
+    ) -> UsageRecord:
+        """
+        Add one call to the ledger.
+
+        :param model: Model that served the call.
+        :param usage: Usage of a ChatCompletion or Run, or the equivalent dict.
+        :param latency: Call duration in seconds.
+        :param stage: Stage name; defaults to the current stage.
+        :param price_factor: Multiplier of the list price (e.g. for the Batch API).
+        """
+        prompt_tokens = _field(usage, "prompt_tokens") or 0
+        completion_tokens = _field(usage, "completion_tokens") or 0
+        details = _field(usage, "prompt_tokens_details")
+        cached_tokens = _field(details, "cached_tokens") or 0
+
+        cost = 0.0
+        price = self._price(model)
+        if price:
+            input_price, cached_price, output_price = price
+            cost = (
+                (prompt_tokens - cached_tokens) * input_price
+                + cached_tokens * cached_price
+                + completion_tokens * output_price
+            ) / 1_000_000
+        entry: UsageRecord = {
+            "stage": stage or self.current_stage,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms": round(latency * 1000, 1),
+            "cost_usd": cost * price_factor,
+            "timestamp": time.time(),
+        }
+        with self._lock:
+            self.records.append(entry)
+            self._spent[None] += entry["cost_usd"]
+            self._spent[entry["stage"]] = (
+                self._spent.get(entry["stage"], 0.0) + entry["cost_usd"]
+            )
+            self._calls[entry["stage"]] = self._calls.get(entry["stage"], 0) + 1
+        return entry
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return totals per stage and for the whole run ("total").
+        """
+        totals: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            records = list(self.records)
+        for r in records:
+            for key in (r["stage"], "total"):
+                t = totals.setdefault(
+                    key,
+                    {
+                        "calls": 0,
+                        "prompt_tokens": 0,
+                        "cached_tokens": 0,
+                        "completion_tokens": 0,
+                        "latency_ms": 0.0,
+                        "cost_usd": 0.0,
+                    },
+                )
+                t["calls"] += 1
+                for field in (
+                    "prompt_tokens",
+                    "cached_tokens",
+                    "completion_tokens",
+                    "latency_ms",
+                    "cost_usd",
+                ):
+                    t[field] += r[field]
+        if "total" in totals:
+            totals["total"] = totals.pop("total")
+        return totals
+
+    def report(self) -> str:
+        """
+        Return the per-stage summary as a text table.
+        """
+        lines = [
+            f"{'stage':>16} {'calls':>6} {'prompt':>10} {'cached':>10} "
+            f"{'completion':>10} {'seconds':>8} {'cost $':>9}"
+        ]
+        for stage, t in self.summary().items():
+            lines.append(
+                f"{stage:>16} {t['calls']:>6} {t['prompt_tokens']:>10} "
+                f"{t['cached_tokens']:>10} {t['completion_tokens']:>10} "
+                f"{t['latency_ms'] / 1000:>8.1f} {t['cost_usd']:>9.4f}"
+            )
+        return "\n".join(lines)
+
+    def write_summary(self, path: str):
+        """
+        Write the run summary (budget, per-stage totals and every call) as JSON.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock:
+            calls = list(self.records)
+        data = {
+            "budget_usd": self.budget_usd,
+            "stage_budgets": self.stage_budgets,
+            "stages": self.summary(),
+            "calls": calls,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+
+_ledger: Optional[UsageLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger() -> UsageLedger:
+    """
+    Return the process-wide ledger, created from the environment on first use.
+    """
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = UsageLedger.from_env()
+        return _ledger
+
+
+def in_stage(name: str) -> Callable:
+    """
+    Decorator tagging the LLM calls made by a function with a stage of the
+    process-wide ledger.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_ledger().stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def in_context(func: Callable) -> Callable:
+    """
+    Bind a function to the caller's context, so that it runs with the caller's
+    stage when a pool thread calls it. Every call runs in its own copy of the
+    context, so the wrapper can be used by several threads at once.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+
+    return wrapper
+
+
+def track_usage(client: "OpenAI", ledger: UsageLedger) -> "OpenAI":
+    """
+    Record the usage of every client.chat.completions.create() call in the ledger
+    and reserve its budget before each call. Streaming calls are not recorded.
+
+    :param client: Client to wrap; modified in place.
+    :param ledger: Ledger receiving the records.
+    :return: The same client.
+    """
+    completions = client.chat.completions
+    create = completions.create
+
+    def tracked_create(**kwargs):
+        with ledger.reserve():
+            start = time.perf_counter()
+            response = create(**kwargs)
+            if not kwargs.get("stream"):
+                ledger.record(
+                    response.model or kwargs.get("model", ""),
+                    response.usage,
+                    time.perf_counter() - start,
+                )
+        return response
+
+    completions.create = tracked_create  # type: ignore[method-assign]
+    return client
@@ -1,9 +1,23 @@
 import json
 import os
+import threading
+from functools import lru_cache
 from pathlib import Path
-from typing import List, TypedDict
+from typing import TYPE_CHECKING, List, Optional, TypedDict
 
-from openai import OpenAI
+from ai_assistant_tester.utils.llm_cache import (
+    LlmCache,
+    cache_chat_completions,
+    get_llm_cache,
+)
+from ai_assistant_tester.utils.usage_ledger import get_ledger, track_usage
+
+if TYPE_CHECKING:
+    import tiktoken
+    from openai import OpenAI
+
+_client: Optional["OpenAI"] = None
+_client_lock = threading.Lock()
 
 
 def get_openai_api_key() -> str:
@@ -18,11 +32,43 @@ def get_file_content(file_path: Path) -> str:
         return file.read()
 
 
-def get_client() -> OpenAI:
+def _create_client(cache: Optional[LlmCache]) -> "OpenAI":
+    from openai import OpenAI
+
     client = OpenAI(api_key=get_openai_api_key())
+    track_usage(client, get_ledger())
+    cache = cache or get_llm_cache()
+    if cache is not None:
+        cache_chat_completions(client, cache)
     return client
 
 
+def get_client(cache: Optional[LlmCache] = None) -> "OpenAI":
+    """
+    Return the process-wide OpenAI client, created on first use. Chat completions
+    are recorded in the usage ledger and go through an LLM response cache when one
+    is configured with the LLM_CACHE_PATH environment variable; cache hits cost
+    nothing and are not recorded. Passing a cache creates a separate client using it.
+    """
+    global _client
+    if cache is not None:
+        return _create_client(cache)
+    with _client_lock:
+        if _client is None:
+            _client = _create_client(None)
+        return _client
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str) -> "tiktoken.Encoding":
+    """
+    Return the tokenizer of a model, loaded once per process.
+    """
+    import tiktoken
+
+    return tiktoken.encoding_for_model(model)
+
+
 def knowledge_base_content(file_path: Path) -> str:
     content = get_file_content(file_path)
     return content
@@ -0,0 +1,78 @@
+import json
+from types import SimpleNamespace
+
+from ai_assistant_tester.conversation_tester.AnswerCheckpoint import AnswerCheckpoint
+from ai_assistant_tester.conversation_tester.AssistantTestSession import (
+    AssistantTestSession,
+)
+
+QAS = [{"question": f"q{i}", "answer": ""} for i in range(3)]
+
+
+def entry(index, question=None, answer=None):
+    return {
+        "index": index,
+        "question": question or f"q{index}",
+        "answer": answer or f"a{index}",
+        "thread_id": f"thread_{index}",
+        "run_id": f"run_{index}",
+        "seconds": 1.0,
+        "status_requests": 2,
+        "finished_at": 0.0,
+    }
+
+
+def test_resume_skips_a_truncated_last_line(tmp_path):
+    path = tmp_path / "answers.jsonl"
+    AnswerCheckpoint(path).append([entry(0), entry(1)])
+    # A crash while writing the third answer leaves half a line.
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry(2))[:20])
+
+    resumed = AnswerCheckpoint(path, resume=True)
+    resumed.append([entry(2)])
+
+    assert resumed.answered(QAS) == {0: "a0", 1: "a1", 2: "a2"}
+    assert AnswerCheckpoint(path, resume=True).answered(QAS) == {
+        0: "a0",
+        1: "a1",
+        2: "a2",
+    }
+
+
+def test_without_resume_the_file_starts_afresh(tmp_path):
+    path = tmp_path / "answers.jsonl"
+    AnswerCheckpoint(path).append([entry(0)])
+
+    assert AnswerCheckpoint(path).answered(QAS) == {}
+    assert path.read_text() == ""
+
+
+def test_answers_of_other_questions_are_ignored(tmp_path):
+    path = tmp_path / "answers.jsonl"
+    AnswerCheckpoint(path).append(
+        [entry(0), entry(1, question="old question"), entry(7)]
+    )
+
+    assert AnswerCheckpoint(path, resume=True).answered(QAS) == {0: "a0"}
+
+
+def test_run_test_resumes_with_the_unanswered_questions(tmp_path, monkeypatch):
+    path = tmp_path / "answers.jsonl"
+    AnswerCheckpoint(path).append([entry(0), entry(2)])
+    manager = SimpleNamespace(create_assistant=lambda **config: SimpleNamespace(id="a"))
+    session = AssistantTestSession("QA", "Answer.", [], manager)
+    asked = []
+
+    def ask(question, timeout, stream):
+        asked.append(question)
+        info = {"thread_id": "t", "run_id": "r", "seconds": 0.0, "status_requests": 0}
+        return f"new {question}", info
+
+    monkeypatch.setattr(session, "_ask", ask)
+
+    answers = session.run_test({"qas": QAS}, checkpoint=path, resume=True)
+
+    assert answers == ["a0", "new q1", "a2"]
+    assert asked == ["q1"]
+    assert AnswerCheckpoint(path, resume=True).answered(QAS)[1] == "new q1"
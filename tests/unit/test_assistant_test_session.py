@@ -0,0 +1,116 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from ai_assistant_tester.conversation_tester.AssistantTestSession import (
+    AssistantTestSession,
+)
+
+
+class FakeManager:
+    """
+    Stand-in for AssistantManager whose run streams break off before the first
+    event, after the run was created.
+    """
+
+    def __init__(self, create_run_on_stream=True):
+        self.create_run_on_stream = create_run_on_stream
+        self.runs = {}
+
+    def create_assistant(self, **config):
+        return SimpleNamespace(id="asst_1")
+
+    def create_thread(self):
+        return SimpleNamespace(id="thread_1")
+
+    def add_message(self, thread, role, content):
+        pass
+
+    def _new_run(self, thread_id):
+        if any(run.status == "in_progress" for run in self.runs.values()):
+            raise RuntimeError(f"Thread {thread_id} already has an active run")
+        run = SimpleNamespace(
+            id=f"run_{len(self.runs) + 1}", status="in_progress", usage=None
+        )
+        self.runs[run.id] = run
+        return run
+
+    @contextmanager
+    def create_run_stream(self, thread_id, assistant_id, timeout):
+        if self.create_run_on_stream:
+            self._new_run(thread_id)
+        raise ConnectionError("stream closed")
+        yield
+
+    def create_run(self, thread_id, assistant_id):
+        return self._new_run(thread_id)
+
+    def list_runs(self, thread_id, limit=20):
+        return SimpleNamespace(data=list(reversed(self.runs.values()))[:limit])
+
+    def retrieve_run(self, thread_id, run_id):
+        run = self.runs[run_id]
+        run.status = "completed"
+        return run
+
+    def get_thread_messages(self, thread_id):
+        content = [SimpleNamespace(text=SimpleNamespace(value="42"))]
+        return SimpleNamespace(
+            data=[SimpleNamespace(role="assistant", content=content)]
+        )
+
+
+@pytest.mark.parametrize("create_run_on_stream", [True, False])
+def test_broken_stream_polls_the_run_it_created(create_run_on_stream):
+    manager = FakeManager(create_run_on_stream)
+    session = AssistantTestSession("QA", "Answer.", [], manager)
+
+    answer, info = session._ask("question", timeout=5, stream=True)
+
+    assert answer == "42"
+    assert info["run_id"] == "run_1"
+    assert list(manager.runs) == ["run_1"]
+
+
+@pytest.fixture
+def session():
+    return AssistantTestSession("QA", "Answer.", [], FakeManager())
+
+
+@pytest.mark.parametrize(
+    "reply, expected",
+    [
+        ("1. Paris\n2. Rome\n3. Berlin", ["Paris", "Rome", "Berlin"]),
+        ("**2.** Rome\n**1.** Paris\n### 3) Berlin", ["Paris", "Rome", "Berlin"]),
+        ("1. Paris\n3. Berlin", ["Paris", None, "Berlin"]),
+        ("1. Paris\n2. Rome\n2. Milan\n3. Berlin", ["Paris", None, "Berlin"]),
+        # Out-of-range numbers are not answer markers.
+        ("1. Paris\n2.\n3. Berlin\n4. Madrid", ["Paris", None, "Berlin\n4. Madrid"]),
+        ("1. Paris, 2. Rome\n3. Berlin", ["Paris, 2. Rome", None, "Berlin"]),
+        ("I cannot answer these.", [None, None, None]),
+    ],
+)
+def test_numbered_answers_are_aligned(session, reply, expected):
+    assert session._parse_numbered_answers(reply, 3) == expected
+
+
+def test_unaligned_answers_are_asked_again_alone(session, monkeypatch):
+    qas = [{"question": f"q{i}", "answer": ""} for i in range(4)]
+    replies = {"q0": "2. a1\n1. a0", "q2": "1. a2", "q3": "a3"}
+    asked = []
+
+    def ask(question, timeout, stream):
+        # A batch prompt contains its questions; answer by the first one.
+        first = min(q for q in replies if q in question)
+        asked.append(first)
+        info = {"thread_id": "t", "run_id": "r", "seconds": 0.0, "status_requests": 0}
+        return replies[first], info
+
+    monkeypatch.setattr(session, "_ask", ask)
+
+    answers = session.run_test({"qas": qas}, batch_size=2, max_concurrency=1)
+
+    assert answers == ["a0", "a1", "a2", "a3"]
+    # Two batches, then question 4, which the second reply left out, alone.
+    assert asked == ["q0", "q2", "q3"]
@@ -0,0 +1,245 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import ai_assistant_tester.utils.utils as utils
+from ai_assistant_tester.knowledge_base.BatchRunner import BatchRunner
+from ai_assistant_tester.knowledge_base.KnowledgeBaseFormatter import (
+    KnowledgeBaseFormatter,
+)
+
+
+class Interrupted(Exception):
+    pass
+
+
+class FakeBatchApi:
+    """
+    Local stand-in for the files, batches and chat completions endpoints.
+
+    Successive batches.retrieve() calls return the statuses in order, repeating
+    the last one. A completed batch answers every request with "done: <custom_id>",
+    except the custom_ids in failing, which go to the error file. Direct chat
+    completions answer "direct".
+    """
+
+    def __init__(self, statuses=("in_progress", "completed"), failing=()):
+        self.statuses = list(statuses)
+        self.failing = set(failing)
+        self.stored = {}
+        self.uploads = 0
+        self.submitted = []
+        self.polls = 0
+        self.interrupt_at_poll = None
+        self.completions = 0
+        self.files = SimpleNamespace(create=self._upload, content=self._content)
+        self.batches = SimpleNamespace(create=self._submit, retrieve=self._retrieve)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+
+    def _upload(self, file, purpose):
+        self.uploads += 1
+        file_id = f"file-{self.uploads}"
+        self.stored[file_id] = file.read().decode("utf-8")
+        return SimpleNamespace(id=file_id)
+
+    def _content(self, file_id):
+        return SimpleNamespace(text=self.stored[file_id])
+
+    def _submit(self, input_file_id, endpoint, completion_window):
+        batch_id = f"batch-{len(self.submitted) + 1}"
+        self.submitted.append((batch_id, input_file_id))
+        return SimpleNamespace(id=batch_id)
+
+    def _retrieve(self, batch_id):
+        self.polls += 1
+        if self.polls == self.interrupt_at_poll:
+            raise Interrupted()
+        status = self.statuses[min(self.polls - 1, len(self.statuses) - 1)]
+        batch = SimpleNamespace(
+            id=batch_id,
+            status=status,
+            request_counts=None,
+            output_file_id=None,
+            error_file_id=None,
+        )
+        if status == "completed":
+            input_file_id = dict(self.submitted)[batch_id]
+            output, errors = [], []
+            for line in self.stored[input_file_id].splitlines():
+                request = json.loads(line)
+                if request["custom_id"] in self.failing:
+                    errors.append(
+                        {
+                            "custom_id": request["custom_id"],
+                            "response": None,
+                            "error": {"message": "server error"},
+                        }
+                    )
+                    continue
+                output.append(
+                    {
+                        "custom_id": request["custom_id"],
+                        "response": {
+                            "status_code": 200,
+                            "body": {
+                                "model": "gpt-4o-mini",
+                                "choices": [
+                                    {
+                                        "message": {
+                                            "content": f"done: {request['custom_id']}"
+                                        }
+                                    }
+                                ],
+                            },
+                        },
+                    }
+                )
+            self.stored[f"{batch_id}-out"] = "\n".join(map(json.dumps, output))
+            self.stored[f"{batch_id}-err"] = "\n".join(map(json.dumps, errors))
+            batch.output_file_id = f"{batch_id}-out"
+            batch.error_file_id = f"{batch_id}-err" if errors else None
+        return batch
+
+    def _complete(self, messages, **kwargs):
+        self.completions += 1
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="direct"))]
+        )
+
+
+def make_requests(count):
+    return [
+        (
+            f"r{i}",
+            {
+                "model": "gpt-4o-mini",
+                "messages": [{"role": "user", "content": f"q{i}"}],
+            },
+        )
+        for i in range(count)
+    ]
+
+
+def read_state(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_submit_and_collect_results(tmp_path):
+    api = FakeBatchApi()
+    state_file = str(tmp_path / "batch.json")
+
+    results = BatchRunner(api, state_file, poll_interval=0).run(make_requests(3))
+
+    assert results == {f"r{i}": f"done: r{i}" for i in range(3)}
+    assert api.uploads == 1
+    assert len(api.submitted) == 1
+    assert read_state(state_file)["status"] == "completed"
+
+
+def test_no_requests_submit_nothing(tmp_path):
+    api = FakeBatchApi()
+
+    results = BatchRunner(api, str(tmp_path / "batch.json")).run([])
+
+    assert results == {}
+    assert api.uploads == 0
+    assert not (tmp_path / "batch.json").exists()
+
+
+def test_rerun_reuses_downloaded_results(tmp_path):
+    api = FakeBatchApi()
+    state_file = str(tmp_path / "batch.json")
+    BatchRunner(api, state_file, poll_interval=0).run(make_requests(3))
+    polls = api.polls
+
+    results = BatchRunner(api, state_file, poll_interval=0).run(make_requests(3))
+
+    assert results["r2"] == "done: r2"
+    assert api.polls == polls
+    assert len(api.submitted) == 1
+
+
+def test_resume_mid_poll(tmp_path):
+    api = FakeBatchApi(
+        statuses=("validating", "in_progress", "in_progress", "completed")
+    )
+    api.interrupt_at_poll = 3
+    state_file = str(tmp_path / "batch.json")
+
+    with pytest.raises(Interrupted):
+        BatchRunner(api, state_file, poll_interval=0).run(make_requests(2))
+    state = read_state(state_file)
+    assert state["batch_id"] == "batch-1"
+    assert state["status"] == "in_progress"
+
+    results = BatchRunner(api, state_file, poll_interval=0).run(make_requests(2))
+
+    assert results == {"r0": "done: r0", "r1": "done: r1"}
+    assert api.uploads == 1
+    assert len(api.submitted) == 1
+
+
+def test_changed_requests_start_a_new_batch(tmp_path):
+    api = FakeBatchApi()
+    state_file = str(tmp_path / "batch.json")
+    BatchRunner(api, state_file, poll_interval=0).run(make_requests(2))
+
+    results = BatchRunner(api, state_file, poll_interval=0).run(make_requests(3))
+
+    assert results["r2"] == "done: r2"
+    assert len(api.submitted) == 2
+
+
+def test_per_request_errors_give_none(tmp_path):
+    api = FakeBatchApi(failing={"r1"})
+    state_file = str(tmp_path / "batch.json")
+
+    results = BatchRunner(api, state_file, poll_interval=0).run(make_requests(3))
+
+    assert results == {"r0": "done: r0", "r1": None, "r2": "done: r2"}
+
+
+@pytest.mark.parametrize("status", ["expired", "failed", "cancelled"])
+def test_terminal_failure_resubmits_on_rerun(tmp_path, status):
+    api = FakeBatchApi(statuses=("in_progress", status))
+    state_file = str(tmp_path / "batch.json")
+
+    with pytest.raises(RuntimeError, match=status):
+        BatchRunner(api, state_file, poll_interval=0).run(make_requests(2))
+    state = read_state(state_file)
+    assert "batch_id" not in state
+    assert "status" not in state
+
+    api.statuses = ["completed"]
+    results = BatchRunner(api, state_file, poll_interval=0).run(make_requests(2))
+
+    assert results == {"r0": "done: r0", "r1": "done: r1"}
+    assert api.uploads == 1
+    assert [batch_id for batch_id, _ in api.submitted] == ["batch-1", "batch-2"]
+
+
+def test_format_knowledge_base_retries_failed_batch_requests(tmp_path, monkeypatch):
+    api = FakeBatchApi(statuses=("completed",), failing={"chunk-1"})
+    monkeypatch.setattr(utils, "_client", api)
+    formatter = KnowledgeBaseFormatter()
+    monkeypatch.setattr(formatter, "_chunk_text", lambda text: text.split("|"))
+    state_file = str(tmp_path / "format.json")
+
+    formatted = formatter.format_knowledge_base(
+        "a|b|c|d", context_outputs=0, batch_state=state_file
+    )
+    sections = formatted.strip().split("\n\n")
+
+    assert sections == ["done: chunk-0", "direct", "done: chunk-2", "done: chunk-3"]
+    assert api.completions == 1
+
+    # A rerun reuses the downloaded results and retries the failed chunk again.
+    formatted = formatter.format_knowledge_base(
+        "a|b|c|d", context_outputs=0, batch_state=state_file
+    )
+
+    assert formatted.strip().split("\n\n") == sections
+    assert api.completions == 2
+    assert len(api.submitted) == 1
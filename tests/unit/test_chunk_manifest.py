@@ -0,0 +1,75 @@
+from ai_assistant_tester.knowledge_base.ChunkManifest import (
+    ChunkManifest,
+    chunk_title,
+    source_hash,
+)
+
+
+def entries_for(chunks):
+    return [
+        {
+            "source_sha256": source_hash(text),
+            "title": chunk_title(text),
+            "output": f"formatted {text}",
+        }
+        for text in chunks
+    ]
+
+
+def build(path, chunks, prompt_version="v1"):
+    manifest = ChunkManifest(str(path), prompt_version)
+    entries = entries_for(chunks)
+    summary = manifest.diff_summary(entries)
+    manifest.save(entries)
+    return manifest, summary
+
+
+def test_outputs_are_reused_only_for_the_same_prompt_version(tmp_path):
+    path = tmp_path / "manifest.json"
+    build(path, ["# Intro\n\nhello"])
+
+    same = ChunkManifest(str(path), "v1")
+    other = ChunkManifest(str(path), "v2")
+
+    assert same.lookup("# Intro\n\nhello") == "formatted # Intro\n\nhello"
+    assert same.lookup("# Intro\n\nchanged") is None
+    assert other.lookup("# Intro\n\nhello") is None
+
+
+def test_diff_reports_added_changed_removed_and_unchanged(tmp_path):
+    path = tmp_path / "manifest.json"
+    build(path, ["# Intro\n\nhello", "# Pricing\n\n$10", "# Legacy\n\nold"])
+
+    _, summary = build(
+        path, ["# Intro\n\nhello", "# Pricing\n\n$12", "# Contact\n\nmail us"]
+    )
+
+    assert (
+        "3 chunks: 1 added, 1 changed, 1 removed, 1 unchanged." in summary.splitlines()
+    )
+    assert "## Added\n\n- # Contact" in summary
+    assert "## Changed\n\n- # Pricing" in summary
+    assert "## Removed\n\n- # Legacy" in summary
+    assert "Model or prompt changed" not in summary
+
+
+def test_first_build_adds_everything(tmp_path):
+    _, summary = build(tmp_path / "manifest.json", ["# A\n\na", "# B\n\nb"])
+
+    assert "2 chunks: 2 added, 0 changed, 0 removed, 0 unchanged." in summary
+
+
+def test_prompt_change_is_reported(tmp_path):
+    path = tmp_path / "manifest.json"
+    build(path, ["# A\n\na"])
+
+    _, summary = build(path, ["# A\n\na"], prompt_version="v2")
+
+    assert "1 chunks: 0 added, 0 changed, 0 removed, 1 unchanged." in summary
+    assert "Model or prompt changed: all chunks were formatted again." in summary
+
+
+def test_chunk_title_is_the_first_line_shortened():
+    assert chunk_title("\n\n  # Title  \nbody") == "# Title"
+    assert chunk_title("x" * 100, width=10) == "xxxxxxx..."
+    assert chunk_title("  \n") == ""
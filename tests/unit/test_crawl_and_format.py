@@ -0,0 +1,103 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import ai_assistant_tester.scraping.WebCrawler as web_crawler
+import ai_assistant_tester.utils.utils as utils
+from ai_assistant_tester.knowledge_base.KnowledgeBaseFormatter import (
+    KnowledgeBaseFormatter,
+)
+from ai_assistant_tester.utils.usage_ledger import BudgetExceededError
+
+
+class FakeCrawler:
+    """
+    Stand-in for WebCrawler that hands a fixed number of pages to on_page.
+    """
+
+    pages = 200
+    instances = []
+
+    def __init__(self, domain, cli, max_depth, on_page, **options):
+        self.on_page = on_page
+        self.sent = 0
+        self.closed = False
+        FakeCrawler.instances.append(self)
+
+    def run(self, url):
+        for i in range(self.pages):
+            self.on_page(f"{url}/{i}", f"page {i}")
+            self.sent += 1
+
+    def close(self):
+        self.closed = True
+
+    def crawl_summary(self):
+        return ""
+
+
+class FakeCompletions:
+    def __init__(self, fail_at=None):
+        self.calls = 0
+        self.fail_at = fail_at
+        self.lock = threading.Lock()
+
+    def create(self, messages, **kwargs):
+        with self.lock:
+            self.calls += 1
+            calls = self.calls
+        if calls == self.fail_at:
+            raise BudgetExceededError("budget exceeded")
+        time.sleep(0.001)
+        page = messages[-1]["content"].split("page ")[-1].split()[0]
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f"F{page}"))]
+        )
+
+
+@pytest.fixture
+def formatter(monkeypatch):
+    FakeCrawler.instances = []
+    monkeypatch.setattr(web_crawler, "WebCrawler", FakeCrawler)
+    formatter = KnowledgeBaseFormatter()
+    monkeypatch.setattr(formatter, "_chunk_text", lambda text: [text])
+    return formatter
+
+
+def test_sections_are_written_in_crawl_order(formatter, monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        utils,
+        "_client",
+        SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions())),
+    )
+    output_file = tmp_path / "kb.md"
+
+    written = formatter.crawl_and_format(
+        "https://example.com", output_file, max_workers=4, max_pages_queued=2
+    )
+
+    assert written == FakeCrawler.pages
+    sections = output_file.read_text().strip().split("\n\n")
+    assert sections == [f"F{i}" for i in range(FakeCrawler.pages)]
+    assert FakeCrawler.instances[0].closed
+
+
+def test_formatting_error_stops_and_closes_the_crawler(
+    formatter, monkeypatch, tmp_path
+):
+    completions = FakeCompletions(fail_at=3)
+    monkeypatch.setattr(
+        utils, "_client", SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    )
+
+    with pytest.raises(BudgetExceededError):
+        formatter.crawl_and_format(
+            "https://example.com", tmp_path / "kb.md", max_workers=2, max_pages_queued=2
+        )
+
+    crawler = FakeCrawler.instances[0]
+    assert crawler.closed
+    assert crawler.sent < FakeCrawler.pages
+    assert not any(t.name == "crawler" for t in threading.enumerate())
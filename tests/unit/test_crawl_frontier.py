@@ -0,0 +1,57 @@
+from ai_assistant_tester.scraping.CrawlFrontier import (
+    CrawlFrontier,
+    SqliteCrawlFrontier,
+)
+
+
+def test_memory_frontier_is_fifo_and_dedups():
+    frontier = CrawlFrontier()
+    for url in ("a", "b", "a"):
+        if frontier.add_seen(url):
+            frontier.push(url, 0)
+
+    assert len(frontier) == 2
+    assert [frontier.pop(), frontier.pop(), frontier.pop()] == [
+        ("a", 0),
+        ("b", 0),
+        None,
+    ]
+
+
+def test_resume_requeues_pages_in_flight_at_the_last_checkpoint(tmp_path):
+    path = str(tmp_path / "frontier.db")
+    frontier = SqliteCrawlFrontier(path)
+    for depth, url in enumerate(["a", "b", "c"]):
+        frontier.add_seen(url)
+        frontier.push(url, depth)
+    frontier.pop()
+    frontier.mark_done("a")
+    frontier.pop()
+    frontier.checkpoint()
+    # Work after the last checkpoint is lost.
+    frontier.add_seen("d")
+    frontier.push("d", 3)
+    frontier.close()
+
+    resumed = SqliteCrawlFrontier(path, resume=True)
+
+    assert len(resumed) == 2
+    assert [resumed.pop(), resumed.pop(), resumed.pop()] == [("b", 1), ("c", 2), None]
+    assert not resumed.add_seen("a")
+    assert resumed.add_seen("d")
+    resumed.close()
+
+
+def test_without_resume_the_state_is_reset(tmp_path):
+    path = str(tmp_path / "frontier.db")
+    frontier = SqliteCrawlFrontier(path)
+    frontier.add_seen("a")
+    frontier.push("a", 0)
+    frontier.checkpoint()
+    frontier.close()
+
+    fresh = SqliteCrawlFrontier(path)
+
+    assert len(fresh) == 0
+    assert fresh.add_seen("a")
+    fresh.close()
@@ -0,0 +1,87 @@
+import hashlib
+import json
+
+import pytest
+
+from ai_assistant_tester.scraping.CrawlOutputWriter import (
+    OUTPUT_FORMATS,
+    CrawlOutputReader,
+    CrawlOutputWriter,
+    index_path_for,
+)
+
+# Non-ASCII content, so byte offsets differ from character offsets.
+PAGES = [
+    (f"https://example.com/{i}", f"# Page {i}\n\nCafé {i} " * (i + 1)) for i in range(7)
+]
+
+
+def write_pages(output_file, output_format, pages=PAGES, append=False):
+    writer = CrawlOutputWriter(
+        str(output_file),
+        output_format=output_format,
+        batch_size=3,
+        pages_per_shard=3,
+        append=append,
+    )
+    for url, content in pages:
+        writer.write(url, content)
+    writer.close()
+
+
+@pytest.mark.parametrize("output_format", OUTPUT_FORMATS)
+def test_pages_round_trip_through_the_index(tmp_path, output_format):
+    output_file = tmp_path / "out.md"
+    write_pages(output_file, output_format)
+
+    reader = CrawlOutputReader(str(output_file), output_format)
+
+    assert len(reader) == len(PAGES)
+    assert list(reader) == PAGES
+    assert reader.read("https://example.com/missing") is None
+
+
+@pytest.mark.parametrize("output_format", OUTPUT_FORMATS)
+def test_index_offsets_point_at_the_page_bytes(tmp_path, output_format):
+    output_file = tmp_path / "out.md"
+    write_pages(output_file, output_format)
+
+    index = index_path_for(str(output_file)).read_text(encoding="utf-8")
+    entries = [json.loads(line) for line in index.splitlines()]
+
+    for entry, (url, content) in zip(entries, PAGES):
+        data = (tmp_path / entry["shard"]).read_bytes()
+        record = data[entry["offset"] : entry["offset"] + entry["length"]]
+        if output_format != "markdown":
+            record = json.loads(record)["content"].encode("utf-8")
+        assert entry["url"] == url
+        assert record == content.encode("utf-8")
+        assert entry["sha256"] == hashlib.sha256(record).hexdigest()
+
+
+def test_sharded_output_splits_pages(tmp_path):
+    write_pages(tmp_path / "out.jsonl", "sharded")
+
+    shards = sorted(p.name for p in tmp_path.glob("out-*.jsonl"))
+
+    assert shards == ["out-00000.jsonl", "out-00001.jsonl", "out-00002.jsonl"]
+
+
+@pytest.mark.parametrize("output_format", OUTPUT_FORMATS)
+def test_append_continues_the_output(tmp_path, output_format):
+    output_file = tmp_path / "out.md"
+    write_pages(output_file, output_format, PAGES[:4])
+    write_pages(output_file, output_format, PAGES[4:], append=True)
+
+    assert list(CrawlOutputReader(str(output_file), output_format)) == PAGES
+
+
+def test_unflushed_pages_are_not_indexed(tmp_path):
+    output_file = tmp_path / "out.md"
+    writer = CrawlOutputWriter(str(output_file), batch_size=3)
+    for url, content in PAGES[:4]:
+        writer.write(url, content)
+
+    assert len(CrawlOutputReader(str(output_file))) == 3
+    writer.close()
+    assert len(CrawlOutputReader(str(output_file))) == 4
@@ -0,0 +1,96 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ai_assistant_tester.scraping.HttpCache import HttpCache, content_hash
+from ai_assistant_tester.scraping.WebCrawler import WebCrawler
+
+PAGE = {"markdown": "# Title\n\nText", "links": ["https://example.com/b"]}
+
+
+class EtagHandler(BaseHTTPRequestHandler):
+    """
+    Serves two linked pages with an ETag and answers matching conditional
+    requests with 304 Not Modified.
+    """
+
+    version = "v1"
+    full_responses = 0
+
+    def do_GET(self):
+        etag = f'"{self.path}-{self.version}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        link = '<a href="/b">B</a>' if self.path == "/a" else ""
+        body = (
+            f"<html><head><title>{self.path}</title></head><body>"
+            f"<p>{self.path} {self.version}</p>{link}</body></html>"
+        ).encode("utf-8")
+        type(self).full_responses += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    EtagHandler.version = "v1"
+    EtagHandler.full_responses = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EtagHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def crawl(site, http_cache):
+    crawler = WebCrawler(domain=site, unlimited_depth=True, http_cache=http_cache)
+    crawler.run(f"http://{site}/a")
+    crawler.close()
+    return crawler
+
+
+def test_entries_round_trip_and_give_conditional_headers(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache.db"))
+    cache.put("https://example.com/a", PAGE, content_hash(b"body"), etag='"1"')
+
+    entry = cache.get("https://example.com/a")
+
+    assert entry["page"] == PAGE
+    assert entry["content_hash"] == content_hash(b"body")
+    assert cache.conditional_headers(entry) == {"If-None-Match": '"1"'}
+    assert cache.conditional_headers(None) == {}
+    assert cache.get("https://example.com/b") is None
+    cache.close()
+
+
+def test_recrawl_reuses_pages_answered_with_304(site, tmp_path):
+    http_cache = str(tmp_path / "cache.db")
+    first = crawl(site, http_cache)
+
+    second = crawl(site, http_cache)
+
+    assert first.stats["fetched"] == 2
+    assert second.stats["revalidated"] == 2
+    assert EtagHandler.full_responses == 2
+    assert second.results == first.results
+
+
+def test_changed_page_is_fetched_again(site, tmp_path):
+    http_cache = str(tmp_path / "cache.db")
+    crawl(site, http_cache)
+    EtagHandler.version = "v2"
+
+    recrawl = crawl(site, http_cache)
+
+    assert recrawl.stats["fetched"] == 2
+    assert all("v2" in content for content in recrawl.results.values())
@@ -0,0 +1,60 @@
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import ai_assistant_tester.utils.llm_cache as llm_cache
+import ai_assistant_tester.utils.utils as utils
+from ai_assistant_tester.utils.llm_cache import LlmCache, get_llm_cache
+
+
+@pytest.fixture
+def fresh_cache_state(monkeypatch):
+    monkeypatch.setattr(llm_cache, "_cache", None)
+    monkeypatch.setattr(llm_cache, "_cache_loaded", False)
+
+
+def test_cache_counts_hits_and_misses(tmp_path):
+    cache = LlmCache(str(tmp_path / "cache.db"))
+    key = cache.key({"model": "gpt-4o-mini", "messages": [], "timeout": 5})
+
+    assert cache.get(key) is None
+    cache.put(key, '{"id": "1"}')
+    assert cache.get(key) == '{"id": "1"}'
+    assert key == cache.key({"model": "gpt-4o-mini", "messages": []})
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    cache.close()
+
+
+def test_get_llm_cache_is_none_without_configuration(fresh_cache_state, monkeypatch):
+    monkeypatch.delenv(llm_cache.LLM_CACHE_PATH_ENV, raising=False)
+
+    assert get_llm_cache() is None
+
+
+def test_get_client_uses_the_process_wide_cache(
+    fresh_cache_state, monkeypatch, tmp_path
+):
+    monkeypatch.setenv(llm_cache.LLM_CACHE_PATH_ENV, str(tmp_path / "cache.db"))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    wrapped = []
+    monkeypatch.setattr(
+        utils,
+        "cache_chat_completions",
+        lambda client, cache: wrapped.append(cache) or client,
+    )
+    monkeypatch.setattr(utils, "track_usage", lambda client, ledger: client)
+    monkeypatch.setattr(utils, "_client", None)
+    monkeypatch.setitem(
+        sys.modules,
+        "openai",
+        SimpleNamespace(OpenAI=lambda api_key: SimpleNamespace()),
+    )
+
+    utils.get_client()
+
+    assert wrapped == [get_llm_cache()]
+    assert get_llm_cache() is get_llm_cache()
+    get_llm_cache().close()
@@ -0,0 +1,70 @@
+import pytest
+
+from ai_assistant_tester.knowledge_base.QADeduplicator import QADeduplicator
+
+QUESTIONS = [
+    "What is the refund policy for online orders?",
+    "How do I reset my password?",
+    "What is the refund policy for orders placed online?",
+    "Which payment methods are accepted?",
+    "WHAT is the refund policy for online orders",
+]
+
+
+def qa_set(questions):
+    return {
+        "qas": [{"question": q, "answer": f"a{i}"} for i, q in enumerate(questions)]
+    }
+
+
+def similarity(i, j, questions=QUESTIONS):
+    vectors = QADeduplicator._tfidf(questions)
+    return QADeduplicator._cosine(vectors[i], vectors[j])
+
+
+def test_near_duplicates_are_removed_keeping_order():
+    result, report = QADeduplicator(threshold=0.6).deduplicate(qa_set(QUESTIONS))
+
+    assert [qa["question"] for qa in result["qas"]] == [
+        QUESTIONS[0],
+        QUESTIONS[1],
+        QUESTIONS[3],
+    ]
+    assert report["total"] == 5 and report["kept"] == 3 and report["removed"] == 2
+    assert report["clusters"] == [
+        {"kept": QUESTIONS[0], "removed": [QUESTIONS[2], QUESTIONS[4]]}
+    ]
+
+
+def test_threshold_decides_whether_a_pair_is_a_duplicate():
+    questions = QUESTIONS[:4]
+    near = similarity(0, 2, questions)
+
+    below, _ = QADeduplicator(threshold=near - 0.01).deduplicate(qa_set(questions))
+    above, _ = QADeduplicator(threshold=near + 0.01).deduplicate(qa_set(questions))
+
+    assert 0.5 < near < 1.0
+    assert len(below["qas"]) == 3
+    assert len(above["qas"]) == 4
+
+
+def test_strict_threshold_keeps_reworded_questions():
+    result, report = QADeduplicator(threshold=0.99).deduplicate(qa_set(QUESTIONS))
+
+    # Only the copy differing in case and punctuation goes.
+    assert [qa["question"] for qa in result["qas"]] == QUESTIONS[:4]
+    assert report["clusters"][0]["removed"] == [QUESTIONS[4]]
+
+
+def test_unrelated_questions_are_kept():
+    questions = QUESTIONS[1:2] + QUESTIONS[3:4] + ["Where is the head office?"]
+
+    result, report = QADeduplicator(threshold=0.3).deduplicate(qa_set(questions))
+
+    assert len(result["qas"]) == 3
+    assert report["clusters"] == []
+
+
+def test_bands_must_divide_the_signature():
+    with pytest.raises(ValueError):
+        QADeduplicator(num_perm=64, bands=10)
@@ -0,0 +1,140 @@
+import json
+import re
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import ai_assistant_tester.knowledge_base.KnowledgeBaseFormatter as formatter_module
+import ai_assistant_tester.utils.utils as utils
+from ai_assistant_tester.knowledge_base.KnowledgeBaseFormatter import (
+    QA_RESPONSE_FORMAT,
+    KnowledgeBaseFormatter,
+)
+
+
+class WordEncoding:
+    def encode_ordinary(self, text):
+        return text.split()
+
+
+class FakeCompletions:
+    """
+    Answers Q&A requests with the requested number of pairs, except for the
+    chunks in malformed, which get broken JSON until their max_tokens is raised.
+    """
+
+    def __init__(self, malformed=()):
+        self.malformed = set(malformed)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def create(self, messages, max_tokens, **kwargs):
+        chunk = re.search(r"<(chunk\d+)>", messages[-1]["content"])[1]
+        num_pairs = int(re.search(r"exactly (\d+)", messages[0]["content"])[1])
+        with self.lock:
+            self.requests.append((chunk, max_tokens, kwargs["response_format"]))
+        if chunk in self.malformed and max_tokens < 200:
+            content = '{"qas": [{"question": "cut off'
+        else:
+            qas = [
+                {"question": f"{chunk} q{n}", "answer": f"{chunk} a{n}"}
+                for n in range(num_pairs)
+            ]
+            content = json.dumps({"qas": qas})
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+        )
+
+
+@pytest.fixture
+def formatter(monkeypatch):
+    monkeypatch.setattr(formatter_module, "get_encoding", lambda model: WordEncoding())
+    formatter = KnowledgeBaseFormatter(max_tokens_per_chunk=100)
+    monkeypatch.setattr(formatter, "_chunk_text", lambda text: text.split("\n\n"))
+    return formatter
+
+
+def use_completions(monkeypatch, completions):
+    monkeypatch.setattr(
+        utils, "_client", SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    )
+
+
+def write_kb(tmp_path, sizes):
+    path = tmp_path / "kb.md"
+    path.write_text(
+        "\n\n".join(
+            f"<chunk{i}> " + "word " * (size - 1) for i, size in enumerate(sizes)
+        )
+    )
+    return path
+
+
+@pytest.mark.parametrize(
+    "sizes, num_pairs, expected",
+    [
+        ([10, 10, 10], 3, [1, 1, 1]),
+        ([50, 30, 20], 10, [5, 3, 2]),
+        # Largest remainders: 4.5, 3.0, 2.5 -> the first chunk gets the spare pair.
+        ([45, 30, 25], 10, [5, 3, 2]),
+        ([1, 1, 98], 5, [0, 0, 5]),
+        ([10, 10, 10], 0, [0, 0, 0]),
+    ],
+)
+def test_pairs_are_allocated_by_token_share(formatter, sizes, num_pairs, expected):
+    chunks = [" ".join(["w"] * size) for size in sizes]
+
+    counts = formatter._allocate_pairs(chunks, num_pairs)
+
+    assert counts == expected
+    assert sum(counts) == num_pairs
+
+
+def test_pairs_are_generated_with_the_schema(formatter, monkeypatch, tmp_path):
+    completions = FakeCompletions()
+    use_completions(monkeypatch, completions)
+
+    result = formatter.generate_question_answer_set(
+        write_kb(tmp_path, [60, 40]), num_pairs=5, deduplicate=False
+    )
+
+    assert [qa["question"] for qa in result["qas"]] == [
+        "chunk0 q0",
+        "chunk0 q1",
+        "chunk0 q2",
+        "chunk1 q0",
+        "chunk1 q1",
+    ]
+    assert all(fmt == QA_RESPONSE_FORMAT for _, _, fmt in completions.requests)
+
+
+def test_malformed_chunk_is_retried_with_more_tokens(formatter, monkeypatch, tmp_path):
+    completions = FakeCompletions(malformed={"chunk1"})
+    use_completions(monkeypatch, completions)
+
+    result = formatter.generate_question_answer_set(
+        write_kb(tmp_path, [50, 50]), num_pairs=4, deduplicate=False
+    )
+
+    assert len(result["qas"]) == 4
+    chunks = [qa["question"].split()[0] for qa in result["qas"]]
+    assert chunks == ["chunk0", "chunk0", "chunk1", "chunk1"]
+    assert sorted((c, t) for c, t, _ in completions.requests) == [
+        ("chunk0", 100),
+        ("chunk1", 100),
+        ("chunk1", 200),
+    ]
+
+
+def test_chunk_failing_every_retry_is_left_out(formatter, monkeypatch, tmp_path):
+    completions = FakeCompletions(malformed={"chunk1"})
+    use_completions(monkeypatch, completions)
+    formatter.max_tokens = 10
+
+    result = formatter.generate_question_answer_set(
+        write_kb(tmp_path, [50, 50]), num_pairs=4, max_retries=2, deduplicate=False
+    )
+
+    assert [qa["question"] for qa in result["qas"]] == ["chunk0 q0", "chunk0 q1"]
+    assert [t for c, t, _ in completions.requests if c == "chunk1"] == [10, 20, 40]
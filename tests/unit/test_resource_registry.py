@@ -0,0 +1,166 @@
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from ai_assistant_tester.assistant_manager.ResourceRegistry import ResourceRegistry
+
+
+class NotFound(Exception):
+    pass
+
+
+class FakeManager:
+    """
+    Stand-in for AssistantManager keeping vector stores and assistants in memory.
+    """
+
+    def __init__(self, failed_files=0, failing_deletes=()):
+        self.failed_files = failed_files
+        self.failing_deletes = set(failing_deletes)
+        self.vector_stores = {}
+        self.assistants = {}
+        self.deleted = []
+        self.created = 0
+
+    def add_vector_stores(self, name, filepaths):
+        self.created += 1
+        vector_store_id = f"vs_{self.created}"
+        self.vector_stores[vector_store_id] = ["file_a", "file_b"]
+        return vector_store_id
+
+    def retrieve_vector_store(self, vector_store_id):
+        if vector_store_id not in self.vector_stores:
+            raise NotFound()
+        return SimpleNamespace(
+            id=vector_store_id,
+            status="completed",
+            file_counts=SimpleNamespace(failed=self.failed_files),
+        )
+
+    def list_vector_store_file_ids(self, vector_store_id):
+        return self.vector_stores[vector_store_id]
+
+    def create_assistant(self, **config):
+        self.created += 1
+        assistant_id = f"asst_{self.created}"
+        self.assistants[assistant_id] = config
+        return SimpleNamespace(id=assistant_id)
+
+    def connect(self, assistant_id):
+        if assistant_id not in self.assistants:
+            raise NotFound()
+        return SimpleNamespace(id=assistant_id)
+
+    def _delete(self, resource_id):
+        if resource_id == "thread_gone":
+            raise NotFound()
+        if resource_id == "thread_error" or resource_id in self.failing_deletes:
+            raise RuntimeError("server error")
+        self.deleted.append(resource_id)
+
+    delete_thread = delete_assistant = delete_file = _delete
+
+    def delete_vector_store(self, vector_store_id):
+        self._delete(vector_store_id)
+        self.vector_stores.pop(vector_store_id, None)
+
+
+@pytest.fixture(autouse=True)
+def not_found(monkeypatch):
+    monkeypatch.setattr(openai, "NotFoundError", NotFound)
+
+
+@pytest.fixture
+def kb_file(tmp_path):
+    path = tmp_path / "kb.md"
+    path.write_text("knowledge base")
+    return path
+
+
+def test_vector_store_is_reused_until_the_files_change(tmp_path, kb_file):
+    manager = FakeManager()
+    registry = ResourceRegistry(tmp_path / "registry.json")
+
+    first = registry.get_vector_store(manager, "kb", [kb_file])
+    again = ResourceRegistry(tmp_path / "registry.json").get_vector_store(
+        manager, "kb", [kb_file]
+    )
+    kb_file.write_text("changed knowledge base")
+    changed = registry.get_vector_store(manager, "kb", [kb_file])
+
+    assert first == again
+    assert changed != first
+
+
+def test_failed_upload_is_deleted_and_raises(tmp_path, kb_file):
+    manager = FakeManager(failed_files=1)
+    registry = ResourceRegistry(tmp_path / "registry.json")
+
+    with pytest.raises(RuntimeError, match="1 failed files"):
+        registry.get_vector_store(manager, "kb", [kb_file])
+
+    assert manager.deleted == ["vs_1", "file_a", "file_b"]
+    assert registry.vector_stores == {}
+
+
+def test_failed_upload_left_behind_is_cleaned_up(tmp_path, kb_file):
+    manager = FakeManager(failed_files=1, failing_deletes={"vs_1"})
+    registry = ResourceRegistry(tmp_path / "registry.json")
+
+    with pytest.raises(RuntimeError):
+        registry.get_vector_store(manager, "kb", [kb_file])
+    manager.failing_deletes.clear()
+    manager.failed_files = 0
+    # The stale store is never reused for the same files.
+    assert registry.get_vector_store(manager, "kb", [kb_file]) == "vs_2"
+    summary = ResourceRegistry(tmp_path / "registry.json").cleanup(manager)
+
+    assert summary["vector_stores"] == 1
+    assert {"vs_1", "file_a", "file_b"} <= set(manager.deleted)
+
+
+def test_assistant_is_recreated_when_deleted_remotely(tmp_path):
+    manager = FakeManager()
+    registry = ResourceRegistry(tmp_path / "registry.json")
+    config = {"name": "QA", "instructions": "Answer.", "tools": [], "model": "m"}
+
+    first = registry.get_assistant(manager, **config)
+    assert registry.get_assistant(manager, **config).id == first.id
+    del manager.assistants[first.id]
+
+    assert registry.get_assistant(manager, **config).id != first.id
+
+
+def test_cleanup_deletes_everything_and_keeps_failures(tmp_path, kb_file):
+    manager = FakeManager()
+    registry = ResourceRegistry(tmp_path / "registry.json")
+    vector_store_id = registry.get_vector_store(manager, "kb", [kb_file])
+    assistant = registry.get_assistant(manager, name="QA", model="m")
+    registry.add_threads(["thread_1", "thread_gone", "thread_error"])
+
+    summary = registry.cleanup(manager, everything=True)
+
+    assert summary == {
+        "threads": 2,
+        "assistants": 1,
+        "vector_stores": 1,
+        "files": 2,
+        "failed": 1,
+    }
+    assert {vector_store_id, assistant.id, "file_a", "thread_1"} <= set(manager.deleted)
+    left = ResourceRegistry(tmp_path / "registry.json")
+    assert list(left.threads) == ["thread_error"]
+    assert not left.assistants and not left.vector_stores
+
+
+def test_cleanup_keeps_recently_used_resources(tmp_path, kb_file):
+    manager = FakeManager()
+    registry = ResourceRegistry(tmp_path / "registry.json")
+    registry.get_vector_store(manager, "kb", [kb_file])
+    registry.add_threads(["thread_1"])
+
+    summary = registry.cleanup(manager, max_age_days=1)
+
+    assert summary["threads"] == summary["vector_stores"] == 0
+    assert manager.deleted == []
@@ -0,0 +1,78 @@
+import re
+
+import pytest
+
+from ai_assistant_tester.knowledge_base.TextChunker import TextChunker
+
+
+class WordEncoding:
+    """
+    Tokenizer stand-in with one token per word (with its trailing whitespace).
+    """
+
+    def encode_ordinary(self, text):
+        return re.findall(r"\s+|\S+\s*", text) if text else []
+
+    def encode_ordinary_batch(self, texts):
+        return [self.encode_ordinary(text) for text in texts]
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+
+def tokens(text):
+    return len(WordEncoding().encode_ordinary(text))
+
+
+def words(text):
+    return text.split()
+
+
+def test_short_paragraphs_are_packed_together():
+    text = "one two\n\nthree four\n\nfive six seven"
+
+    chunks = TextChunker(WordEncoding(), max_tokens=5).chunk(text)
+
+    assert chunks == ["one two\n\nthree four", "five six seven"]
+
+
+def test_oversized_paragraph_is_split_at_sentences_then_tokens():
+    sentence = "word " * 3 + "end. "
+    long_line = " ".join(f"w{i}" for i in range(12))
+    paragraph = sentence * 3 + long_line
+
+    chunks = TextChunker(WordEncoding(), max_tokens=8).chunk(paragraph)
+
+    assert all(tokens(chunk) <= 8 for chunk in chunks)
+    assert words(" ".join(chunks)) == words(paragraph)
+    # Whole sentences are kept together where they fit.
+    assert chunks[0] == "word word word end. word word word end."
+
+
+@pytest.mark.parametrize("heading_aware", [False, True])
+def test_no_text_is_lost(heading_aware):
+    text = "\n\n".join(
+        f"## Section {i}\n\n" + " ".join(f"s{i}w{j}" for j in range(i * 4))
+        for i in range(1, 6)
+    )
+
+    chunks = TextChunker(WordEncoding(), 10, heading_aware).chunk(text)
+
+    assert all(tokens(chunk) <= 10 for chunk in chunks)
+    assert words(" ".join(chunks)) == words(text)
+
+
+def test_heading_mode_keeps_a_section_together():
+    text = "## A\n\na1 a2\n\n## B\n\nb1 b2 b3\n\nb4"
+
+    plain = TextChunker(WordEncoding(), max_tokens=8).chunk(text)
+    sections = TextChunker(WordEncoding(), 8, heading_aware=True).chunk(text)
+
+    # Plain packing fills the first chunk and splits section B.
+    assert plain == ["## A\n\na1 a2\n\n## B", "b1 b2 b3\n\nb4"]
+    assert sections == ["## A\n\na1 a2", "## B\n\nb1 b2 b3\n\nb4"]
+
+
+def test_max_tokens_must_be_positive():
+    with pytest.raises(ValueError):
+        TextChunker(WordEncoding(), max_tokens=0)
@@ -0,0 +1,39 @@
+import pytest
+
+from ai_assistant_tester.scraping.UrlCanonicalizer import UrlCanonicalizer
+
+URLS = [
+    "HTTPS://Example.com:443/a/?b=2&a=1#top",
+    "http://example.com/search?z&q=a%2Fb&utm_source=news",
+    "http://example.com/p;jsessionid=abc?sid=1&x=%20y+z",
+    "http://example.com:8080/?a=1&a=0&B=&",
+    "http://example.com/?q=caf%C3%A9&next=%2Fhome%3Fx%3D1",
+]
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_canonicalization_is_idempotent(url):
+    canonicalizer = UrlCanonicalizer()
+    canonical = canonicalizer.canonicalize(url)
+
+    assert canonicalizer.canonicalize(canonical) == canonical
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("http://example.com/?z", "http://example.com/?z"),
+        ("http://example.com/?z=&a", "http://example.com/?a&z="),
+        ("http://example.com/?next=%2Fa%2Fb", "http://example.com/?next=%2Fa%2Fb"),
+        ("http://example.com/?q=a+b&r=a%20b", "http://example.com/?q=a+b&r=a%20b"),
+        ("http://example.com/?x=%3D%26", "http://example.com/?x=%3D%26"),
+    ],
+)
+def test_query_values_are_kept_as_written(url, expected):
+    assert UrlCanonicalizer().canonicalize(url) == expected
+
+
+def test_tracking_parameters_are_dropped_and_the_rest_sorted():
+    url = "https://Example.com:443/a/?b=2&utm_%73ource=x&fbclid=y&a=1&a=0#top"
+
+    assert UrlCanonicalizer().canonicalize(url) == "https://example.com/a?a=1&a=0&b=2"
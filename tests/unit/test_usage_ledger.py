@@ -0,0 +1,98 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ai_assistant_tester.utils.usage_ledger import (
+    BudgetExceededError,
+    UsageLedger,
+    in_context,
+)
+
+USAGE = {"prompt_tokens": 1_000_000, "completion_tokens": 0}
+
+
+def test_records_are_priced_and_tagged_with_the_stage():
+    ledger = UsageLedger()
+    with ledger.stage("format"):
+        ledger.record("gpt-4o-mini-2024-07-18", USAGE)
+    ledger.record("gpt-4o-mini", USAGE)
+
+    summary = ledger.summary()
+    assert summary["format"]["cost_usd"] == pytest.approx(0.15)
+    assert summary["default"]["calls"] == 1
+    assert summary["total"]["cost_usd"] == pytest.approx(0.30)
+
+
+def test_concurrent_stages_do_not_mix():
+    ledger = UsageLedger()
+    barrier = threading.Barrier(2)
+
+    def run(stage):
+        with ledger.stage(stage):
+            # Both threads are inside their stage before either records.
+            barrier.wait()
+            for _ in range(50):
+                ledger.record("gpt-4o-mini", USAGE)
+            barrier.wait()
+
+    threads = [threading.Thread(target=run, args=(s,)) for s in ("format", "eval")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = ledger.summary()
+    assert summary["format"]["calls"] == 50
+    assert summary["eval"]["calls"] == 50
+    assert "default" not in summary
+
+
+def test_pool_workers_inherit_the_stage_with_in_context():
+    ledger = UsageLedger()
+    with ledger.stage("qa_generation"), ThreadPoolExecutor(4) as executor:
+        stages = list(
+            executor.map(in_context(lambda _: ledger.current_stage), range(8))
+        )
+        plain = list(executor.map(lambda _: ledger.current_stage, range(2)))
+
+    assert stages == ["qa_generation"] * 8
+    assert plain == ["default"] * 2
+    assert ledger.current_stage == "default"
+
+
+def test_stage_budget_stops_only_that_stage():
+    ledger = UsageLedger(stage_budgets={"format": 0.1})
+    with ledger.stage("format"):
+        ledger.record("gpt-4o-mini", USAGE)
+        with pytest.raises(BudgetExceededError):
+            ledger.check_budget()
+    with ledger.stage("evaluation"):
+        ledger.check_budget()
+
+
+def test_concurrent_calls_reserve_the_budget():
+    ledger = UsageLedger(stage_budgets={"format": 0.5})
+    barrier = threading.Barrier(4)
+    with ledger.stage("format"):
+        ledger.record("gpt-4o-mini", USAGE)
+
+    def call(_):
+        try:
+            with ledger.reserve("format"):
+                barrier.wait()
+                ledger.record("gpt-4o-mini", USAGE, stage="format")
+            return True
+        except BudgetExceededError:
+            barrier.wait()
+            return False
+
+    with ThreadPoolExecutor(4) as executor:
+        allowed = list(executor.map(call, range(4)))
+
+    # 0.15 spent plus two reserved calls of 0.15 each; a third would reach 0.60.
+    assert allowed.count(True) == 2
+    assert ledger.spent("format") == pytest.approx(0.45)
+    ledger.check_budget("format")
+    with pytest.raises(BudgetExceededError), ledger.reserve("format"):
+        pass
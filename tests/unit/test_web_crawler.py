@@ -0,0 +1,216 @@
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from ai_assistant_tester.knowledge_base.KnowledgeBaseFormatter import (
+    KnowledgeBaseFormatter,
+)
+from ai_assistant_tester.scraping.UrlCanonicalizer import canonical_host
+from ai_assistant_tester.scraping.WebCrawler import WebCrawler
+
+NUM_PAGES = 15
+FANOUT = 2
+
+
+class SyntheticSiteHandler(BaseHTTPRequestHandler):
+    """
+    Serves /page/<n>, linking every page to its FANOUT child pages.
+    """
+
+    text = "Text of page {page}."
+
+    def do_GET(self):
+        if self.path == "/sitemap.xml":
+            self._send_sitemap()
+            return
+        try:
+            page = int(self.path.rstrip("/").rsplit("/", 1)[-1] or 0)
+        except ValueError:
+            page = 0
+        if page >= NUM_PAGES:
+            self.send_error(404)
+            return
+        children = range(page * FANOUT + 1, min(page * FANOUT + FANOUT + 1, NUM_PAGES))
+        links = "".join(f'<a href="/page/{c}">Page {c}</a> ' for c in children)
+        if page == 0:
+            # A verbatim copy of page 1 under another URL.
+            links += '<a href="/copy/1">Copy</a>'
+        text = self.text.format(page=page)
+        body = (
+            f"<html><head><title>Page {page}</title></head><body>"
+            f"<h1>Page {page}</h1><p>{text}</p><p>{links}</p>"
+            "</body></html>"
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_sitemap(self):
+        urls = "".join(
+            f"<url><loc>/page/{page}</loc><lastmod>2000-01-01</lastmod></url>"
+            for page in range(NUM_PAGES)
+        )
+        body = (
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f"{urls}</urlset>"
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TemplateSiteHandler(SyntheticSiteHandler):
+    """
+    Pages that share all their text and differ only in title and links.
+    """
+
+    text = "Shared navigation, footer and boilerplate text. " * 20
+
+
+def serve(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture(scope="module")
+def site():
+    server = serve(SyntheticSiteHandler)
+    yield f"127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture(scope="module")
+def template_site():
+    server = serve(TemplateSiteHandler)
+    yield f"127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.mark.parametrize("engine", ["sync", "async"])
+def test_crawl_visits_every_page(site, engine):
+    crawler = WebCrawler(domain=site, unlimited_depth=True, engine=engine)
+    crawler.run(f"http://{site}/page/0")
+    crawler.close()
+
+    assert len(crawler.results) == NUM_PAGES + 1
+
+
+def test_crawl_site_keeps_every_page_by_default(template_site):
+    content = KnowledgeBaseFormatter().crawl_site(
+        f"http://{template_site}/page/0", max_depth=10
+    )
+
+    assert content.count("# Page ") == NUM_PAGES + 1
+
+
+def test_exact_dedup_drops_copies_but_keeps_distinct_titles(template_site):
+    crawler = WebCrawler(
+        domain=template_site, unlimited_depth=True, dedup_threshold=1.0
+    )
+    crawler.run(f"http://{template_site}/page/0")
+    crawler.close()
+
+    assert len(crawler.results) == NUM_PAGES
+    assert crawler.stats["duplicates"] == 1
+
+
+@pytest.mark.parametrize("engine", ["sync", "async"])
+def test_page_processing_errors_propagate(site, engine):
+    def on_page(url, content):
+        if url.endswith("/page/1"):
+            raise RuntimeError("cannot save page")
+
+    crawler = WebCrawler(
+        domain=site, unlimited_depth=True, engine=engine, on_page=on_page
+    )
+    with pytest.raises(RuntimeError, match="cannot save page"):
+        crawler.run(f"http://{site}/page/0")
+    crawler.close()
+
+    assert crawler.stats["skipped"] == 0
+
+
+def test_profiling_resolves_each_new_connection_once(site, monkeypatch):
+    port = site.rsplit(":", 1)[1]
+    lookups = []
+    getaddrinfo = socket.getaddrinfo
+
+    def counting_getaddrinfo(host, *args, **kwargs):
+        lookups.append(host)
+        return getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", counting_getaddrinfo)
+    crawler = WebCrawler(domain="localhost", max_depth=0, profile=True)
+    crawler.run(f"http://localhost:{port}/page/0")
+    crawler.close()
+
+    assert len(crawler.results) == 1
+    assert lookups.count("localhost") == 1
+
+
+@pytest.mark.parametrize(
+    "start_url",
+    ["https://example.com:443/", "https://Example.COM./docs", "http://example.com"],
+)
+def test_start_url_is_within_its_own_domain(start_url):
+    crawler = WebCrawler(domain=canonical_host(start_url))
+
+    assert canonical_host(start_url) == "example.com"
+    assert crawler._claim(crawler._normalize_url(start_url))
+    assert not crawler._claim(crawler._normalize_url("https://other.org/"))
+
+
+def test_oversized_pages_are_counted_across_threads():
+    crawler = WebCrawler(max_body_bytes=10)
+    response = SimpleNamespace(
+        headers={}, iter_content=lambda chunk_size: iter([b"x" * 8, b"x" * 8])
+    )
+
+    with ThreadPoolExecutor(8) as executor:
+        bodies = list(
+            executor.map(lambda _: crawler._read_body(response, "u"), range(2000))
+        )
+
+    assert bodies == [b"x" * 10] * 2000
+    assert crawler.stats["oversized"] == 2000
+
+
+def test_pages_reused_from_the_sitemap_are_checkpointed(site, tmp_path):
+    http_cache = str(tmp_path / "cache.db")
+    crawler = WebCrawler(domain=site, unlimited_depth=True, http_cache=http_cache)
+    crawler.run(f"http://{site}/page/0")
+    crawler.close()
+
+    crawler = WebCrawler(
+        domain=site,
+        http_cache=http_cache,
+        use_sitemap=True,
+        follow_links=False,
+        modified_since=datetime.now(timezone.utc),
+        state_file=str(tmp_path / "state.db"),
+        output_file=str(tmp_path / "out.md"),
+        batch_size=1,
+    )
+    done = []
+    mark_done = crawler.frontier.mark_done
+    crawler.frontier.mark_done = lambda url: done.append(url) or mark_done(url)
+    crawler.seed_from_sitemap(f"http://{site}/")
+
+    assert crawler.stats["unchanged"] == NUM_PAGES
+    assert sorted(done) == sorted(f"http://{site}/page/{n}" for n in range(NUM_PAGES))
+    # batch_size=1: every reused page was flushed before its checkpoint.
+    assert (tmp_path / "out.md").read_text().count("# Page ") == NUM_PAGES
+    crawler.close()